@@ -4,11 +4,23 @@
 from __future__ import absolute_import
 from .version import __version__
 from .utils.try_import import *
-
-try_import_mxnet()
-try_import_dask()
+from .utils.lazy_import import lazy_package
 
 from .utils import *
 from .core import *
-from .task import *
-from . import scheduler, searcher, distributed, nas, utils
+from . import utils
+# `task` is the package of the tasks below, not core.task
+del task
+
+# the tasks, schedulers and searchers import mxnet, dask, gluoncv or skopt:
+# they are loaded on first use, e.g. `ag.scheduler.FIFOScheduler`
+__getattr__, __dir__ = lazy_package(
+    __name__, submodules=['task', 'scheduler', 'searcher', 'distributed', 'nas'],
+    exports={
+        '.utils': ['unzip', 'download', 'mkdir', 'check_sha1', 'raise_num_file',
+                   'update_params', 'collect_params', 'get_data_rec', 'read_remote_ips',
+                   'plot_network', 'Visualizer', 'DataAnalyzer', 'DataLoader',
+                   'plot_performance_vs_trials', 'plot_summary_of_models', 'mousover_plot'],
+        '.core': ['optimizer'],
+        '.task': ['BaseTask', 'ImageClassification'],
+    })
@@ -1,6 +1,8 @@
+from ..utils.lazy_import import lazy_package
 from .space import *
 from .task import *
 from .decorator import *
 from .shutdown import done
 
-from . import optimizer
+# the optimizers are mxnet optimizers
+__getattr__, __dir__ = lazy_package(__name__, submodules=['optimizer'])
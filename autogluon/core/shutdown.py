@@ -1,4 +1,4 @@
-from ..scheduler.remote.remote_manager import RemoteManager
+import sys
 import logging
 
 logger = logging.getLogger(__name__)
@@ -12,5 +12,9 @@ def done():
     --------
     >>> autogluon.done()
     """
+    # the scheduler backend (dask) is only imported if it was used
+    if 'autogluon.scheduler.remote.remote_manager' not in sys.modules:
+        return
+    from ..scheduler.remote.remote_manager import RemoteManager
     logger.info('Shutting Down AutoGluon backend.')
     RemoteManager.shutdown()
@@ -1,7 +1,13 @@
+from ..utils import try_import_dask
+try_import_dask()
+
+from ..utils.lazy_import import lazy_package
 from .import remote, resource
 
 # schedulers
 from .scheduler import *
 from .fifo import *
 from .hyperband import *
-from .rl_scheduler import *
+
+# mxnet is imported on first use of the RL scheduler
+__getattr__, __dir__ = lazy_package(__name__, exports={'.rl_scheduler': ['RLScheduler']})
@@ -3,10 +3,13 @@ import time
 import copy
 import pickle
 import json
+import hashlib
 import logging
+import functools
 import threading
 import multiprocessing as mp
-from collections import OrderedDict
+from collections import OrderedDict, deque
+from concurrent.futures import Future
 
 from .resource import DistributedResource
 from ..utils import save, load, mkdir, try_import_mxboard
@@ -14,7 +17,14 @@ from ..core import Task
 from ..core.decorator import _autogluon_method
 from .scheduler import TaskScheduler
 from ..searcher import *
-from .reporter import DistStatusReporter, FakeReporter
+from .. import searcher as _searcher_module
+from .reporter import FakeReporter, ReportDispatcher, DistSemaphore
+from .journal import CheckpointJournal
+from .history import TrainingHistory
+from .tracer import TrialTracer
+from .result_cache import TrialResultCache, _canonical
+from .straggler import StragglerDetector
+from .memory import PeakMemoryEstimator
 from ..utils import DeprecationHelper, in_ipynb
 
 from tqdm.auto import tqdm
@@ -23,12 +33,36 @@ __all__ = ['FIFOScheduler', 'DistributedFIFOScheduler']
 
 logger = logging.getLogger(__name__)
 
+# searchers given by name, resolved by `_get_searcher_cls` so that those with
+# heavy dependencies are imported on first use
 searchers = {
-    'random': RandomSearcher,
-    'skopt': SKoptSearcher,
-    'grid': GridSearcher,
+    'random': 'RandomSearcher',
+    'skopt': 'SKoptSearcher',
+    'grid': 'GridSearcher',
 }
 
+def _get_searcher_cls(name):
+    """Searcher class registered as `name` in `searchers`
+    """
+    return getattr(_searcher_module, searchers[name])
+
+# options of the PrefetchSearcher of the searchers named 'prefetch_<name>'
+_PREFETCH_OPTIONS = ['prefetch', 'invalidate_on_update', 'timeout']
+
+def _create_searcher(name, configspace, search_options):
+    """Searcher named `name`. The suggestions of a searcher named with a
+    'prefetch_' prefix, e.g. 'prefetch_skopt', are computed ahead of time by
+    a :class:`PrefetchSearcher`.
+    """
+    if name.startswith('prefetch_'):
+        search_options = dict(search_options)
+        prefetch_options = {k: search_options.pop(k) for k in _PREFETCH_OPTIONS
+                            if k in search_options}
+        return PrefetchSearcher(
+            _create_searcher(name[len('prefetch_'):], configspace, search_options),
+            **prefetch_options)
+    return _get_searcher_cls(name)(configspace, **search_options)
+
 class FIFOScheduler(TaskScheduler):
     r"""Simple scheduler that just runs trials in submission order.
 
@@ -40,8 +74,22 @@ class FIFOScheduler(TaskScheduler):
         Default arguments for launching train_fn.
     resource : dict
         Computation resources. For example, `{'num_cpus':2, 'num_gpus':1}`
+        The optional 'numa' entry sets the NUMA policy of the trials ('local' by
+        default, 'bind' or None), see :class:`autogluon.scheduler.resource.DistributedResource`.
+        The optional 'memory' entry (in bytes) is the memory reserved for each
+        trial on its node. Once a trial of the same config family finished, the
+        trials reserve the peak memory measured for the family instead (see
+        :class:`PeakMemoryEstimator`), so that they are packed as densely as
+        the memory of the nodes allows.
     searcher : str or object
         Autogluon searcher. For example, autogluon.searcher.self.argsRandomSampling
+        Searchers can be given by name: 'random', 'skopt' or 'grid', with a
+        'prefetch_' prefix to compute their suggestions ahead of time (see
+        :class:`PrefetchSearcher`, whose options are read from `search_options`).
+    time_out : float (optional)
+        Time budget of the experiment in seconds. Tasks still running at the
+        deadline are stopped at their next report, and their last result is
+        passed to the searcher with `terminated=True`.
     time_attr : str
             A training result attr to use for comparing time.
             Note that you can pass in something non-temporal such as
@@ -51,7 +99,28 @@ class FIFOScheduler(TaskScheduler):
         The training result objective value attribute. As with `time_attr`, this may refer to any objective value.
         Stopping procedures will use this attribute.
     dist_ip_addrs : list of str
-        IP addresses of remote machines.
+        IP addresses of remote machines, or :class:`SimulatedNode` simulating
+        nodes on this machine.
+    async_reports : bool
+        If True, `reporter(...)` calls in the training function do not wait for
+        the scheduler: reports are buffered and sent in batches, and the trial
+        is only interrupted when the scheduler decides to stop it.
+    result_cache : str or :class:`TrialResultCache` (optional)
+        Directory of a cache of the reports of finished trials, shared across
+        experiments. A config which was already evaluated with the same training
+        function and fixed arguments is not trained again: its recorded reports
+        are replayed to the searcher instead.
+    straggler_policy : str (optional)
+        What to do with trials which run much slower than the others (see
+        :class:`StragglerDetector`): 'deprioritize' places new tasks on other
+        nodes than the one of the straggler first, until the straggler is
+        finished. 'migrate' also stops the straggler and resumes it on another
+        node. Migrated trials resume from their last report if the training
+        function registers how to save its state (see
+        :meth:`StatusReporter.register_checkpoint`), which is then saved at
+        every report. Stragglers are only logged by default.
+    straggler_threshold : float
+        Slowdown compared to the median trial above which a trial is a straggler.
 
     Examples
     --------
@@ -81,7 +150,8 @@ class FIFOScheduler(TaskScheduler):
                  resume=False, num_trials=None,
                  time_out=None, max_reward=1.0, time_attr='epoch',
                  reward_attr='accuracy',
-                 visualizer='none', dist_ip_addrs=None):
+                 visualizer='none', dist_ip_addrs=None, async_reports=False,
+                 result_cache=None, straggler_policy=None, straggler_threshold=3.0):
         super(FIFOScheduler,self).__init__(dist_ip_addrs)
         if resource is None:
             resource = {'num_cpus': 1, 'num_gpus': 0}
@@ -92,7 +162,7 @@ class FIFOScheduler(TaskScheduler):
         self.args = args if args else train_fn.args
         self.resource = resource
         if isinstance(searcher, str):
-            self.searcher = searchers[searcher](train_fn.cs, **search_options)
+            self.searcher = _create_searcher(searcher, train_fn.cs, search_options)
         else:
             assert isinstance(searcher, BaseSearcher)
             self.searcher = searcher
@@ -115,6 +185,18 @@ class FIFOScheduler(TaskScheduler):
         self._checkpoint = checkpoint
         self._time_attr = time_attr
         self._reward_attr = reward_attr
+        self._async_reports = async_reports
+        if isinstance(result_cache, str):
+            result_cache = TrialResultCache(result_cache)
+        self._result_cache = result_cache
+        assert straggler_policy in (None, 'deprioritize', 'migrate'), \
+            'straggler_policy must be None, deprioritize or migrate'
+        self._straggler_policy = straggler_policy
+        self.straggler_detector = StragglerDetector(straggler_threshold)
+        self._task_nodes = {}
+        self.memory_estimator = PeakMemoryEstimator()
+        self._task_configs = {}
+        self._migrated_tasks = set()
         self.visualizer = visualizer.lower()
         if self.visualizer == 'tensorboard' or self.visualizer == 'mxboard':
             try_import_mxboard()
@@ -124,16 +206,36 @@ class FIFOScheduler(TaskScheduler):
                 flush_secs=3,
                 verbose=False)
         self.log_lock = mp.Lock()
-        self.training_history = OrderedDict()
+        self.training_history = TrainingHistory()
         self.config_history = OrderedDict()
+        # configs of the last batch suggested by the searcher, not scheduled yet
+        self._config_queue = deque()
+        # timeline of the trials
+        self.tracer = TrialTracer()
+        # reports of all the tasks are handled by a single thread
+        self._dispatcher = ReportDispatcher(self.tracer, self._on_task_spans)
+        self._dispatcher.start()
+        # changes since the last checkpoint are appended to a journal
+        self._state_lock = threading.RLock()
+        self._journal = CheckpointJournal(checkpoint + '.journal') \
+            if checkpoint is not None else None
+        self._num_journaled_tasks = 0
+        self._snapshot_size = 0
+        # tasks running past the time budget are stopped
+        self._deadline_timer = None
+        self._deadline_passed = threading.Event()
+        self._preempted_tasks = set()
 
         if resume:
             if os.path.isfile(checkpoint):
                 self.load_state_dict(load(checkpoint))
+                self._snapshot_size = os.path.getsize(checkpoint)
             else:
                 msg = 'checkpoint path {} is not available for resume.'.format(checkpoint)
                 logger.exception(msg)
                 raise FileExistsError(msg)
+        elif self._journal is not None:
+            self._journal.reset()
 
     def run(self, **kwargs):
         """Run multiple number of trials
@@ -144,12 +246,40 @@ class FIFOScheduler(TaskScheduler):
         logger.info('Starting Experiments')
         logger.info('Num of Finished Tasks is {}'.format(self.num_finished_tasks))
         logger.info('Num of Pending Tasks is {}'.format(self.num_trials - self.num_finished_tasks))
+        self._start_deadline_timer(start_time)
         tbar = tqdm(range(self.num_finished_tasks, self.num_trials))
-        for _ in tbar:
+        for i in tbar:
             if self.time_out and time.time() - start_time >= self.time_out \
                     or self.max_reward and self.get_best_reward() >= self.max_reward:
                 break
-            self.schedule_next()
+            self.schedule_next(num_remaining=self.num_trials - i)
+
+    def _start_deadline_timer(self, start_time):
+        if self._deadline_timer is not None:
+            self._deadline_timer.cancel()
+        self._deadline_passed.clear()
+        if not self.time_out:
+            return
+        self._deadline_timer = threading.Timer(
+            max(start_time + self.time_out - time.time(), 0), self._on_deadline)
+        self._deadline_timer.daemon = True
+        self._deadline_timer.start()
+
+    def _on_deadline(self):
+        """Stop the tasks still running once the time budget is spent
+        """
+        self._deadline_passed.set()
+        with self.LOCK:
+            task_dicts = list(self.scheduled_tasks)
+        for task_dict in task_dicts:
+            if not task_dict['Job'].done():
+                self._preempt_task(task_dict['Task'])
+
+    def _preempt_task(self, task):
+        logger.info('Time budget is spent, stopping task {}'.format(task.task_id))
+        with self._state_lock:
+            self._preempted_tasks.add(task.task_id)
+        task.args['terminator_semaphore'].release()
 
     def save(self, checkpoint=None):
         """Save Checkpoint
@@ -161,10 +291,67 @@ class FIFOScheduler(TaskScheduler):
                 checkpoint = self._checkpoint
         if checkpoint is not None:
             mkdir(os.path.dirname(checkpoint))
-            save(self.state_dict(), checkpoint)
+            with self._state_lock:
+                state_dict = self.state_dict()
+                compact = self._journal is not None and checkpoint == self._checkpoint
+                if compact:
+                    state_dict['journal_path'] = self._journal.path
+                    state_dict['journal_seq'] = self._journal.seq
+                save(state_dict, checkpoint)
+                if compact:
+                    self._journal.reset()
+                    self._snapshot_size = os.path.getsize(checkpoint)
+
+    def _checkpoint_journal(self):
+        """Append the newly finished tasks to the journal, and compact the journal
+        into a snapshot once it gets larger than the last snapshot.
+        """
+        with self._state_lock:
+            for task_dict in self.finished_tasks[self._num_journaled_tasks:]:
+                self._journal.append('finished_task', task_dict)
+            self._num_journaled_tasks = len(self.finished_tasks)
+            if self._journal.size > self._snapshot_size:
+                self.save()
 
-    def schedule_next(self):
+    def _replay_journal(self, state_dict):
+        """Apply the journal records which are not included in the snapshot
+        """
+        if self._journal is None or state_dict.get('journal_path') != self._journal.path:
+            return
+        task_ids = set(t['TASK_ID'] for t in self.finished_tasks)
+        num_records = 0
+        # the records appended from now on are numbered after the snapshot,
+        # even if the journal was compacted into it
+        for _, kind, args in self._journal.replay(after=state_dict['journal_seq']):
+            num_records += 1
+            if kind == 'result':
+                task_id, reported_result, config = args
+                with self.log_lock:
+                    self.training_history.append(task_id, reported_result)
+                    if config and task_id not in self.config_history:
+                        self.config_history[task_id] = config
+            elif kind == 'update':
+                config, reward, kwargs = args
+                self.searcher.update(config=config, reward=reward, **kwargs)
+            elif kind == 'failed':
+                self.searcher.evaluation_failed(args[0])
+            elif kind == 'finished_task':
+                task_dict = args[0]
+                if task_dict['TASK_ID'] not in task_ids:
+                    task_ids.add(task_dict['TASK_ID'])
+                    self.finished_tasks.append(task_dict)
+                if task_dict['TASK_ID'] >= Task.TASK_ID.value:
+                    Task.set_id(task_dict['TASK_ID'] + 1)
+        self._num_journaled_tasks = len(self.finished_tasks)
+        logger.debug('Replayed {} journal records from {}'.format(num_records, self._journal.path))
+
+    def schedule_next(self, num_remaining=1):
         """Schedule next searcher suggested task
+
+        Args:
+            num_remaining (int): number of tasks which remain to be scheduled. When
+                several resources are free, up to this many configs are queried from
+                the searcher in one batch.
         """
         # Allow for the promotion of a previously chosen config. Also,
         # extra_kwargs contains extra info passed to both add_job and to
@@ -172,7 +359,8 @@ class FIFOScheduler(TaskScheduler):
         config, extra_kwargs = self._promote_config()
         if config is None:
             # No config to promote: Query next config to evaluate from searcher
-            config = self.searcher.get_config(**extra_kwargs)
+            with self.tracer.trace('suggest'):
+                config = self._next_config(num_remaining, **extra_kwargs)
             extra_kwargs['new_config'] = True
         else:
             # This is not a new config, but a paused one which is now promoted
@@ -181,6 +369,19 @@ class FIFOScheduler(TaskScheduler):
                     DistributedResource(**self.resource))
         self.add_job(task, **extra_kwargs)
 
+    def _next_config(self, num_remaining, **kwargs):
+        """Next config suggested by the searcher, queried in batches as large as
+        the number of tasks which could start right away.
+        """
+        if len(self._config_queue) == 0:
+            num_configs = self.RESOURCE_MANAGER.num_available(
+                DistributedResource(**self.resource))
+            num_configs = max(1, min(num_configs, num_remaining))
+            if num_configs == 1:
+                return self.searcher.get_config(**kwargs)
+            self._config_queue.extend(self.searcher.get_configs(num_configs, **kwargs))
+        return self._config_queue.popleft()
+
     def run_with_config(self, config):
         """Run with config for final fit.
         It launches a single training trial under any fixed values of the hyperparameters.
@@ -217,53 +418,272 @@ class FIFOScheduler(TaskScheduler):
             - resume_from: config promoted from this milestone
             - milestone: config promoted to this milestone (next from resume_from)
         """
-        cls = FIFOScheduler
-        cls.RESOURCE_MANAGER._request(task.resources)
-        # reporter
-        reporter = DistStatusReporter()
+        cache_key, cached_results = self._lookup_result_cache(task, **kwargs)
+        if cached_results is None:
+            self._request_resources(task)
+        # reporter and terminator
+        terminator_semaphore = DistSemaphore(0)
+        reporter = self._add_report_stream(
+            task, functools.partial(self._on_task_report, task, {}, terminator_semaphore),
+            cache_key, cached_results)
         task.args['reporter'] = reporter
+        task.args['terminator_semaphore'] = terminator_semaphore
+        if self._straggler_policy == 'migrate' and self._checkpoint is not None:
+            reporter.checkpoint = {
+                'dir': self._trial_checkpoint_dir(task.args['config']),
+                'time_attr': self._time_attr,
+                'milestones': None,
+                'resume_from': kwargs.get('resume_from')}
         # Register pending evaluation
         self.searcher.register_pending(task.args['config'])
         # main process
-        job = cls._start_distributed_job(task, cls.RESOURCE_MANAGER, self.env_sem)
-        # reporter thread
-        rp = threading.Thread(target=self._run_reporter, args=(task, job, reporter,
-                              self.searcher), daemon=False)
-        rp.start()
+        job = self._start_job(task, reporter, cached_results)
+        job.add_done_callback(lambda fut: self._dispatcher.end_stream(reporter))
         task_dict = self._dict_from_task(task)
-        task_dict.update({'Task': task, 'Job': job, 'ReporterThread': rp})
+        task_dict.update({'Task': task, 'Job': job, 'Reporter': reporter})
         # checkpoint thread
         if self._checkpoint is not None:
             def _save_checkpoint_callback(fut):
                 self._cleaning_tasks()
-                self.save()
+                self._checkpoint_journal()
             job.add_done_callback(_save_checkpoint_callback)
 
         with self.LOCK:
             self.scheduled_tasks.append(task_dict)
+        if self._deadline_passed.is_set():
+            self._preempt_task(task)
+
+    def _trial_checkpoint_dir(self, config):
+        """Directory of the checkpoints saved by the trials of a config
+        """
+        data = json.dumps(config, sort_keys=True, default=_canonical)
+        return os.path.join(os.path.splitext(self._checkpoint)[0], 'trials',
+                            hashlib.sha1(data.encode('utf-8')).hexdigest())
+
+    def _cache_budget(self):
+        """Budget of a trial, part of the key of the result cache
+        """
+        return None
+
+    def _lookup_result_cache(self, task, new_config=True, **kwargs):
+        """Key of the task in the result cache, and its cached reports (None if
+        they are not cached). Only new configs are looked up.
+        """
+        if self._result_cache is None or not new_config:
+            return None, None
+        cache_key = self._result_cache.key(
+            self.train_fn, self.args, task.args['config'], self._cache_budget())
+        if cache_key is None:
+            return None, None
+        return cache_key, self._result_cache.get(cache_key)
+
+    def _add_report_stream(self, task, handler, cache_key=None, cached_results=None):
+        """Reporter of a task, recording its reports in the result cache if needed.
+        Replayed reports are sent in a batch, without waiting for the scheduler.
+        """
+        if cache_key is not None and cached_results is None:
+            handler = self._record_results(cache_key, handler)
+        if cached_results is None:
+            handler = self._track_finished(task.task_id, handler)
+        return self._dispatcher.add_stream(
+            handler, self._async_reports or cached_results is not None, task.task_id)
+
+    def _record_results(self, cache_key, handler):
+        results = []
+        def record(reporter, reported_result):
+            if reported_result is not None and not reported_result.get('done', False):
+                results.append(copy.copy(reported_result))
+            finished = handler(reporter, reported_result)
+            if finished and len(results) > 0 and self._trial_completed(reported_result):
+                try:
+                    self._result_cache.put(cache_key, results)
+                except OSError as e:
+                    logger.warning('Failed to cache the results of a trial: {}'.format(e))
+            return finished
+        return record
+
+    def _track_finished(self, task_id, handler):
+        def track(reporter, reported_result):
+            finished = handler(reporter, reported_result)
+            if finished:
+                self._on_task_finished(task_id)
+            return finished
+        return track
+
+    def _on_task_finished(self, task_id):
+        """Forget the node of a finished (or stopped) task, and lift the penalty
+        it put on the node if it was a straggler
+        """
+        self.straggler_detector.finish(task_id)
+        with self._state_lock:
+            node = self._task_nodes.pop(task_id, None)
+        if self._straggler_policy is not None and node is not None and \
+                node in self.RESOURCE_MANAGER.NODE_PENALTY:
+            self._update_node_penalty(node)
+
+    def _update_node_penalty(self, node):
+        # nodes are deprioritized by the number of stragglers running on them
+        self.RESOURCE_MANAGER.set_node_penalty(
+            node, self.straggler_detector.node_stragglers(node))
+
+    def _trial_completed(self, last_result):
+        """Whether a finished task ran to completion, i.e. its reports can be cached.
+        The reports of tasks stopped by the scheduler are incomplete.
+        """
+        return last_result is None or not last_result.get('terminated', False)
+
+    def _start_job(self, task, reporter, cached_results=None):
+        """Launch the task, or replay its cached reports
+        """
+        if cached_results is None:
+            return self._start_distributed_job(task, self.RESOURCE_MANAGER, self.env_sem)
+        logger.info('Replaying {} cached reports for task {}'.format(
+            len(cached_results), task.task_id))
+        reporter.report_batch([dict(r) for r in cached_results] + [{'done': True}])
+        job = Future()
+        job.set_result(None)
+        return job
+
+    def _request_resources(self, task):
+        self._estimate_memory(task)
+        with self.tracer.trace('queue', task.task_id):
+            self.RESOURCE_MANAGER._request(task.resources)
+        resources = task.resources
+        slot = resources.cpu_ids[0] if len(resources.cpu_ids) > 0 else 0
+        self.tracer.set_lane(task.task_id, 'node {}'.format(resources.node.remote_id), slot)
+        with self._state_lock:
+            self._task_nodes[task.task_id] = resources.node
+
+    def _estimate_memory(self, task):
+        """Reserve the measured peak memory of the config family of the task,
+        if the memory of the trials is scheduled
+        """
+        config = task.args['config']
+        with self._state_lock:
+            self._task_configs[task.task_id] = config
+        if task.resources.memory <= 0:
+            return
+        estimate = self.memory_estimator.estimate(config)
+        if estimate is not None:
+            task.resources.memory = max(min(estimate, self.RESOURCE_MANAGER.MAX_MEMORY), 1)
+
+    def _on_task_spans(self, task_id, spans):
+        """Record the peak memory of a finished trial, called by the report dispatcher
+        """
+        for span in spans:
+            peak_rss = span['args'].get('peak_rss') if span['name'] == 'trial' else None
+            if peak_rss is None:
+                continue
+            with self._state_lock:
+                config = self._task_configs.pop(task_id, None)
+            if config is not None:
+                self.memory_estimator.add(config, peak_rss)
 
     def _clean_task_internal(self, task_dict):
-        task_dict['ReporterThread'].join()
-
-    def _run_reporter(self, task, task_job, reporter, searcher,
-                      checkpoint_semaphore=None):
-        last_result = None
-        while not task_job.done():
-            reported_result = reporter.fetch()
-            if reported_result.get('done', False):
-                reporter.move_on()
-                if checkpoint_semaphore is not None:
-                    checkpoint_semaphore.release()
-                break
+        self._dispatcher.wait_stream(task_dict['Reporter'])
+
+    def _on_task_report(self, task, state, terminator_semaphore, reporter,
+                        reported_result):
+        """Handle a report of a running task, called by the report dispatcher.
+        `reported_result` is None once the job is done. Returns True when no
+        more reports are expected from the task.
+        """
+        if reported_result is not None and not reported_result.get('done', False):
             self._add_training_result(
                 task.task_id, reported_result, config=task.args['config'])
             reporter.move_on()
-            last_result = reported_result
+            state['last_result'] = reported_result
+            return False
+        if reported_result is not None:
+            reporter.move_on()
+        terminator_semaphore.release()
+        if reported_result is None and task.task_id in self._migrated_tasks:
+            # stopped straggler or task of a lost node, its evaluation goes on
+            # in a new task
+            self._resubmit(task, new_config=False, resume_from='latest')
+            return True
+        last_result = state.get('last_result')
         if last_result is not None:
             last_result['done'] = True
-            searcher.update(
+            self._mark_preempted(task, last_result)
+            self._update_searcher(
                 config=task.args['config'],
                 reward=last_result[self._reward_attr], **last_result)
+        else:
+            self._evaluation_failed(task.args['config'])
+        return True
+
+    def _check_straggler(self, task_id, reported_result):
+        """Track the pace of the task, and apply the straggler policy
+        """
+        node = self._task_nodes.get(task_id)
+        if node is None or 'time_this_iter' not in reported_result:
+            return
+        detector = self.straggler_detector
+        if not detector.add_report(task_id, node, reported_result['time_this_iter']):
+            return
+        logger.warning('Task {} is a straggler on {} (slowdown of the node: {:.2f})'.format(
+            task_id, node, detector.node_slowdown(node)))
+        if self._straggler_policy is None:
+            return
+        self._update_node_penalty(node)
+        if self._straggler_policy == 'migrate':
+            self._migrate_task(task_id)
+
+    def _migrate_tasks_on(self, remotes):
+        """Stop the running tasks of nodes being removed, and resume them on the
+        other nodes (from their last report if they saved a checkpoint)
+        """
+        with self._state_lock:
+            task_ids = [task_id for task_id, node in self._task_nodes.items()
+                        if any(node is remote for remote in remotes)]
+        for task_id in task_ids:
+            self._migrate_task(task_id)
+
+    def _requeue_lost_tasks(self, remotes, jobs):
+        # resubmitted once their jobs are finished, see _on_task_report
+        self._migrate_tasks_on(remotes)
+
+    def _migrate_task(self, task_id):
+        with self.LOCK:
+            task_dicts = [t for t in self.scheduled_tasks if t['TASK_ID'] == task_id]
+        if len(task_dicts) == 0 or task_dicts[0]['Job'].done() or \
+                self._deadline_passed.is_set():
+            return
+        logger.info('Migrating task {}'.format(task_id))
+        with self._state_lock:
+            self._migrated_tasks.add(task_id)
+        task_dicts[0]['Task'].args['terminator_semaphore'].release()
+
+    def _resubmit(self, task, **kwargs):
+        """Resume the evaluation of the config of a stopped task in a new task,
+        added with `kwargs`. Called by the report dispatcher, which must not
+        wait for resources.
+        """
+        new_task = Task(self.train_fn, {'args': self.args, 'config': task.args['config']},
+                        DistributedResource(**self.resource))
+        logger.info('Task {} resumes the evaluation of task {}'.format(
+            new_task.task_id, task.task_id))
+        self._resubmit_task(new_task, **kwargs)
+
+    def _mark_preempted(self, task, last_result):
+        if task.task_id in self._preempted_tasks:
+            last_result['terminated'] = True
+
+    def _update_searcher(self, config, reward, **kwargs):
+        with self._state_lock:
+            self.searcher.update(config=config, reward=reward, **kwargs)
+            if self._journal is not None:
+                self._journal.append('update', config, reward, kwargs)
+
+    def _evaluation_failed(self, config):
+        """The evaluation of the config ended without a final result, it is no
+        longer pending
+        """
+        with self._state_lock:
+            self.searcher.evaluation_failed(config)
+            if self._journal is not None:
+                self._journal.append('failed', config)
 
     def _promote_config(self):
         """
@@ -298,15 +718,15 @@ class FIFOScheduler(TaskScheduler):
                                            task_id=task_id, reward_attr=self._reward_attr),
                                            reported_result[self._reward_attr]),
                                     global_step=reported_result[self._reward_attr])
-        with self.log_lock:
+        with self._state_lock, self.log_lock:
             # Note: We store all of reported_result in training_history[task_id],
             # not just the reward value.
-            if task_id in self.training_history:
-                self.training_history[task_id].append(reported_result)
-            else:
-                self.training_history[task_id] = [reported_result]
-                if config:
-                    self.config_history[task_id] = config
+            if task_id not in self.training_history and config:
+                self.config_history[task_id] = config
+            self.training_history.append(task_id, reported_result)
+            if self._journal is not None:
+                self._journal.append('result', task_id, reported_result, config)
+        self._check_straggler(task_id, reported_result)
 
     def get_training_curves(self, filename=None, plot=False, use_legend=True):
         """Get Training Curves
@@ -331,10 +751,10 @@ class FIFOScheduler(TaskScheduler):
         plt.ylabel(self._reward_attr)
         plt.xlabel(self._time_attr)
         with self.log_lock:
-            for task_id, task_res in self.training_history.items():
-                rewards = [x[self._reward_attr] for x in task_res]
-                x = list(range(len(task_res)))
-                plt.plot(x, rewards, label='task {}'.format(task_id))
+            task_ids, steps, rewards = self.training_history.column(self._reward_attr)
+            for task_id in self.training_history:
+                rows = task_ids == task_id
+                plt.plot(steps[rows], rewards[rows], label='task {}'.format(task_id))
         if use_legend:
             plt.legend(loc='best')
         if filename is not None:
@@ -352,7 +772,7 @@ class FIFOScheduler(TaskScheduler):
         destination = super(FIFOScheduler, self).state_dict(destination)
         destination['searcher'] = pickle.dumps(self.searcher)
         with self.log_lock:
-            destination['training_history'] = json.dumps(self.training_history)
+            destination['training_history'] = self.training_history.state_dict()
         if self.visualizer == 'mxboard' or self.visualizer == 'tensorboard':
             destination['visualizer'] = json.dumps(self.mxboard._scalar_dict)
         return destination
@@ -367,9 +787,10 @@ class FIFOScheduler(TaskScheduler):
         super(FIFOScheduler, self).load_state_dict(state_dict)
         self.searcher = pickle.loads(state_dict['searcher'])
         with self.log_lock:
-            self.training_history = json.loads(state_dict['training_history'])
+            self.training_history.load_state_dict(state_dict['training_history'])
         if self.visualizer == 'mxboard' or self.visualizer == 'tensorboard':
             self.mxboard._scalar_dict = json.loads(state_dict['visualizer'])
+        self._replay_journal(state_dict)
         logger.debug('Loading Searcher State {}'.format(self.searcher))
 
 
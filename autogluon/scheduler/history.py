@@ -0,0 +1,232 @@
+"""Columnar store of the results reported by training tasks"""
+import json
+import numbers
+from collections import OrderedDict
+from collections.abc import Mapping
+
+import numpy as np
+
+__all__ = ['TrainingHistory']
+
+
+class _Column(object):
+    """Growable array of one reported attribute, with a mask of the rows where
+    it was reported. Integer columns are upcast to float when needed, and
+    values which are not numbers are kept in an object column.
+    """
+    def __init__(self, value, capacity):
+        self.dtype = self._dtype_of(value)
+        self.values = np.zeros(capacity, dtype=self.dtype)
+        self.mask = np.zeros(capacity, dtype=bool)
+
+    @staticmethod
+    def _dtype_of(value):
+        if isinstance(value, (bool, np.bool_)):
+            return np.dtype(bool)
+        if isinstance(value, numbers.Integral):
+            return np.dtype(np.int64)
+        if isinstance(value, numbers.Real):
+            return np.dtype(np.float64)
+        return np.dtype(object)
+
+    def _promote(self, value):
+        dtype = self._dtype_of(value)
+        if dtype == self.dtype or self.dtype == object or \
+                (self.dtype.kind == 'f' and dtype.kind == 'i'):
+            return
+        if {dtype.kind, self.dtype.kind} == {'i', 'f'}:
+            dtype = np.dtype(np.float64)
+        else:
+            dtype = np.dtype(object)
+        self.values, self.dtype = self.values.astype(dtype), dtype
+
+    def set(self, row, value):
+        self._promote(value)
+        self.values[row] = value
+        self.mask[row] = True
+
+    def resize(self, capacity):
+        values = np.zeros(capacity, dtype=self.dtype)
+        mask = np.zeros(capacity, dtype=bool)
+        values[:len(self.values)] = self.values
+        mask[:len(self.mask)] = self.mask
+        self.values, self.mask = values, mask
+
+
+class TrainingHistory(Mapping):
+    """Columnar store of the results reported by the training tasks.
+
+    Each reported attribute is kept in one growable NumPy array, along with the
+    task id and the step (index of the report within the task) of each row.
+    The store also behaves like the former `OrderedDict` of task id to the list
+    of reported results, e.g. `history[task_id][-1]['accuracy']`.
+
+    Examples
+    --------
+    >>> history = TrainingHistory()
+    >>> history.append(0, {'epoch': 1, 'accuracy': 0.5})
+    >>> history.append(0, {'epoch': 2, 'accuracy': 0.7})
+    >>> history.append(1, {'epoch': 1, 'accuracy': 0.6})
+    >>> history.best_so_far('accuracy')
+    array([0.5, 0.7, 0.7])
+    >>> history.last_values('accuracy')
+    (array([0, 1]), array([0.7, 0.6]))
+    >>> history.values_at('accuracy', 'epoch', 1)
+    (array([0, 1]), array([0.5, 0.6]))
+    """
+    def __init__(self, capacity=1024):
+        self._size = 0
+        self._capacity = capacity
+        self._task_ids = np.zeros(capacity, dtype=np.int64)
+        self._steps = np.zeros(capacity, dtype=np.int64)
+        self._columns = OrderedDict()
+        self._num_reports = OrderedDict()
+
+    def append(self, task_id, reported_result):
+        """Append a result reported by a task
+        """
+        task_id = int(task_id)
+        if self._size == self._capacity:
+            self._grow()
+        row = self._size
+        self._task_ids[row] = task_id
+        self._steps[row] = self._num_reports.get(task_id, 0)
+        self._num_reports[task_id] = int(self._steps[row]) + 1
+        for k, v in reported_result.items():
+            if k not in self._columns:
+                self._columns[k] = _Column(v, self._capacity)
+            self._columns[k].set(row, v)
+        self._size += 1
+
+    def _grow(self):
+        self._capacity *= 2
+        self._task_ids = np.resize(self._task_ids, self._capacity)
+        self._steps = np.resize(self._steps, self._capacity)
+        for column in self._columns.values():
+            column.resize(self._capacity)
+
+    @property
+    def num_reports(self):
+        return self._size
+
+    @property
+    def metrics(self):
+        return list(self._columns.keys())
+
+    def column(self, metric):
+        """Task ids, steps and values of the rows where `metric` was reported
+        """
+        column = self._columns[metric]
+        rows = np.flatnonzero(column.mask[:self._size])
+        return self._task_ids[rows], self._steps[rows], column.values[rows]
+
+    def best_so_far(self, metric, mode='max'):
+        """Best value of `metric` reported so far, after each report of it
+        """
+        _, _, values = self.column(metric)
+        accumulate = np.maximum.accumulate if mode == 'max' else np.minimum.accumulate
+        return accumulate(values.astype(np.float64))
+
+    def last_values(self, metric):
+        """Task ids and the last reported value of `metric` for each task
+        """
+        task_ids, _, values = self.column(metric)
+        # first occurrence in the reversed rows is the last report of each task
+        unique_ids, index = np.unique(task_ids[::-1], return_index=True)
+        return unique_ids, values[::-1][index]
+
+    def values_at(self, metric, time_attr, t):
+        """Task ids and values of `metric` in the reports where `time_attr` equals `t`
+        """
+        size = self._size
+        column, time_column = self._columns[metric], self._columns[time_attr]
+        rows = np.flatnonzero(column.mask[:size] & time_column.mask[:size] &
+                              (time_column.values[:size] == t))
+        return self._task_ids[rows], column.values[rows]
+
+    def _rows_to_dicts(self, rows):
+        results = [{} for _ in rows]
+        for k, column in self._columns.items():
+            mask = column.mask[rows]
+            values = column.values[rows].tolist()
+            for i in np.flatnonzero(mask):
+                results[i][k] = values[i]
+        return results
+
+    def __getitem__(self, task_id):
+        task_id = int(task_id)
+        if task_id not in self._num_reports:
+            raise KeyError(task_id)
+        rows = np.flatnonzero(self._task_ids[:self._size] == task_id)
+        return self._rows_to_dicts(rows)
+
+    def __contains__(self, task_id):
+        try:
+            return int(task_id) in self._num_reports
+        except (TypeError, ValueError):
+            return False
+
+    def __iter__(self):
+        return iter(self._num_reports)
+
+    def __len__(self):
+        return len(self._num_reports)
+
+    def items(self):
+        """Pairs of task id and list of reported results, grouping all rows at once
+        """
+        order = np.argsort(self._task_ids[:self._size], kind='stable')
+        results = self._rows_to_dicts(order)
+        sorted_ids = self._task_ids[order]
+        groups = {}
+        for task_id in self._num_reports:
+            start, end = np.searchsorted(sorted_ids, [task_id, task_id + 1])
+            groups[task_id] = results[start:end]
+        return [(task_id, groups[task_id]) for task_id in self._num_reports]
+
+    def values(self):
+        return [v for _, v in self.items()]
+
+    def to_dict(self):
+        """Plain `OrderedDict` of task id to the list of reported results
+        """
+        return OrderedDict(self.items())
+
+    def state_dict(self):
+        size = self._size
+        columns = OrderedDict()
+        for k, column in self._columns.items():
+            columns[k] = (column.values[:size].copy(), column.mask[:size].copy())
+        return {'task_ids': self._task_ids[:size].copy(),
+                'steps': self._steps[:size].copy(),
+                'columns': columns}
+
+    def load_state_dict(self, state_dict):
+        """Load from :meth:`state_dict`, or from the former json dump of task id
+        to the list of reported results.
+        """
+        self.__init__()
+        if isinstance(state_dict, (str, bytes)):
+            for task_id, results in json.loads(state_dict).items():
+                for reported_result in results:
+                    self.append(task_id, reported_result)
+            return
+        task_ids = state_dict['task_ids']
+        size = len(task_ids)
+        self._capacity = max(self._capacity, size)
+        self._size = size
+        self._task_ids = np.resize(task_ids, self._capacity)
+        self._steps = np.resize(state_dict['steps'], self._capacity)
+        for k, (values, mask) in state_dict['columns'].items():
+            column = _Column.__new__(_Column)
+            column.dtype = values.dtype
+            column.values, column.mask = values, mask
+            column.resize(self._capacity)
+            self._columns[k] = column
+        for task_id in task_ids.tolist():
+            self._num_reports[task_id] = self._num_reports.get(task_id, 0) + 1
+
+    def __repr__(self):
+        reprstr = self.__class__.__name__ + '(tasks: {}, reports: {}, metrics: {})'.format(
+            len(self), self._size, self.metrics)
+        return reprstr
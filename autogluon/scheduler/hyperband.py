@@ -1,13 +1,15 @@
 import pickle
+import inspect
 import logging
-import threading
+import functools
 import numpy as np
 import multiprocessing as mp
 
 from .fifo import FIFOScheduler
+from .scheduler import TaskScheduler
 from .hyperband_stopping import HyperbandStopping_Manager
 from .hyperband_promotion import HyperbandPromotion_Manager
-from .reporter import DistStatusReporter, DistSemaphore
+from .reporter import DistSemaphore
 from ..utils import DeprecationHelper
 
 __all__ = ['HyperbandScheduler', 'DistributedHyperbandScheduler',
@@ -31,6 +33,7 @@ class HyperbandScheduler(FIFOScheduler):
         Default arguments for launching train_fn.
     resource : dict
         Computation resources.  For example, `{'num_cpus':2, 'num_gpus':1}`
+        The optional 'numa' and 'memory' entries are described in :class:`FIFOScheduler`.
     searcher : object, optional
         Autogluon searcher.  For example, :class:`autogluon.searcher.RandomSearcher`
     time_attr : str
@@ -66,9 +69,12 @@ class HyperbandScheduler(FIFOScheduler):
                 associated with multiple tasks over its lifetime. It is never
                 terminated, but may be paused. Whenever a task becomes available,
                 it may promote a config to the next milestone, if better than most
-                others. If no config can be promoted, a new one is chosen. This
-                variant may benefit from pause&resume, which is not directly
-                supported here. As proposed in this paper (termed ASHA):
+                others. If no config can be promoted, a new one is chosen. If the
+                training function registers how to save and load its state (see
+                :meth:`StatusReporter.register_checkpoint`), its state is saved at
+                each milestone (in the checkpoint directory) and a promoted config
+                resumes from there, otherwise it is trained again from scratch.
+                As proposed in this paper (termed ASHA):
                 https://arxiv.org/abs/1810.05934
     keep_size_ratios : bool
         Implemented for type 'promotion' only. If True,
@@ -86,7 +92,23 @@ class HyperbandScheduler(FIFOScheduler):
         latent process there.
         NOTE: This could also be removed...
     dist_ip_addrs : list of str
-        IP addresses of remote machines.
+        IP addresses of remote machines, or :class:`SimulatedNode` simulating
+        nodes on this machine.
+    async_reports : bool
+        If True, `reporter(...)` calls in the training function do not wait for
+        the scheduler: reports are buffered and sent in batches, and the trial
+        is only interrupted when the scheduler decides to stop it.
+    result_cache : str or :class:`TrialResultCache` (optional)
+        Directory of a cache of the reports of finished trials, shared across
+        experiments. Trials of new configs which were evaluated before (with the
+        same `time_attr` and `max_t`) are replayed to the searcher and the
+        terminator instead of being trained again.
+    straggler_policy : str (optional)
+        If 'deprioritize', new tasks are placed on other nodes than the ones of
+        trials running much slower than the others first. Stragglers are only
+        logged by default.
+    straggler_threshold : float
+        Slowdown compared to the median trial above which a trial is a straggler.
 
     See Also
     --------
@@ -130,12 +152,20 @@ class HyperbandScheduler(FIFOScheduler):
                  type='stopping',
                  dist_ip_addrs=None,
                  keep_size_ratios=False,
-                 maxt_pending=False):
+                 maxt_pending=False,
+                 async_reports=False,
+                 result_cache=None,
+                 straggler_policy=None,
+                 straggler_threshold=3.0):
+        assert straggler_policy != 'migrate', \
+            'Hyperband tasks cannot be migrated, use type promotion to resume configs'
         super(HyperbandScheduler, self).__init__(
             train_fn=train_fn, args=args, resource=resource, searcher=searcher,
             search_options=search_options, checkpoint=checkpoint, resume=resume,
             num_trials=num_trials, time_out=time_out, max_reward=max_reward, time_attr=time_attr,
-            reward_attr=reward_attr, visualizer=visualizer, dist_ip_addrs=dist_ip_addrs)
+            reward_attr=reward_attr, visualizer=visualizer, dist_ip_addrs=dist_ip_addrs,
+            async_reports=async_reports, result_cache=result_cache,
+            straggler_policy=straggler_policy, straggler_threshold=straggler_threshold)
         self.max_t = max_t
         self.type = type
         self.maxt_pending = maxt_pending
@@ -167,11 +197,16 @@ class HyperbandScheduler(FIFOScheduler):
         - resume_from: config promoted from this milestone
         - milestone: config promoted to this milestone (next from resume_from)
         """
-        cls = HyperbandScheduler
-        cls.RESOURCE_MANAGER._request(task.resources)
+        cache_key, cached_results = self._lookup_result_cache(task, **kwargs)
+        if cached_results is None:
+            self._request_resources(task)
         # reporter and terminator
-        reporter = DistStatusReporter()
         terminator_semaphore = DistSemaphore(0)
+        # the arguments of the task are kept to run it again if its node is lost
+        reporter = self._add_report_stream(
+            task, functools.partial(self._on_task_report, task, {'kwargs': kwargs},
+                                    terminator_semaphore),
+            cache_key, cached_results)
         task.args['reporter'] = reporter
         task.args['terminator_semaphore'] = terminator_semaphore
 
@@ -192,45 +227,57 @@ class HyperbandScheduler(FIFOScheduler):
             # Promotion of config
             # This is a signal towards train_fn, in case it supports
             # pause and resume:
-            task.args['resume_from'] = kwargs['resume_from']
+            if self._accepts_resume_from:
+                task.args['resume_from'] = kwargs['resume_from']
             next_milestone = kwargs['milestone']
             logger.debug("Promotion task (next milestone = {}):\n{}".format(
                 next_milestone, task))
             self.searcher.register_pending(
                 task.args['config'], next_milestone)
 
+        if self.type == 'promotion' and self._checkpoint is not None:
+            reporter.checkpoint = {
+                'dir': self._trial_checkpoint_dir(task.args['config']),
+                'time_attr': self._time_attr,
+                'milestones': [m for m in milestones if m < self.max_t],
+                'resume_from': kwargs.get('resume_from')}
+
         # main process
-        job = cls._start_distributed_job(task, cls.RESOURCE_MANAGER, self.env_sem)
-        # reporter thread
-        rp = threading.Thread(target=self._run_reporter,
-                              args=(task, job, reporter, self.searcher, self.terminator,
-                                    None, terminator_semaphore), daemon=False)
-        rp.start()
+        job = self._start_job(task, reporter, cached_results)
+        job.add_done_callback(lambda fut: self._dispatcher.end_stream(reporter))
         task_dict = self._dict_from_task(task)
-        task_dict.update({'Task': task, 'Job': job, 'ReporterThread': rp})
+        task_dict.update({'Task': task, 'Job': job, 'Reporter': reporter})
         # checkpoint thread
         if self._checkpoint is not None:
             def _save_checkpoint_callback(fut):
                 self._cleaning_tasks()
-                self.save()
+                self._checkpoint_journal()
             job.add_done_callback(_save_checkpoint_callback)
 
         with self.LOCK:
             self.scheduled_tasks.append(task_dict)
+        if self._deadline_passed.is_set():
+            self._preempt_task(task)
 
-    def _run_reporter(self, task, task_job, reporter, searcher, terminator,
-                      checkpoint_semaphore, terminator_semaphore):
-        last_result = None
-        last_updated = None
-        while not task_job.done():
-            reported_result = reporter.fetch()
-            if reported_result.get('done', False):
-                reporter.move_on()
-                terminator_semaphore.release()
-                terminator.on_task_complete(task, last_result)
-                if checkpoint_semaphore is not None:
-                    checkpoint_semaphore.release()
-                break
+    def _on_task_report(self, task, state, terminator_semaphore, reporter,
+                        reported_result):
+        """Handle a report of a running task, called by the report dispatcher.
+        `reported_result` is None once the job is done. Returns True when no
+        more reports are expected from the task.
+        """
+        searcher, terminator = self.searcher, self.terminator
+        if reported_result is None:
+            # the job ended without a final report, e.g. it was stopped at the deadline
+            terminator.on_task_remove(task)
+            if task.task_id in self._migrated_tasks:
+                # its node was lost, the same evaluation runs in a new task
+                self._resubmit(task, **state['kwargs'])
+                return True
+        elif reported_result.get('done', False):
+            reporter.move_on()
+            terminator_semaphore.release()
+            terminator.on_task_complete(task, state.get('last_result'))
+        else:
             # Call before _add_training_results, since we may be able to report
             # extra information from the bracket
             task_continues, update_searcher, next_milestone, bracket_id, rung_counts = \
@@ -245,44 +292,78 @@ class HyperbandScheduler(FIFOScheduler):
             if update_searcher and task_continues:
                 # Update searcher with intermediate result
                 # Note: If task_continues is False here, we also call
-                # searcher.update, but outside the loop.
-                searcher.update(
+                # searcher.update, but once the task is finished.
+                self._update_searcher(
                     config=task.args['config'],
                     reward=reported_result[self._reward_attr],
                     **reported_result)
-                last_updated = reported_result
+                state['last_updated'] = reported_result
                 if next_milestone is not None:
                     searcher.register_pending(
                         task.args['config'], next_milestone)
-            last_result = reported_result
+            state['last_result'] = reported_result
             if task_continues:
                 reporter.move_on()
+                return False
+            # Note: The 'terminated' signal is sent even in the promotion
+            # variant. It means that the *task* terminates, while the evaluation
+            # of the config is just paused
+            reported_result['terminated'] = True
+            if self.type == 'stopping' or \
+                    reported_result[self._time_attr] >= self.max_t:
+                act_str = 'terminating'
             else:
-                # Note: The 'terminated' signal is sent even in the promotion
-                # variant. It means that the *task* terminates, while the evaluation
-                # of the config is just paused
-                last_result['terminated'] = True
-                if self.type == 'stopping' or \
-                        reported_result[self._time_attr] >= self.max_t:
-                    act_str = 'terminating'
-                else:
-                    act_str = 'pausing'
-                logger.debug(
-                    'Stopping task ({} evaluation, resource = {}):\n{}'.format(
-                        act_str, reported_result[self._time_attr], task))
-                terminator_semaphore.release()
-                terminator.on_task_remove(task)
-                #task_process.join()
-                if checkpoint_semaphore is not None:
-                    checkpoint_semaphore.release()
-                break
+                act_str = 'pausing'
+            logger.debug(
+                'Stopping task ({} evaluation, resource = {}):\n{}'.format(
+                    act_str, reported_result[self._time_attr], task))
+            terminator_semaphore.release()
+            terminator.on_task_remove(task)
         # Pass all of last_result to searcher (unless this has already been
         # done)
-        if last_result is not last_updated:
+        last_result = state.get('last_result')
+        if last_result is not None and last_result is not state.get('last_updated'):
             last_result['done'] = True
-            searcher.update(
+            self._mark_preempted(task, last_result)
+            self._update_searcher(
                 config=task.args['config'],
                 reward=last_result[self._reward_attr], **last_result)
+        elif reported_result is None or reported_result.get('done', False):
+            # no final update, e.g. the training function failed before the
+            # next milestone it was registered as pending for
+            self._evaluation_failed(task.args['config'])
+        return True
+
+    @property
+    def _accepts_resume_from(self):
+        fn = getattr(self.train_fn, 'f', self.train_fn)
+        try:
+            parameters = inspect.signature(fn).parameters.values()
+        except (TypeError, ValueError):
+            return False
+        return any(p.name == 'resume_from' or p.kind == p.VAR_KEYWORD for p in parameters)
+
+    def _migrate_tasks_on(self, remotes):
+        # stopped tasks are not resubmitted: they are left to finish
+        TaskScheduler._migrate_tasks_on(self, remotes)
+
+    def _requeue_lost_tasks(self, remotes, jobs):
+        # the tasks cannot be stopped on a lost node, their jobs are finished
+        # and they are resubmitted with the same bracket (or promotion)
+        if self._deadline_passed.is_set():
+            return
+        with self.LOCK:
+            task_ids = [t['TASK_ID'] for t in self.scheduled_tasks if t['Job'] in jobs]
+        with self._state_lock:
+            self._migrated_tasks.update(task_ids)
+
+    def _cache_budget(self):
+        return {'time_attr': self._time_attr, 'max_t': self.max_t}
+
+    def _trial_completed(self, last_result):
+        # tasks are also terminated once they reach max_t
+        return last_result is None or not last_result.get('terminated', False) or \
+            last_result.get(self._time_attr, 0) >= self.max_t
 
     def state_dict(self, destination=None):
         """Returns a dictionary containing a whole state of the Scheduler
@@ -18,11 +18,10 @@ class HyperbandPromotion_Manager(object):
     bracket, until they get promoted, which means that a free task picks
     up their evaluation until the next milestone.
 
-    We do not directly support pause & resume here, so that in general,
-    the evaluation for a promoted config is started from scratch. However,
-    see Hyperband_Scheduler.add_task, task.args['resume_from']: the
-    evaluation function receives info about the promotion, so pause &
-    resume can be implemented there.
+    Pause & resume is implemented by the evaluation function: it saves its
+    state at milestones and loads it back when its config is promoted, see
+    :meth:`StatusReporter.register_checkpoint`. Otherwise, the evaluation for
+    a promoted config is started from scratch.
 
     Args:
         time_attr (str): A training result attr to use for comparing time.
@@ -0,0 +1,99 @@
+"""Append-only journal of scheduler state changes"""
+import os
+import pickle
+import logging
+import threading
+
+__all__ = ['CheckpointJournal']
+
+logger = logging.getLogger(__name__)
+
+
+class CheckpointJournal(object):
+    """Append-only journal of the changes made to the scheduler state since the
+    last checkpoint snapshot.
+
+    Each record is pickled as `(seq, kind, args)` and appended to the journal
+    file, so that recording an event costs O(1) regardless of the size of the
+    experiment. The snapshot stores the sequence number of the last record it
+    includes, and the journal is truncated after each snapshot (compaction).
+    Records of a truncated tail (e.g. the process died while writing) are ignored.
+    The records appended after a resume are numbered after those of the
+    snapshot, given as `seq` or by :meth:`replay`.
+
+    Parameters
+    ----------
+    path : str
+        Path of the journal file.
+    seq : int
+        Sequence number of the last record, e.g. the last one of the snapshot.
+
+    Examples
+    --------
+    >>> journal = CheckpointJournal('exp/checkpoint.ag.journal')
+    >>> journal.append('result', 0, {'accuracy': 0.5})
+    >>> for seq, kind, args in journal.replay():
+    ...     print(seq, kind, args)
+    """
+    def __init__(self, path, seq=0):
+        self.path = path
+        self.lock = threading.RLock()
+        self.seq = seq
+        self.size = 0
+        self._file = None
+
+    def append(self, kind, *args):
+        with self.lock:
+            if self._file is None:
+                dirname = os.path.dirname(self.path)
+                if dirname:
+                    os.makedirs(dirname, exist_ok=True)
+                self._file = open(self.path, 'ab')
+            self.seq += 1
+            data = pickle.dumps((self.seq, kind, args))
+            self._file.write(data)
+            self._file.flush()
+            self.size += len(data)
+
+    def replay(self, after=0):
+        """Iterate over the records with a sequence number larger than `after`.
+        The next records are numbered after `after` and after the replayed ones.
+        """
+        with self.lock:
+            self.seq = max(self.seq, after)
+        if not os.path.isfile(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            while True:
+                try:
+                    seq, kind, args = pickle.load(f)
+                except EOFError:
+                    break
+                except (pickle.UnpicklingError, ValueError, AttributeError) as e:
+                    logger.warning('Ignoring the truncated tail of journal {}: {}'.format(
+                        self.path, e))
+                    break
+                self.seq = max(self.seq, seq)
+                if seq > after:
+                    yield seq, kind, args
+
+    def reset(self):
+        """Truncate the journal, after its records were compacted into a snapshot
+        """
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if os.path.isfile(self.path):
+                os.remove(self.path)
+            self.size = 0
+
+    def close(self):
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __repr__(self):
+        reprstr = self.__class__.__name__ + '(path: {}, seq: {})'.format(self.path, self.seq)
+        return reprstr
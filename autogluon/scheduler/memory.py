@@ -0,0 +1,67 @@
+"""Estimation of the memory of the trials from their measured peak RSS"""
+import json
+import logging
+import threading
+
+from .result_cache import _canonical
+
+__all__ = ['PeakMemoryEstimator']
+
+logger = logging.getLogger(__name__)
+
+
+class PeakMemoryEstimator(object):
+    """Estimates the memory needed by a trial from the peak resident memory of
+    the previous trials of its config family.
+
+    The family of a config is made of its non-float values (e.g. the network,
+    the batch size or the number of layers), which determine the size of the
+    model and of the batches, while continuous hyperparameters like the learning
+    rate do not change the memory footprint. The estimate is the largest peak
+    RSS measured in the family, times `margin`.
+
+    Parameters
+    ----------
+    margin : float
+        Factor applied to the measured peak RSS.
+
+    Examples
+    --------
+    >>> estimator = PeakMemoryEstimator()
+    >>> estimator.add({'net': 'resnet50', 'lr': 0.1}, 3 * 1024 ** 3)
+    >>> estimator.estimate({'net': 'resnet50', 'lr': 0.01})
+    3865470566
+    """
+    def __init__(self, margin=1.2):
+        self.margin = margin
+        self._lock = threading.Lock()
+        self._peaks = {}
+
+    @staticmethod
+    def family(config):
+        """Key of the family of a config
+        """
+        values = {k: v for k, v in config.items() if not isinstance(v, float)}
+        return json.dumps(values, sort_keys=True, default=_canonical)
+
+    def add(self, config, peak_rss):
+        """Record the peak RSS (in bytes) of a finished trial
+        """
+        key = self.family(config)
+        with self._lock:
+            self._peaks[key] = max(self._peaks.get(key, 0), peak_rss)
+
+    def estimate(self, config):
+        """Memory (in bytes) needed by a trial of the config, None if no trial
+        of its family was measured
+        """
+        with self._lock:
+            peak = self._peaks.get(self.family(config))
+        if peak is None:
+            return None
+        return int(peak * self.margin)
+
+    def __repr__(self):
+        reprstr = self.__class__.__name__ + '(margin: {}, families: {})'.format(
+            self.margin, len(self._peaks))
+        return reprstr
@@ -1,4 +1,7 @@
 # remotes
 from .remote import *
 from .ssh_helper import *
+from .file_sync import *
+from .heartbeat import *
+from .simulation import *
 from .remote_manager import *
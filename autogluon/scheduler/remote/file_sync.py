@@ -0,0 +1,186 @@
+"""Content-addressed synchronization of files to the nodes"""
+import os
+import stat
+import uuid
+import zlib
+import shutil
+import hashlib
+import logging
+import threading
+from multiprocessing.pool import ThreadPool
+
+__all__ = ['FileSync']
+
+logger = logging.getLogger(__name__)
+
+IMPORTABLE_EXTENSIONS = ('.py', '.egg', '.zip', '.pyz')
+
+
+def _blob_path(store_dir, digest):
+    store_dir = os.path.expanduser(store_dir)
+    return os.path.join(store_dir, digest[:2], digest)
+
+
+def _missing_blobs(store_dir, digests):
+    """Digests of the blobs which are not in the store of the node
+    """
+    return [d for d in digests if not os.path.isfile(_blob_path(store_dir, d))]
+
+
+def _part_path(store_dir, digest, transfer):
+    # each transfer, and each worker process of the node, writes its own
+    # partial file: nodes of the same process may share the store
+    return '{}.{}.{}.part'.format(_blob_path(store_dir, digest), transfer, os.getpid())
+
+
+def _write_chunk(store_dir, digest, transfer, offset, data):
+    part = _part_path(store_dir, digest, transfer)
+    os.makedirs(os.path.dirname(part), exist_ok=True)
+    with open(part, 'r+b' if offset > 0 else 'wb') as f:
+        f.seek(offset)
+        f.write(zlib.decompress(data))
+
+
+def _commit_blob(store_dir, digest, transfer):
+    """Move a complete partial file into the store, after checking its content
+    """
+    path = _blob_path(store_dir, digest)
+    part = _part_path(store_dir, digest, transfer)
+    sha = hashlib.sha256()
+    with open(part, 'rb') as f:
+        for block in iter(lambda: f.read(1024 ** 2), b''):
+            sha.update(block)
+    if sha.hexdigest() != digest:
+        os.remove(part)
+        raise IOError('Corrupted transfer of blob {}'.format(digest))
+    # the blobs are hard linked into the working directories: read-only, so
+    # that writing to a synchronized file cannot corrupt the store
+    os.chmod(part, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+    os.replace(part, path)
+
+
+def _materialize(store_dir, files, load, dask_worker=None):
+    """Atomically place the blobs into the working directory of the worker,
+    under their file names
+    """
+    directory = dask_worker.local_directory if dask_worker is not None else os.getcwd()
+    for name, digest in files:
+        blob = _blob_path(store_dir, digest)
+        dest = os.path.join(directory, name)
+        if not (os.path.exists(dest) and os.path.samefile(blob, dest)):
+            tmp = '{}.{}.tmp'.format(dest, uuid.uuid4().hex)
+            try:
+                os.link(blob, tmp)
+            except OSError:
+                # the store is on another file system
+                shutil.copyfile(blob, tmp)
+            os.replace(tmp, dest)
+        if load and os.path.splitext(name)[1] in IMPORTABLE_EXTENSIONS:
+            from distributed.utils import import_file
+            import_file(dest)
+
+
+class FileSync(object):
+    """Synchronizes files to the nodes through a content-addressed store.
+
+    The files are identified by the sha256 of their content. Each node keeps
+    the files it received in a store (`store_dir` on the node), shared by the
+    experiments: only the files which a node does not have yet are sent,
+    compressed and in chunks, and the nodes are synchronized in parallel. The
+    files are then hard linked (or copied) into the working directory of the
+    Dask workers, which is on their `sys.path`, like Dask's `upload_file`.
+
+    Parameters
+    ----------
+    store_dir : str
+        Directory of the store on the nodes.
+    chunk_size : int
+        Bytes of a file sent at once.
+    compress_level : int
+        zlib compression level of the chunks.
+    max_parallel : int
+        Number of nodes synchronized at the same time.
+
+    Examples
+    --------
+    >>> sync = FileSync()
+    >>> sync.sync(RemoteManager.get_remotes(), ['train.py', 'data.rec'])
+    """
+    def __init__(self, store_dir='~/.autogluon/file_store', chunk_size=16 * 1024 ** 2,
+                 compress_level=1, max_parallel=8):
+        self.store_dir = store_dir
+        self.chunk_size = chunk_size
+        self.compress_level = compress_level
+        self.max_parallel = max_parallel
+        self._lock = threading.Lock()
+        self._digests = {}
+
+    def digest(self, path):
+        """sha256 of a file, cached while its size and modification time do not change
+        """
+        path = os.path.abspath(os.path.expanduser(path))
+        st = os.stat(path)
+        key = (path, st.st_size, st.st_mtime_ns)
+        with self._lock:
+            digest = self._digests.get(key)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 ** 2), b''):
+                    sha.update(block)
+            digest = sha.hexdigest()
+            with self._lock:
+                self._digests[key] = digest
+        return digest
+
+    def sync(self, remotes, files, load=True):
+        """Make the files available in the working directory of the workers of
+        the nodes. `.py`, `.egg` and `.zip` files are imported if `load`.
+        Returns the number of bytes sent to each node.
+        """
+        files = [files] if isinstance(files, str) else list(files)
+        entries = [(os.path.basename(f), self.digest(f), os.path.expanduser(f)) for f in files]
+        remotes = list(remotes)
+        if len(remotes) == 0 or len(entries) == 0:
+            return {}
+        pool = ThreadPool(min(self.max_parallel, len(remotes)))
+        try:
+            sent = pool.map(lambda remote: self._sync_node(remote, entries, load), remotes)
+        finally:
+            pool.close()
+        return {remote: nbytes for remote, nbytes in zip(remotes, sent)}
+
+    def _sync_node(self, remote, entries, load):
+        paths = {digest: path for _, digest, path in entries}
+        missing = set()
+        for worker_missing in remote.run(_missing_blobs, self.store_dir, list(paths)).values():
+            missing.update(worker_missing)
+        nbytes = 0
+        for digest in sorted(missing):
+            nbytes += self._send_blob(remote, digest, paths[digest])
+        remote.run(_materialize, self.store_dir,
+                   [(name, digest) for name, digest, _ in entries], load)
+        logger.debug('Synchronized {} files to {}, sent {} blobs ({} bytes)'.format(
+            len(entries), remote, len(missing), nbytes))
+        return nbytes
+
+    def _send_blob(self, remote, digest, path):
+        nbytes = 0
+        offset = 0
+        transfer = uuid.uuid4().hex
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+                data = zlib.compress(chunk, self.compress_level)
+                remote.run(_write_chunk, self.store_dir, digest, transfer, offset, data)
+                nbytes += len(data)
+                offset += len(chunk)
+                if len(chunk) < self.chunk_size:
+                    break
+        remote.run(_commit_blob, self.store_dir, digest, transfer)
+        return nbytes
+
+    def __repr__(self):
+        reprstr = self.__class__.__name__ + '(store_dir: {}, files: {})'.format(
+            self.store_dir, len(self._digests))
+        return reprstr
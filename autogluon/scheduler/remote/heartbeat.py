@@ -0,0 +1,136 @@
+"""Heartbeats of the nodes, to detect the nodes which are lost"""
+import os
+import time
+import logging
+import threading
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+
+__all__ = ['HeartbeatMonitor']
+
+logger = logging.getLogger(__name__)
+
+_HEARTBEATS = {}
+_HEARTBEATS_LOCK = threading.Lock()
+
+
+def _start_heartbeat(address, authkey, node_id, interval):
+    """Connect to the monitor and start sending the heartbeats of the node,
+    run by the workers of the node
+    """
+    key = (address, node_id)
+    with _HEARTBEATS_LOCK:
+        thread = _HEARTBEATS.get(key)
+        if thread is not None and thread.is_alive():
+            return
+        conn = Client(address, authkey=authkey)
+        conn.send(node_id)
+        thread = threading.Thread(target=_send_heartbeats, args=(conn, interval), daemon=True)
+        _HEARTBEATS[key] = thread
+        thread.start()
+
+
+def _send_heartbeats(conn, interval):
+    try:
+        while True:
+            time.sleep(interval)
+            conn.send(None)
+    except (OSError, EOFError):
+        pass
+
+
+class HeartbeatMonitor(object):
+    """Detects the nodes which are lost, e.g. a machine which crashed or a
+    worker which died, before their jobs fail.
+
+    The workers of each watched node connect to the monitor and send a
+    heartbeat every `interval` seconds. A node is lost when its connection is
+    closed, or when it sent no heartbeat for `timeout` seconds, and
+    `on_lost(remote)` is then called. Each connection is served by a thread
+    blocked until the next heartbeat, so that the monitor is idle between
+    heartbeats.
+
+    Parameters
+    ----------
+    on_lost : callable
+        Called with the :class:`Remote` of a lost node.
+    interval : float
+        Seconds between the heartbeats of a node.
+    timeout : float
+        Seconds without heartbeat after which a node is lost.
+    host : str
+        Address the nodes connect to.
+    """
+    def __init__(self, on_lost, interval=1.0, timeout=10.0, host='127.0.0.1'):
+        self.on_lost = on_lost
+        self.interval = interval
+        self.timeout = timeout
+        self._authkey = os.urandom(32)
+        self._listener = Listener((host, 0), authkey=self._authkey)
+        self.address = self._listener.address
+        self._lock = threading.Lock()
+        self._nodes = {}
+        self._next_id = 0
+        self._closed = False
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def watch(self, remote):
+        """Start the heartbeats of a node
+        """
+        with self._lock:
+            node_id = self._next_id
+            self._next_id += 1
+            self._nodes[node_id] = remote
+        try:
+            remote.run(_start_heartbeat, self.address, self._authkey, node_id, self.interval)
+        except Exception:
+            self.unwatch(remote)
+            raise
+
+    def unwatch(self, remote):
+        """Stop watching a node, e.g. before shutting it down
+        """
+        with self._lock:
+            for node_id in [k for k, v in self._nodes.items() if v is remote]:
+                del self._nodes[node_id]
+
+    def close(self):
+        with self._lock:
+            self._nodes = {}
+        self._closed = True
+        self._listener.close()
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError) as e:
+                if not self._closed:
+                    logger.warning('Rejected a heartbeat connection: {!r}'.format(e))
+                continue
+            threading.Thread(target=self._receive, args=(conn,), daemon=True).start()
+
+    def _receive(self, conn):
+        node_id = None
+        try:
+            node_id = conn.recv()
+            while conn.poll(self.timeout):
+                conn.recv()
+            reason = 'no heartbeat for {}s'.format(self.timeout)
+        except (OSError, EOFError):
+            reason = 'connection closed'
+        conn.close()
+        with self._lock:
+            remote = self._nodes.pop(node_id, None)
+        if remote is None:
+            return
+        logger.warning('Lost {} ({})'.format(remote, reason))
+        try:
+            self.on_lost(remote)
+        except Exception:
+            logger.exception('Error while handling the loss of {}'.format(remote))
+
+    def __repr__(self):
+        reprstr = self.__class__.__name__ + '(address: {}, nodes: {})'.format(
+            self.address, len(self._nodes))
+        return reprstr
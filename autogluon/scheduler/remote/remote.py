@@ -4,38 +4,76 @@ import signal
 import logging
 import subprocess
 import concurrent
+from queue import Queue
 from threading import Thread 
 import multiprocessing as mp
-from distributed import Client
+from distributed import Client, default_client
 
 from .ssh_helper import start_scheduler, start_worker
+from .file_sync import FileSync
 
 __all__ = ['Remote']
 
 logger = logging.getLogger(__name__)
 
+# the threads of a node only supervise the trial processes: there are more
+# threads than CPUs, for the trials sharing a CPU (fractional resources)
+THREADS_PER_CPU = 4
+
+
+def _has_default_client():
+    try:
+        default_client()
+        return True
+    except ValueError:
+        return False
+
+
 class Remote(Client):
     LOCK = mp.Lock()
     REMOTE_ID = mp.Value('i', 0)
+    FILE_SYNC = FileSync()
     def __init__(self, remote_ip=None, port=None, local=False, ssh_username=None,
             ssh_port=22, ssh_private_key=None, remote_python=None,
-            remote_dask_worker="distributed.cli.dask_worker"):
+            remote_dask_worker="distributed.cli.dask_worker", timeout=None,
+            capacity=None, processes=False):
         self.service = None
+        # resources of the node, reported by its readiness probe
+        self.resources = None
+        # resources advertised instead of those of the machine, see SimulatedNode
+        self.capacity = capacity
+        # only the first node (the master) is the default client, so that the
+        # nodes added later do not take over the queues of the experiment
+        set_as_default = not _has_default_client()
         if not local:
             remote_addr = (remote_ip + ':{}'.format(port))
             self.service = DaskRemoteService(remote_ip, port, ssh_username,
                                       ssh_port, ssh_private_key, remote_python,
                                       remote_dask_worker)
-            super(Remote, self).__init__(remote_addr)
+            try:
+                super(Remote, self).__init__(remote_addr, set_as_default=set_as_default,
+                                             **({} if timeout is None else {'timeout': timeout}))
+            except Exception:
+                self.service.shutdown()
+                raise
         else:
-            super(Remote, self).__init__(processes=False)
+            num_cpus = (capacity or {}).get('num_cpus') or mp.cpu_count()
+            kwargs = {} if capacity is None else {'dashboard_address': None}
+            if remote_ip is not None:
+                # the scheduler of the local node holds the queues of the
+                # experiment, which the trials on the other nodes connect to
+                kwargs.update(host=remote_ip, protocol='tcp://', scheduler_port=0)
+            super(Remote, self).__init__(processes=processes, n_workers=1,
+                                         threads_per_worker=num_cpus * THREADS_PER_CPU,
+                                         set_as_default=set_as_default, **kwargs)
         with Remote.LOCK:
             self.remote_id = Remote.REMOTE_ID.value
             Remote.REMOTE_ID.value += 1
 
-    def upload_files(self, files, **kwargs):
-        for filename in files:
-            self.upload_file(filename, **kwargs)
+    def upload_files(self, files, load=True):
+        """Send the files the node does not have yet, see :class:`FileSync`
+        """
+        return self.FILE_SYNC.sync([self], files, load)[self]
 
     def shutdown(self):
         self.close()
@@ -72,6 +110,8 @@ class DaskRemoteService(object):
         self.remote_python = remote_python
         self.remote_dask_worker = remote_dask_worker
         self.monitor_thread = Thread()
+        # output of the scheduler and of the worker
+        self.output_queue = Queue()
 
         # Start the scheduler node
         self.scheduler = start_scheduler(
@@ -81,6 +121,7 @@ class DaskRemoteService(object):
             ssh_port,
             ssh_private_key,
             remote_python,
+            output_queue=self.output_queue,
         )
         # Start worker nodes
         self.worker = start_worker(
@@ -92,40 +133,37 @@ class DaskRemoteService(object):
                 self.ssh_private_key,
                 self.remote_python,
                 self.remote_dask_worker,
+                THREADS_PER_CPU,
+                output_queue=self.output_queue,
             )
         self.start_monitoring()
 
     def start_monitoring(self):
         if self.monitor_thread.is_alive():
             return
-        self.monitor_thread = Thread(target=self.monitor_remote_processes)
+        self.monitor_thread = Thread(target=self.monitor_remote_processes, daemon=True)
         self.monitor_thread.start()
 
     def monitor_remote_processes(self):
-        all_processes = [self.scheduler, self.worker]
+        """Print the output of the remote processes, waiting for it without polling
+        """
         try:
             while True:
-                for process in all_processes:
-                    while not process["output_queue"].empty():
-                        try:
-                            msg = process["output_queue"].get()
-                            if 'distributed.' not in msg:
-                                print(msg)
-                        except Exception:
-                            break
-                # Kill some time and free up CPU
-                time.sleep(0.1)
-
+                msg = self.output_queue.get()
+                if msg is None:
+                    break
+                if 'distributed.' not in msg:
+                    print(msg)
         except KeyboardInterrupt:
             self.shutdown()
 
     def shutdown(self):
-        import tornado
         all_processes = [self.worker, self.scheduler]
 
         for process in all_processes:
             process["input_queue"].put("shutdown")
             process["thread"].join()
+        self.output_queue.put(None)
 
     def __enter__(self):
         return self
@@ -1,11 +1,16 @@
 import os
+import time
 import socket
 import logging
 from threading import Thread 
 import multiprocessing as mp
+from multiprocessing.pool import ThreadPool
 
 from .remote import Remote
-from ...utils import warning_filter
+from .heartbeat import HeartbeatMonitor
+from .simulation import SimulatedNode
+from ..resource import get_remote_resources
+from ...utils import warning_filter, raise_num_file
 
 __all__ = ['RemoteManager']
 
@@ -26,6 +31,19 @@ def get_ip():
 
 class RemoteManager(object):
     NODES = {}
+    UPLOADED_FILES = []
+    # nodes being started
+    STARTING = set()
+    # seconds for a node to start and to answer its readiness probe
+    NODE_TIMEOUT = 120
+    MAX_PARALLEL_STARTS = 32
+    # seconds between the heartbeats of the nodes, and without heartbeat
+    # before a node is lost
+    HEARTBEAT_INTERVAL = 1.0
+    HEARTBEAT_TIMEOUT = 10.0
+    HEARTBEAT = None
+    # called with the lost nodes
+    LOST_CALLBACKS = []
     LOCK = mp.Lock()
     PORT_ID = mp.Value('i', 8700)
     MASTER_IP = None
@@ -34,7 +52,11 @@ class RemoteManager(object):
         # Singleton
         if cls.__instance is None:
             cls.__instance = object.__new__(cls)
+            # the nodes and trials open many sockets and pipes
+            raise_num_file()
             cls.MASTER_IP = get_ip()
+            cls.HEARTBEAT = HeartbeatMonitor(cls._node_lost, cls.HEARTBEAT_INTERVAL,
+                                             cls.HEARTBEAT_TIMEOUT, cls.MASTER_IP)
             cls.start_local_node()
         return cls.__instance
 
@@ -60,32 +82,181 @@ class RemoteManager(object):
         return list(cls.NODES.values())
 
     @classmethod
-    def upload_files(cls, files, **kwargs):
+    def upload_files(cls, files, load=True):
+        """Send the files to all the nodes in parallel, only those a node does
+        not have yet. The nodes added later receive them as well.
+        """
         if isinstance(files, str):
             files = [files]
-        for node in cls.NODES.values():
-            node.upload_files(files, **kwargs)
+        with cls.LOCK:
+            cls.UPLOADED_FILES.append((list(files), load))
+            nodes = list(cls.NODES.values())
+        Remote.FILE_SYNC.sync(nodes, files, load)
 
     @classmethod
-    def add_remote_nodes(cls, ip_addrs):
-        ip_addrs = [ip_addrs] if isinstance(ip_addrs, str) else ip_addrs
-        remotes = []
+    def add_remote_nodes(cls, ip_addrs, timeout=None, on_ready=None):
+        """Start Dask workers on the machines of the given IP addresses. Started
+        :class:`Remote` nodes or :class:`SimulatedNode` can be passed instead,
+        e.g. local nodes standing in for remote machines.
+
+        The nodes are started concurrently. A node is ready once its workers
+        answer a probe, which reports its resources, and `on_ready(remote)` is
+        then called right away, so that it can run tasks before the other nodes
+        are ready. Nodes which fail or are not ready within `timeout` seconds
+        (`NODE_TIMEOUT` by default) are reported and skipped. Returns the nodes
+        which are ready.
+        """
+        ip_addrs = [ip_addrs] if isinstance(ip_addrs, (str, Remote, SimulatedNode)) else ip_addrs
+        timeout = cls.NODE_TIMEOUT if timeout is None else timeout
+        pending = []
         for node_ip in ip_addrs:
-            if node_ip in cls.NODES.keys():
-                logger.warning('Already added remote {}'.format(node_ip))
-                continue
-            port = cls.get_port_id()
-            remote = Remote(node_ip, port)
+            if isinstance(node_ip, Remote):
+                remote, node_ip = node_ip, cls._node_key(node_ip)
+            elif isinstance(node_ip, SimulatedNode):
+                remote, node_ip = node_ip, node_ip.name
+            else:
+                remote = None
+            with cls.LOCK:
+                if node_ip in cls.NODES or node_ip in cls.STARTING:
+                    logger.warning('Already added remote {}'.format(node_ip))
+                    continue
+                cls.STARTING.add(node_ip)
+            pending.append((node_ip, remote))
+        if len(pending) == 0:
+            return []
+        pool = ThreadPool(min(cls.MAX_PARALLEL_STARTS, len(pending)))
+        try:
+            remotes = pool.map(lambda args: cls._start_node(*args, timeout, on_ready), pending)
+        finally:
+            pool.close()
+        failed = [node_ip for (node_ip, _), remote in zip(pending, remotes) if remote is None]
+        if len(failed) > 0:
+            logger.warning('Skipped {} of {} remotes: {}'.format(len(failed), len(pending), failed))
+        return [remote for remote in remotes if remote is not None]
+
+    @classmethod
+    def _create_remote(cls, node_ip, timeout):
+        return Remote(node_ip, cls.get_port_id(), timeout=timeout)
+
+    @classmethod
+    def _start_node(cls, node_ip, remote, timeout, on_ready):
+        """Start and probe a node, None if it failed or timed out
+        """
+        start_time = time.time()
+        try:
+            if isinstance(remote, SimulatedNode):
+                remote = remote.start()
+            elif remote is None:
+                remote = cls._create_remote(node_ip, timeout)
+            remaining = max(timeout - (time.time() - start_time), 0)
+            resources = get_remote_resources(remote, timeout=remaining)
+            resources.update(getattr(remote, 'capacity', None) or {})
+            remote.resources = resources
+            if cls.HEARTBEAT is not None:
+                cls.HEARTBEAT.watch(remote)
+            with cls.LOCK:
+                uploaded = list(cls.UPLOADED_FILES)
+            for files, load in uploaded:
+                Remote.FILE_SYNC.sync([remote], files, load)
             with cls.LOCK:
                 cls.NODES[node_ip] = remote
-            remotes.append(remote)
+            if on_ready is not None:
+                on_ready(remote)
+        except Exception as e:
+            logger.warning('Remote {} is not ready after {:.1f}s: {!r}'.format(
+                node_ip, time.time() - start_time, e))
+            with cls.LOCK:
+                cls.NODES.pop(node_ip, None)
+            if remote is not None:
+                cls._unwatch(remote)
+                try:
+                    remote.shutdown()
+                except Exception:
+                    pass
+            return None
+        finally:
+            with cls.LOCK:
+                cls.STARTING.discard(node_ip)
+        logger.info('Remote {} ready in {:.1f}s'.format(node_ip, time.time() - start_time))
+        return remote
+
+    @classmethod
+    def get_remote_nodes(cls, ip_addrs):
+        """Nodes of the given IP addresses (or :class:`Remote` nodes, or
+        :class:`SimulatedNode`)
+        """
+        ip_addrs = [ip_addrs] if isinstance(ip_addrs, (str, Remote, SimulatedNode)) else ip_addrs
+        remotes = []
+        for node_ip in ip_addrs:
+            if isinstance(node_ip, Remote):
+                if any(remote is node_ip for remote in cls.NODES.values()):
+                    remotes.append(node_ip)
+                    continue
+                node_ip = cls._node_key(node_ip)
+            elif isinstance(node_ip, SimulatedNode):
+                node_ip = node_ip.name
+            if node_ip not in cls.NODES:
+                logger.warning('Unknown remote {}'.format(node_ip))
+                continue
+            remotes.append(cls.NODES[node_ip])
         return remotes
+
+    @classmethod
+    def remove_remote_nodes(cls, ip_addrs):
+        """Shut down the nodes of the given IP addresses (or :class:`Remote`
+        nodes). The master node cannot be removed.
+        """
+        for remote in cls.get_remote_nodes(ip_addrs):
+            if remote is cls.get_master_node():
+                logger.warning('The master node cannot be removed')
+                continue
+            with cls.LOCK:
+                for key in [k for k, v in cls.NODES.items() if v is remote]:
+                    del cls.NODES[key]
+            cls._unwatch(remote)
+            remote.shutdown()
+
+    @classmethod
+    def add_lost_callback(cls, callback):
+        """Call `callback(remote)` when a node is lost, i.e. its heartbeats
+        stopped, once it is removed from the nodes
+        """
+        cls.LOST_CALLBACKS.append(callback)
+
+    @classmethod
+    def _node_lost(cls, remote):
+        with cls.LOCK:
+            keys = [k for k, v in cls.NODES.items() if v is remote]
+            for key in keys:
+                del cls.NODES[key]
+        if len(keys) == 0:
+            return
+        for callback in list(cls.LOST_CALLBACKS):
+            try:
+                callback(remote)
+            except Exception:
+                logger.exception('Error while handling the loss of {}'.format(remote))
+        # closing the client of a lost node may wait for the connection timeout
+        Thread(target=remote.shutdown, daemon=True).start()
+
+    @classmethod
+    def _unwatch(cls, remote):
+        if cls.HEARTBEAT is not None:
+            cls.HEARTBEAT.unwatch(remote)
+
+    @staticmethod
+    def _node_key(remote):
+        return remote.scheduler.address
     
     @classmethod
     def shutdown(cls):
+        if cls.HEARTBEAT is not None:
+            cls.HEARTBEAT.close()
+            cls.HEARTBEAT = None
         for node in cls.NODES.values():
             node.shutdown()
         cls.NODES = {}
+        cls.UPLOADED_FILES = []
         cls.__instance = None
 
     @classmethod
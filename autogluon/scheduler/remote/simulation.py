@@ -0,0 +1,71 @@
+"""Nodes simulated on the local machine, to test and benchmark multi-node experiments"""
+import itertools
+
+from .remote import Remote
+
+__all__ = ['SimulatedNode']
+
+_NODE_IDS = itertools.count()
+
+
+class SimulatedNode(object):
+    """Node of the cluster simulated by a local Dask worker, which advertises
+    the given numbers of CPUs and GPUs instead of those of the machine.
+
+    A simulated node can be given instead of an IP address to the schedulers
+    (`dist_ip_addrs`, `add_remote` and `remove_remote`), and goes through the
+    same code paths as a remote machine except SSH: bring-up and readiness
+    probe, heartbeats, file sync, resource accounting and the reports of its
+    trials. Its trials really run on the local machine, their CPUs are pinned
+    modulo the CPUs of the machine and their GPUs do not exist.
+
+    The Dask worker of a node runs in this process, and the nodes share its
+    trial worker pool, unless `processes` is True: each node then runs in its
+    own process, like a remote node (the script must be guarded by
+    `if __name__ == '__main__':`).
+
+    Parameters
+    ----------
+    num_cpus : int
+        Number of CPUs advertised.
+    num_gpus : int
+        Number of GPUs advertised.
+    memory : int
+        Bytes of memory advertised, the available memory of the machine by default.
+    processes : bool
+        Run the Dask worker in its own process.
+    name : str
+        Name of the node, used as its address.
+
+    Examples
+    --------
+    >>> nodes = [SimulatedNode(num_cpus=8, num_gpus=2) for _ in range(4)]
+    >>> scheduler = ag.scheduler.FIFOScheduler(
+    ...     train_fn, resource={'num_cpus': 2, 'num_gpus': 1}, dist_ip_addrs=nodes)
+    """
+    def __init__(self, num_cpus=1, num_gpus=0, memory=None, processes=False, name=None):
+        self.num_cpus = num_cpus
+        self.num_gpus = num_gpus
+        self.memory = memory
+        self.processes = processes
+        self.name = name if name is not None else 'simulated-{}'.format(next(_NODE_IDS))
+
+    def capacity(self):
+        """Resources advertised by the node, in a single NUMA node
+        """
+        capacity = {'num_cpus': self.num_cpus, 'num_gpus': self.num_gpus,
+                    'numa_nodes': {0: list(range(self.num_cpus))}}
+        if self.memory is not None:
+            capacity['memory'] = self.memory
+        return capacity
+
+    def start(self):
+        import dask
+        # the worker process starts the processes of the trials
+        with dask.config.set({'distributed.worker.daemon': False}):
+            return Remote(local=True, capacity=self.capacity(), processes=self.processes)
+
+    def __repr__(self):
+        reprstr = self.__class__.__name__ + '({}: {} CPUs, {} GPUs)'.format(
+            self.name, self.num_cpus, self.num_gpus)
+        return reprstr
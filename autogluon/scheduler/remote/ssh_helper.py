@@ -2,7 +2,6 @@
 from __future__ import print_function, division, absolute_import
 
 import os
-import socket
 import sys
 import time
 import traceback
@@ -18,6 +17,9 @@ from toolz import merge
 
 logger = logging.getLogger(__name__)
 
+# seconds between the keepalive packets of the ssh connections
+KEEPALIVE_INTERVAL = 10
+
 class bcolors:
     HEADER = "\033[95m"
     OKBLUE = "\033[94m"
@@ -30,7 +32,6 @@ class bcolors:
 
 def async_ssh(cmd_dict):
     import paramiko
-    from paramiko.buffered_pipe import PipeTimeout
     from paramiko.ssh_exception import SSHException, PasswordRequiredException
 
     ssh = paramiko.SSHClient()
@@ -115,91 +116,63 @@ def async_ssh(cmd_dict):
         "$SHELL -i -c '" + cmd_dict["cmd"] + "'", get_pty=True
     )
 
-    # Set up channel timeout (which we rely on below to make readline() non-blocking)
+    # The output is forwarded by threads blocked on the streams until the
+    # command ends, and the connection is kept active by the keepalives of
+    # the transport, so that nothing polls the channel.
     channel = stdout.channel
-    channel.settimeout(0.1)
-
-    def read_from_stdout():
-        """
-        Read stdout stream, time out if necessary.
-        """
-        try:
-            line = stdout.readline()
-            while len(line) > 0:  # Loops until a timeout exception occurs
-                line = line.rstrip()
-                logger.debug("stdout from ssh channel: %s", line)
-                cmd_dict["output_queue"].put(
-                    "[ {label} ] : {output}".format(
-                        label=cmd_dict["label"], output=line
-                    )
-                )
-                line = stdout.readline()
-        except (PipeTimeout, socket.timeout):
-            pass
+    transport = ssh.get_transport()
+    transport.set_keepalive(KEEPALIVE_INTERVAL)
 
-    def read_from_stderr():
+    def forward(stream, prefix, suffix):
         """
-        Read stderr stream, time out if necessary.
+        Forward the lines of a stream to the output queue until it is closed.
         """
         try:
-            line = stderr.readline()
+            line = stream.readline()
             while len(line) > 0:
                 line = line.rstrip()
-                logger.debug("stderr from ssh channel: %s", line)
-                cmd_dict["output_queue"].put(
-                    "[ {label} ] : ".format(label=cmd_dict["label"])
-                    + bcolors.FAIL
-                    + "{output}".format(output=line)
-                    + bcolors.ENDC
-                )
-                line = stderr.readline()
-        except (PipeTimeout, socket.timeout):
+                logger.debug("output from ssh channel: %s", line)
+                cmd_dict["output_queue"].put(prefix + line + suffix)
+                line = stream.readline()
+        except (OSError, EOFError):
             pass
 
-    def communicate():
-        """
-        Communicate a little bit, without blocking too long.
-        Return True if the command ended.
-        """
-        read_from_stdout()
-        read_from_stderr()
-
-        # Check to see if the process has exited. If it has, we let this thread
-        # terminate.
-        if channel.exit_status_ready():
-            exit_status = channel.recv_exit_status()
-            cmd_dict["output_queue"].put(
-                "[ {label} ] : ".format(label=cmd_dict["label"])
-                + bcolors.FAIL
-                + "remote process exited with exit status "
-                + str(exit_status)
-                + bcolors.ENDC
-            )
-            return True
-
-    # Get transport to current SSH client
-    transport = ssh.get_transport()
+    def forward_stdout():
+        forward(stdout, "[ {label} ] : ".format(label=cmd_dict["label"]), "")
+        # Once the output is closed, wait for the exit status of the process and
+        # wake up the thread below, which lets this command terminate.
+        exit_status = channel.recv_exit_status()
+        cmd_dict["output_queue"].put(
+            "[ {label} ] : ".format(label=cmd_dict["label"])
+            + bcolors.FAIL
+            + "remote process exited with exit status "
+            + str(exit_status)
+            + bcolors.ENDC
+        )
+        cmd_dict["input_queue"].put(None)
+
+    readers = [
+        Thread(target=forward_stdout, daemon=True),
+        Thread(target=forward, daemon=True, args=(
+            stderr, "[ {label} ] : ".format(label=cmd_dict["label"]) + bcolors.FAIL,
+            bcolors.ENDC)),
+    ]
+    for reader in readers:
+        reader.start()
 
     # Wait for a message on the input_queue. Any message received signals this
     # thread to shut itself down.
-    while cmd_dict["input_queue"].empty():
-        # Kill some time so that this thread does not hog the CPU.
-        time.sleep(1.0)
-        # Send noise down the pipe to keep connection active
-        transport.send_ignore()
-        if communicate():
-            break
+    cmd_dict["input_queue"].get()
 
     # Ctrl-C the executing command and wait a bit for command to end cleanly
-    start = time.time()
-    while time.time() < start + 5.0:
+    for _ in range(5):
+        if channel.exit_status_ready():
+            break
         try:
             channel.send(b"\x03")  # Ctrl-C
         except Exception:
             break
-        if communicate():
-            break
-        time.sleep(1.0)
+        channel.status_event.wait(1.0)
 
     # Shutdown the channel, and close the SSH connection
     channel.close()
@@ -207,7 +180,7 @@ def async_ssh(cmd_dict):
 
 
 def start_scheduler(addr, port, ssh_username, ssh_port,
-                    ssh_private_key, remote_python=None):
+                    ssh_private_key, remote_python=None, output_queue=None):
     cmd = "{python} -m autogluon.scheduler.remote.dask_scheduler --port {port}".format(
         python=remote_python or sys.executable, port=port
     )
@@ -223,7 +196,8 @@ def start_scheduler(addr, port, ssh_username, ssh_port,
     # Create a command dictionary, which contains everything we need to run and
     # interact with this command.
     input_queue = Queue()
-    output_queue = Queue()
+    # the output of several processes may be forwarded from one queue
+    output_queue = Queue() if output_queue is None else output_queue
     cmd_dict = {
         "cmd": cmd,
         "label": label,
@@ -245,7 +219,8 @@ def start_scheduler(addr, port, ssh_username, ssh_port,
 
 def start_worker(scheduler_addr, scheduler_port, worker_addr,
     ssh_username, ssh_port, ssh_private_key,
-    remote_python=None, remote_dask_worker="distributed.cli.dask_worker"):
+    remote_python=None, remote_dask_worker="distributed.cli.dask_worker",
+    threads_per_cpu=1, output_queue=None):
 
     cmd = (
         "{python} -m {remote_dask_worker} "
@@ -255,6 +230,8 @@ def start_worker(scheduler_addr, scheduler_port, worker_addr,
 
     #if not nohost:
     cmd += " --host {worker_addr}"
+    # more threads than CPUs, see remote.THREADS_PER_CPU
+    cmd += " --nthreads $(( $(nproc) * {threads_per_cpu} ))"
 
     cmd = cmd.format(
         python=remote_python or sys.executable,
@@ -262,6 +239,7 @@ def start_worker(scheduler_addr, scheduler_port, worker_addr,
         scheduler_addr=scheduler_addr,
         scheduler_port=scheduler_port,
         worker_addr=worker_addr,
+        threads_per_cpu=threads_per_cpu,
     )
 
     label = "worker {addr}".format(addr=worker_addr)
@@ -269,7 +247,8 @@ def start_worker(scheduler_addr, scheduler_port, worker_addr,
     # Create a command dictionary, which contains everything we need to run and
     # interact with this command.
     input_queue = Queue()
-    output_queue = Queue()
+    # the output of several processes may be forwarded from one queue
+    output_queue = Queue() if output_queue is None else output_queue
     cmd_dict = {
         "cmd": cmd,
         "label": label,
@@ -0,0 +1,239 @@
+"""Direct connection of the trials to the report dispatcher of the scheduler"""
+import os
+import socket
+import logging
+import threading
+from queue import Queue
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client, address_type
+
+__all__ = ['ReportChannel']
+
+logger = logging.getLogger(__name__)
+
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def _no_delay(connection, address):
+    # reports are small, they are sent right away instead of being coalesced
+    if address_type(address) != 'AF_INET':
+        return
+    sock = socket.fromfd(connection.fileno(), socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    finally:
+        sock.close()
+
+
+def _channel_client(address, authkey):
+    """End of the channel at `address` in this process, shared by its reporters.
+    It connects on first use, unpickling it does not block.
+    """
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(address)
+        if client is None or client.closed or client.pid != os.getpid():
+            client = _CLIENTS[address] = _ChannelClient(address, authkey)
+        return client
+
+
+class _ChannelEnd(object):
+    """Continue signals of the report streams, one semaphore per stream
+    """
+    closed = False
+
+    def __init__(self):
+        self._continues = {}
+        self._continues_lock = threading.Lock()
+
+    def _semaphore(self, stream_id):
+        with self._continues_lock:
+            return self._continues.setdefault(stream_id, threading.Semaphore(0))
+
+    def wait(self, stream_id):
+        """Wait for the scheduler to move on from the last report of the stream
+        """
+        semaphore = self._semaphore(stream_id)
+        while not semaphore.acquire(timeout=1):
+            if self.closed:
+                return
+
+    def _release(self, stream_id):
+        self._semaphore(stream_id).release()
+
+    def _forget(self, stream_id):
+        with self._continues_lock:
+            self._continues.pop(stream_id, None)
+
+
+class _ChannelClient(_ChannelEnd):
+    """End of the channel in a process running trials (a Dask worker)
+    """
+    def __init__(self, address, authkey):
+        super(_ChannelClient, self).__init__()
+        self.address = address
+        self.pid = os.getpid()
+        self._authkey = authkey
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def send(self, stream_id, payload, ack=False):
+        """Send a report, a batch of reports or spans. With `ack`, wait until
+        the scheduler received it. Raises RuntimeError if the channel is closed.
+        """
+        with self._lock:
+            if self.closed:
+                raise RuntimeError('Report channel {} is closed'.format(self.address))
+            try:
+                if self._conn is None:
+                    self._connect()
+                self._conn.send((stream_id, payload, ack))
+            except (OSError, EOFError, AuthenticationError) as e:
+                self.closed = True
+                raise RuntimeError('Report channel {} is closed: {}'.format(self.address, e))
+        if ack:
+            self.wait(stream_id)
+            self._forget(stream_id)
+
+    def move_on(self, stream_id):
+        """Wake up the reporter of the stream without waiting for the scheduler
+        """
+        self._release(stream_id)
+
+    def _connect(self):
+        self._conn = Client(self.address, authkey=self._authkey)
+        _no_delay(self._conn, self.address)
+        threading.Thread(target=self._receive, args=(self._conn,), daemon=True).start()
+
+    def _receive(self, conn):
+        try:
+            while True:
+                self._release(conn.recv())
+        except (OSError, EOFError):
+            pass
+        self.closed = True
+
+    def __reduce__(self):
+        return _channel_client, (self.address, self._authkey)
+
+
+class ReportChannel(_ChannelEnd):
+    """Socket over which the trials send their reports to the report dispatcher
+    of the scheduler, and get the signal to continue, without going through
+    the Dask scheduler.
+
+    Each process running trials opens a single connection to the channel,
+    shared by its reporters, on first use. Reports, batches of reports and
+    spans are tagged with their stream id, and the continue signal of a report
+    is sent back on the connection it came from. Messages are pickled and the
+    connections are authenticated with a random key, which is sent to the
+    nodes along with the reporters.
+
+    Parameters
+    ----------
+    host : str
+        Address the nodes connect to, the IP address of this machine by default.
+    """
+    def __init__(self, host=None):
+        super(ReportChannel, self).__init__()
+        if host is None:
+            from .remote.remote_manager import get_ip
+            host = get_ip()
+        self._authkey = os.urandom(32)
+        self._listener = Listener((host, 0), authkey=self._authkey)
+        self.address = self._listener.address
+        self._inbox = Queue()
+        self._lock = threading.Lock()
+        # connection of each stream, None for the reporters of this process
+        self._routes = {}
+        self._send_locks = {}
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def get(self):
+        """Next (stream_id, payload) received
+        """
+        return self._inbox.get()
+
+    def put(self, stream_id, payload):
+        """Add a message from the scheduler itself, ordered after those received
+        """
+        self._inbox.put((stream_id, payload))
+
+    def send(self, stream_id, payload, ack=False):
+        # reporter used in the process of the scheduler
+        with self._lock:
+            self._routes[stream_id] = None
+        self._inbox.put((stream_id, payload))
+
+    def move_on(self, stream_id):
+        """Signal the reporter of the stream to continue
+        """
+        with self._lock:
+            if stream_id not in self._routes:
+                return
+            conn = self._routes[stream_id]
+            send_lock = self._send_locks.get(conn)
+        if conn is None:
+            self._release(stream_id)
+            return
+        self._send(conn, send_lock, stream_id)
+
+    def forget(self, stream_id):
+        """Called once no more reports are expected from the stream
+        """
+        with self._lock:
+            self._routes.pop(stream_id, None)
+        self._forget(stream_id)
+
+    def close(self):
+        self.closed = True
+        self._listener.close()
+
+    def _accept(self):
+        while not self.closed:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError) as e:
+                if not self.closed:
+                    logger.warning('Rejected a report connection: {!r}'.format(e))
+                continue
+            _no_delay(conn, self.address)
+            with self._lock:
+                self._send_locks[conn] = threading.Lock()
+            threading.Thread(target=self._receive, args=(conn,), daemon=True).start()
+
+    def _receive(self, conn):
+        try:
+            while True:
+                stream_id, payload, ack = conn.recv()
+                with self._lock:
+                    # acknowledged messages are the last ones of their stream
+                    if not ack:
+                        self._routes[stream_id] = conn
+                    send_lock = self._send_locks[conn]
+                self._inbox.put((stream_id, payload))
+                if ack:
+                    self._send(conn, send_lock, stream_id)
+        except (OSError, EOFError):
+            pass
+        with self._lock:
+            self._send_locks.pop(conn, None)
+            for stream_id in [s for s, c in self._routes.items() if c is conn]:
+                del self._routes[stream_id]
+        conn.close()
+
+    @staticmethod
+    def _send(conn, send_lock, stream_id):
+        with send_lock:
+            try:
+                conn.send(stream_id)
+            except (OSError, EOFError):
+                pass
+
+    def __reduce__(self):
+        return _channel_client, (self.address, self._authkey)
+
+    def __repr__(self):
+        reprstr = self.__class__.__name__ + '(address: {}, streams: {})'.format(
+            self.address, len(self._routes))
+        return reprstr
@@ -1,63 +1,287 @@
+import os
 import time
 import json
 import logging
 import threading
 import multiprocessing as mp
+from queue import Empty, Full
+from collections import deque
 from ..utils import save, load
+from .tracer import TraceSpans, make_span
+from .report_channel import ReportChannel
 from dask.distributed import Queue
 import distributed
 from distributed.comm.core import CommClosedError
 
 logger = logging.getLogger(__name__)
 
-__all__ = ['Communicator', 'DistStatusReporter', 'FakeReporter']
+__all__ = ['Communicator', 'DistStatusReporter', 'FakeReporter', 'ReportDispatcher',
+           'TrialStopped']
+
+class TrialStopped(Exception):
+    """Raised inside a trial by its reporter once the scheduler decided to stop it.
+    """
+    pass
+
+
+_CLIENTS = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def _get_client(address):
+    """Client of the scheduler at `address`, reusing the client of the worker
+    or the default client when they are connected to that scheduler
+    """
+    try:
+        worker = distributed.get_worker()
+    except ValueError:
+        worker = None
+    if worker is not None and worker.scheduler.address == address:
+        return distributed.get_client()
+    if worker is None:
+        try:
+            client = distributed.default_client()
+            if client.scheduler.address == address:
+                return client
+        except ValueError:
+            pass
+    # the client of the worker would become the default client of the process,
+    # and take over the queues of the master when the node runs in-process
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(address)
+        if client is None or client.status not in ('running', 'connecting', 'newly-created'):
+            client = _CLIENTS[address] = distributed.Client(address, set_as_default=False)
+        return client
+
+
+def _restore_queue(name, address, maxsize):
+    # the queue already exists on its scheduler, the client is resolved on first use
+    queue = _SchedulerQueue.__new__(_SchedulerQueue)
+    queue._client = None
+    queue._address = address
+    queue.name = name
+    queue.maxsize = maxsize
+    return queue
+
+
+class _SchedulerQueue(Queue):
+    """Dask queue which stays on the scheduler it was created on when it is sent
+    to a worker of another cluster (e.g. a node added with its own scheduler),
+    instead of resolving its name on the scheduler of that worker.
+    """
+    _address = None
+
+    @property
+    def client(self):
+        if not self._client and self._address is not None:
+            self._client = _get_client(self._address)
+        return super(_SchedulerQueue, self).client
+
+    def __reduce__(self):
+        address = self._address or self.client.scheduler.address
+        return _restore_queue, (self.name, address, self.maxsize)
+
 
 class StatusReporter(object):
     """Report status through the training scheduler.
+
+    In asynchronous mode, reports are kept in a local buffer and sent in batches
+    without waiting for the scheduler, and the trial only gets interrupted (by
+    :class:`TrialStopped`) once the scheduler asks it to stop.
+
+    Trials can be paused and resumed (e.g. by Hyperband promotion) if the
+    training function registers how to save and load its state with
+    :meth:`register_checkpoint`: the state is saved whenever a report reaches
+    one of the milestones given by the scheduler, and loaded back when the
+    trial of a promoted config starts.
+
     Example:
         >>> def train_func(config, reporter):
         >>>     assert isinstance(reporter, StatusReporter)
         >>>     reporter(timesteps_this_iter=1)
     """
 
+    BUFFER_SIZE = 1024
+
     def __init__(self, dict_path=None):#, result_queue, continue_semaphore):
         self._queue = mp.Queue(1)
         self._last_report_time = None
         self._continue_semaphore = mp.Semaphore(0)
+        self._stop_event = mp.Event()
+        self._asynchronous = False
+        self._buffer = deque(maxlen=self.BUFFER_SIZE)
         self._last_report_time = time.time()
         self._save_dict = False
         self.dict_path = dict_path
+        self._checkpoint = None
+        self._save_fn = None
+        self._last_checkpoint = None
 
     def __call__(self, **kwargs):
         """Report updated training status.
         Pass in `done=True` when the training job is completed.
+        Raises :class:`TrialStopped` once the scheduler has asked the trial to stop.
         Args:
             kwargs: Latest training result status.
         Example:
             >>> reporter(accuracy=1, training_iters=4)
         """
+        if self._stop_event.is_set():
+            raise TrialStopped
+        self._maybe_save_checkpoint(kwargs)
         report_time = time.time()
         if 'time_this_iter' not in kwargs:
             kwargs['time_this_iter'] = report_time - self._last_report_time
         self._last_report_time = report_time
 
+        if self._asynchronous:
+            if len(self._buffer) == self._buffer.maxlen:
+                logger.debug('StatusReporter buffer is full, dropping the oldest report')
+            self._buffer.append(kwargs.copy())
+            self._flush(block=kwargs.get('done', False))
+            return
+
         self._queue.put(kwargs.copy(), block=True)
         self._continue_semaphore.acquire()
+        if self._stop_event.is_set():
+            raise TrialStopped
 
         logger.debug('StatusReporter reporting: {}'.format(json.dumps(kwargs)))
 
-    def fetch(self, block=True):
-        kwargs = self._queue.get(block=block)
+    def fetch(self, block=True, timeout=None):
+        kwargs = self._queue.get(block=block, timeout=timeout)
         return kwargs
 
     def move_on(self):
         self._continue_semaphore.release()
 
+    def stop(self):
+        """Ask the trial to stop at its next report
+        """
+        self._stop_event.set()
+
+    def stop_requested(self):
+        return self._stop_event.is_set()
+
     def _start(self):
         """Adjust the real starting time
         """
         self._last_report_time = time.time()
 
+    def _clear_stop(self):
+        """Clear the stop request of the previous trial. Called before the
+        trial is sent to the worker, so that a stop requested while the worker
+        is still starting is not lost.
+        """
+        self._stop_event.clear()
+
+    def _reset(self, asynchronous=False, checkpoint=None):
+        """Clear the state left by a previous trial, so that the reporter can be reused
+        """
+        while self._continue_semaphore.acquire(block=False):
+            pass
+        self._buffer.clear()
+        self._asynchronous = asynchronous
+        self._checkpoint = checkpoint
+        self._save_fn = None
+        self._last_checkpoint = None
+
+    def register_checkpoint(self, save_fn, load_fn=None):
+        """Register how to save and load the state of the trial.
+
+        `save_fn(prefix)` and `load_fn(prefix)` write and read the state (e.g.
+        model parameters and optimizer states) to and from files starting with
+        `prefix`. If the trial resumes the evaluation of a paused config, its
+        state is loaded right away.
+
+        Returns the value of the time attribute (e.g. the number of epochs) the
+        trial resumes from, 0 if it starts from scratch. The scheduler chooses
+        the milestones at which the state is saved (every report if None), and
+        the milestone to resume from ('latest' for the last saved one).
+
+        Example:
+            >>> def save_fn(prefix):
+            >>>     net.save_parameters(prefix + '.params')
+            >>> def load_fn(prefix):
+            >>>     net.load_parameters(prefix + '.params')
+            >>> start_epoch = reporter.register_checkpoint(save_fn, load_fn)
+            >>> for epoch in range(start_epoch + 1, epochs + 1):
+            >>>     ...
+            >>>     reporter(epoch=epoch, accuracy=accuracy)
+        """
+        self._save_fn = save_fn
+        checkpoint = self._checkpoint
+        if checkpoint is None or not checkpoint.get('resume_from') or load_fn is None:
+            return 0
+        resume_from = checkpoint['resume_from']
+        if resume_from == 'latest':
+            resume_from = self._latest_milestone()
+        prefix = self._checkpoint_prefix(resume_from)
+        if resume_from is None or not os.path.isfile(prefix + '.ag'):
+            logger.warning('No checkpoint at {} {} for {}, training from scratch'.format(
+                checkpoint['time_attr'], resume_from, checkpoint['dir']))
+            return 0
+        load_fn(prefix)
+        # each milestone of a config is resumed from at most once
+        self._remove_checkpoint(prefix)
+        logger.debug('Resumed from {}'.format(prefix))
+        return resume_from
+
+    def _checkpoint_prefix(self, milestone):
+        return os.path.join(self._checkpoint['dir'], 'milestone_{}'.format(milestone))
+
+    def _latest_milestone(self):
+        dirname = self._checkpoint['dir']
+        if not os.path.isdir(dirname):
+            return None
+        milestones = []
+        for filename in os.listdir(dirname):
+            if filename.startswith('milestone_') and filename.endswith('.ag'):
+                milestones.append(load(os.path.join(dirname, filename))[self._checkpoint['time_attr']])
+        return max(milestones) if len(milestones) > 0 else None
+
+    @staticmethod
+    def _remove_checkpoint(prefix):
+        dirname, basename = os.path.split(prefix)
+        for filename in os.listdir(dirname):
+            if filename.startswith(basename + '.'):
+                os.remove(os.path.join(dirname, filename))
+
+    def _maybe_save_checkpoint(self, reported_result):
+        checkpoint = self._checkpoint
+        if self._save_fn is None or checkpoint is None:
+            return
+        milestone = reported_result.get(checkpoint['time_attr'])
+        milestones = checkpoint['milestones']
+        if milestone is None or (milestones is not None and milestone not in milestones):
+            return
+        os.makedirs(checkpoint['dir'], exist_ok=True)
+        prefix = self._checkpoint_prefix(milestone)
+        self._save_fn(prefix)
+        # written last, marks the checkpoint as complete
+        save({checkpoint['time_attr']: milestone}, prefix + '.ag')
+        if milestones is None and self._last_checkpoint not in (None, prefix):
+            # only the last checkpoint is kept when saving at every report
+            self._remove_checkpoint(self._last_checkpoint)
+        self._last_checkpoint = prefix
+
+    def _flush(self, block=False):
+        """Send the buffered reports as one batch, unless the queue is busy
+        """
+        if len(self._buffer) == 0:
+            return
+        try:
+            self._queue.put(list(self._buffer), block=block)
+        except Full:
+            return
+        self._buffer.clear()
+
+    def _end(self):
+        """Mark the end of the trial, ordered after all of its reports
+        """
+        self._flush(block=True)
+        self._queue.put(None, block=True)
+
     def save_dict(self, **state_dict):
         """Save the serializable state_dict
         """
@@ -81,25 +305,60 @@ class FakeReporter(object):
     def __call__(self, **kwargs):
         pass
 
+    def register_checkpoint(self, save_fn, load_fn=None):
+        return 0
+
 class Communicator(threading.Thread):
+    """Forwards the reports of a trial running on a warm worker to the scheduler.
+
+    The communicator stops at the end-of-trial marker sent by the worker, so that
+    no stale message is left in the reporter queue for the next trial.
+    """
     def __init__(self, process, local_reporter, dist_reporter):
         super(Communicator, self).__init__()
         self.process = process
         self.local_reporter = local_reporter
         self.dist_reporter = dist_reporter
         self._stop_event = threading.Event()
+        self.done_seen = False
+        self.spans = []
+        self._start_time = time.time()
 
     def run(self):
-        while self.process.is_alive():
+        first_report = True
+        while True:
             try:
-                reported_result = self.local_reporter.fetch()
+                reported_result = self.local_reporter.fetch(timeout=1)
+            except Empty:
+                if not self.process.worker.is_alive():
+                    break
+                continue
             except BrokenPipeError:
                 break
+            if reported_result is None:
+                # end of trial
+                break
+            if first_report:
+                self.spans.append(make_span('first_report', self._start_time, time.time()))
+                first_report = False
+            if isinstance(reported_result, list):
+                # batch of asynchronous reports
+                if any(r.get('done', False) is True for r in reported_result):
+                    self.done_seen = True
+                self.dist_reporter.report_batch(reported_result)
+                continue
+            if 'done' in reported_result and reported_result['done'] is True:
+                self.done_seen = True
+            report_time = time.time()
             self.dist_reporter(**reported_result)
+            self.spans.append(make_span('report_wait', report_time, time.time()))
+            if self.local_reporter.stop_requested():
+                # the trial is being stopped and has already been woken up
+                continue
             self.local_reporter.move_on()
-            if 'done' in reported_result and reported_result['done'] is True:
-                self.process.join()
-                break
+        if not self.done_seen and not self.local_reporter.stop_requested():
+            # the trial failed or was killed, close the report stream
+            self.dist_reporter(done=True)
 
     def stop(self):
         self._stop_event.set()
@@ -120,15 +379,29 @@ class Communicator(threading.Thread):
 class DistStatusReporter(object):
     """Report status through the training scheduler.
 
+    With `asynchronous=True`, reports do not wait for the scheduler to move on.
+    `checkpoint` tells the trial where to save its state at milestones, see
+    :meth:`StatusReporter.register_checkpoint`.
+
+    The reports go through a :class:`ReportChannel` if one is given, otherwise
+    through a Dask queue.
+
     Example:
         >>> @autogluon_method
         >>> def train_func(config, reporter):
         >>>     reporter(accuracy=0.1)
     """
 
-    def __init__(self):
-        self._queue = Queue()
-        self._continue_semaphore = DistSemaphore(0)
+    def __init__(self, queue=None, stream_id=None, asynchronous=False, channel=None):
+        self._channel = channel
+        self._queue = None
+        self._continue_semaphore = None
+        if channel is None:
+            self._queue = queue if queue is not None else _SchedulerQueue()
+            self._continue_semaphore = DistSemaphore(0)
+        self._stream_id = stream_id
+        self.asynchronous = asynchronous
+        self.checkpoint = None
         self._last_report_time = time.time()
 
     def __call__(self, **kwargs):
@@ -148,10 +421,43 @@ class DistStatusReporter(object):
 
         #print('Reporting {}'.format(json.dumps(kwargs)))
         try:
-            self._queue.put(kwargs.copy())
+            self._put(kwargs.copy())
+        except RuntimeError:
+            return
+        if not self.asynchronous:
+            if self._channel is not None:
+                self._channel.wait(self._stream_id)
+            else:
+                self._continue_semaphore.acquire()
+
+    def _put(self, msg, ack=False):
+        if self._channel is not None:
+            self._channel.send(self._stream_id, msg, ack)
+        elif self._stream_id is not None:
+            self._queue.put((self._stream_id, msg))
+        else:
+            self._queue.put(msg)
+
+    def trace(self, spans):
+        """Send the spans recorded on the node to the scheduler. Sent last by
+        the job, they are received before the job is done.
+        """
+        if self._stream_id is None:
+            return
+        try:
+            self._put(TraceSpans(spans), ack=True)
+        except RuntimeError:
+            return
+
+    def report_batch(self, results):
+        """Report a batch of training status, without waiting for the scheduler.
+        """
+        msgs = [results] if self._stream_id is not None else results
+        try:
+            for msg in msgs:
+                self._put(msg)
         except RuntimeError:
             return
-        self._continue_semaphore.acquire()
 
     def fetch(self, block=True):
         try:
@@ -161,7 +467,12 @@ class DistStatusReporter(object):
         return kwargs
 
     def move_on(self):
-        self._continue_semaphore.release()
+        if self.asynchronous:
+            return
+        if self._channel is not None:
+            self._channel.move_on(self._stream_id)
+        else:
+            self._continue_semaphore.release()
 
     def _start(self):
         """Adjust the real starting time
@@ -179,9 +490,111 @@ class DistStatusReporter(object):
         return reprstr
 
 
+class ReportDispatcher(threading.Thread):
+    """Serves the report streams of all the trials of a scheduler from a single thread.
+
+    The reporters created by :meth:`add_stream` share one :class:`ReportChannel`
+    and tag their reports (or batches of reports) with a stream id. The handler of a stream is
+    called as `handler(reporter, reported_result)` for each report, and with `None` once
+    :meth:`end_stream` is called after the job is done. It returns True when no
+    more reports are expected from the stream, and must not block.
+    Spans recorded on the nodes are passed to the `tracer`, and to `on_spans`
+    as `on_spans(task_id, spans)`.
+    """
+    def __init__(self, tracer=None, on_spans=None):
+        super(ReportDispatcher, self).__init__(daemon=True)
+        self.tracer = tracer
+        self.on_spans = on_spans
+        self._channel = ReportChannel()
+        self._lock = threading.Lock()
+        self._streams = {}
+        self._finished = {}
+        self._task_ids = {}
+        self._next_id = 0
+
+    def add_stream(self, handler, asynchronous=False, task_id=None):
+        with self._lock:
+            stream_id = self._next_id
+            self._next_id += 1
+            reporter = DistStatusReporter(stream_id=stream_id, asynchronous=asynchronous,
+                                          channel=self._channel)
+            self._streams[stream_id] = (reporter, handler)
+            self._task_ids[stream_id] = task_id
+            self._finished[stream_id] = threading.Event()
+        return reporter
+
+    def end_stream(self, reporter):
+        self._channel.put(reporter._stream_id, None)
+
+    def wait_stream(self, reporter, timeout=None):
+        """Wait until the handler of the stream is done
+        """
+        finished = self._finished.get(reporter._stream_id)
+        if finished is not None and finished.wait(timeout):
+            with self._lock:
+                self._finished.pop(reporter._stream_id, None)
+                self._task_ids.pop(reporter._stream_id, None)
+
+    def stop(self):
+        self._channel.put(None, None)
+
+    def run(self):
+        while True:
+            stream_id, reported_result = self._channel.get()
+            if stream_id is None:
+                self._channel.close()
+                break
+            if isinstance(reported_result, TraceSpans):
+                self._add_spans(stream_id, reported_result)
+                continue
+            with self._lock:
+                stream = self._streams.get(stream_id)
+            if stream is None:
+                continue
+            reporter, handler = stream
+            results = reported_result if isinstance(reported_result, list) \
+                else [reported_result]
+            for result in results:
+                handle_time = time.time()
+                try:
+                    finished = handler(reporter, result)
+                except Exception:
+                    logger.exception('Error while handling report {}'.format(result))
+                    if result is not None:
+                        reporter.move_on()
+                    finished = True
+                if self.tracer is not None and result is not None:
+                    self.tracer.add_span('handle_report', handle_time, time.time(),
+                                         self._task_ids.get(stream_id))
+                if finished or result is None:
+                    with self._lock:
+                        self._streams.pop(stream_id, None)
+                        self._finished[stream_id].set()
+                    self._channel.forget(stream_id)
+                    break
+
+    def _add_spans(self, stream_id, spans):
+        task_id = self._task_ids.get(stream_id)
+        if self.on_spans is not None:
+            try:
+                self.on_spans(task_id, spans)
+            except Exception:
+                logger.exception('Error while handling the spans of task {}'.format(task_id))
+        if self.tracer is None:
+            return
+        for span in spans:
+            if span.get('task_id') is None:
+                span['task_id'] = task_id
+        self.tracer.add_spans(spans)
+
+    def __repr__(self):
+        reprstr = self.__class__.__name__ + '(streams: {})'.format(len(self._streams))
+        return reprstr
+
+
 class DistSemaphore(object):
     def __init__(self, value):
-        self._queue = Queue()
+        self._queue = _SchedulerQueue()
         for i in range(value):
             self._queue.put(1)
 
@@ -1,18 +1,113 @@
+import math
+import heapq
+import bisect
 import logging
+import itertools
+import threading
 import multiprocessing as mp
 from .resource import *
-from ...utils import Queue
 
 __all__ = ['DistributedResourceManager', 'NodeResourceManager']
 
 logger = logging.getLogger(__name__)
 
+# capacity of a CPU or GPU, fractional requests are rounded to 1/DEVICE_UNITS
+DEVICE_UNITS = 1000
+
+
+def _to_units(amount):
+    return int(round(amount * DEVICE_UNITS))
+
+
+def _fits(free_devices, free_share, amount):
+    if amount < 1:
+        return _to_units(free_share) >= _to_units(amount)
+    return free_devices >= amount
+
+
+class _CapacityIndex(object):
+    """Whole free CPUs and GPUs of the nodes, sorted by free GPUs then free
+    CPUs, so that the best fitting node of a request is found by bisection. The
+    free memory and the largest free fractions of a CPU and of a GPU of the
+    nodes (for fractional requests) are only checked.
+    """
+    def __init__(self):
+        self._entries = []
+        self._nodes = {}
+        self._memory = {}
+        self._shares = {}
+        self._order = {}
+
+    def update(self, node, free_cpus, free_gpus, free_memory=0, cpu_share=None, gpu_share=None):
+        self.remove(node)
+        # insertion order breaks ties, without comparing the nodes
+        order = self._order.setdefault(node, len(self._order))
+        entry = (free_gpus, free_cpus, order, node)
+        bisect.insort(self._entries, entry)
+        self._nodes[node] = entry
+        self._memory[node] = free_memory
+        self._shares[node] = (min(free_cpus, 1) if cpu_share is None else cpu_share,
+                              min(free_gpus, 1) if gpu_share is None else gpu_share)
+
+    def remove(self, node):
+        entry = self._nodes.pop(node, None)
+        if entry is not None:
+            del self._entries[bisect.bisect_left(self._entries, entry)]
+
+    def best_fit(self, num_cpus, num_gpus, penalty=None, exclude=(), memory=0):
+        """Node which has the fewest free GPUs, then CPUs, left once the request
+        is placed, among the nodes with the lowest penalty. None if it fits nowhere.
+        """
+        best, best_key = None, None
+        start = bisect.bisect_left(self._entries, (int(num_gpus), int(num_cpus), -1))
+        for i in range(start, len(self._entries)):
+            free_gpus, free_cpus, _, node = self._entries[i]
+            cpu_share, gpu_share = self._shares[node]
+            if not _fits(free_cpus, cpu_share, num_cpus) or \
+                    not _fits(free_gpus, gpu_share, num_gpus) or \
+                    node in exclude or self._memory[node] < memory:
+                continue
+            if not penalty:
+                return node
+            key = (penalty.get(node, 0), free_gpus, free_cpus)
+            if best is None or key < best_key:
+                best, best_key = node, key
+        return best
+
+    def free(self, node):
+        free_gpus, free_cpus, _, _ = self._nodes[node]
+        return free_cpus, free_gpus, self._memory[node]
+
+
 class DistributedResourceManager(object):
+    """Allocates the resources of the tasks on the nodes of the cluster.
+
+    Requests are placed on the node they fit best (bin packing), so that large
+    free blocks remain for large requests. Requests which cannot be placed wait
+    in a queue, served by priority then in arrival order. The first waiting
+    request reserves the node closest to fitting it: later requests may only be
+    backfilled on the other nodes, so that large requests do not starve behind
+    streams of small ones.
+
+    Nodes may join and leave during an experiment: the waiting requests are
+    placed on new nodes right away, and a node which is drained gets no new
+    tasks and is removed once its running tasks released their resources.
+    """
     LOCK = mp.Lock()
-    REQUESTING_STACK = []
+    # heap of (-priority, arrival, resource, semaphore)
+    WAITING_QUEUE = []
     MAX_CPU_COUNT = 0
     MAX_GPU_COUNT = 0
+    MAX_MEMORY = 0
     NODE_RESOURCE_MANAGER = {}
+    # nodes with a higher penalty are used last, e.g. slow nodes
+    NODE_PENALTY = {}
+    # number of waiting requests which hold a node reservation
+    MAX_RESERVATIONS = 1
+    # nodes being removed, with an event set once they are removed
+    DRAINING = {}
+    _INDEX = _CapacityIndex()
+    _ARRIVAL = itertools.count()
     __instance = None
     def __new__(cls):
         # Singleton
@@ -22,113 +117,230 @@ class DistributedResourceManager(object):
 
     @classmethod
     def add_remote(cls, remotes):
-        """Enables dynamically removing nodes
+        """Enables dynamically adding nodes, which absorb the waiting requests
         """
         remotes = remotes if isinstance(remotes, list) else [remotes]
         for remote in remotes:
-            cls.NODE_RESOURCE_MANAGER[remote] = NodeResourceManager(remote)
-        cls._refresh_resource()
+            node_manager = NodeResourceManager(remote)
+            with cls.LOCK:
+                cls.NODE_RESOURCE_MANAGER[remote] = node_manager
+                cls._update_index(remote)
+        with cls.LOCK:
+            cls._refresh_resource()
+            cls._schedule_waiting()
 
     @classmethod
     def reserve_resource(cls, remote, resource):
         node_manager = cls.NODE_RESOURCE_MANAGER[remote]
         with cls.LOCK:
-            if not node_manager.check_availability(resource):
+            if remote in cls.DRAINING or not node_manager.check_availability(resource):
                 return False
             node_manager._request(remote, resource)
+            cls._update_index(remote)
         logger.info('Reserved {} in {}'.format(resource, remote))
         return True
 
     @classmethod
     def release_reserved_resource(cls, remote, resource):
         node_manager = cls.NODE_RESOURCE_MANAGER[remote]
-        node_manager._release(resource)
-        cls._evoke_request()
+        with cls.LOCK:
+            node_manager._release(resource)
+            cls._update_index(remote)
+            cls._schedule_waiting()
 
     @classmethod
     def _refresh_resource(cls):
-        cls.MAX_CPU_COUNT = max([x.get_all_resources()[0] for x in cls.NODE_RESOURCE_MANAGER.values()])
-        cls.MAX_GPU_COUNT = max([x.get_all_resources()[1] for x in cls.NODE_RESOURCE_MANAGER.values()])
+        managers = [x for remote, x in cls.NODE_RESOURCE_MANAGER.items()
+                    if remote not in cls.DRAINING]
+        cls.MAX_CPU_COUNT = max([x.get_all_resources()[0] for x in managers], default=0)
+        cls.MAX_GPU_COUNT = max([x.get_all_resources()[1] for x in managers], default=0)
+        cls.MAX_MEMORY = max([x.MAX_MEMORY for x in managers], default=0)
 
     @classmethod
-    def _request(cls, resource):
+    def _update_index(cls, remote):
+        node_manager = cls.NODE_RESOURCE_MANAGER[remote]
+        if remote not in cls.DRAINING:
+            cls._INDEX.update(remote, *node_manager.get_free_resources())
+        elif node_manager.is_idle():
+            cls._remove_drained(remote)
+
+    @classmethod
+    def _request(cls, resource, priority=0):
         """ResourceManager, we recommand using scheduler instead of creating your own
-        resource manager.
+        resource manager. Requests with a higher `priority` are served first.
         """
         assert cls.check_possible(resource), \
-            'Requested num_cpu={} and num_gpu={} should be less than or equal to' + \
-            'largest node availability CPUs={}, GPUs={}'. \
-            format(resource.num_cpus, resource.num_gpus, cls.MAX_GPU_COUNT, cls.MAX_CPU_COUNT)
-       
-        with cls.LOCK:
-            node = cls.check_availability(resource)
-            if node is not None:
-                cls.NODE_RESOURCE_MANAGER[node]._request(node, resource)
-                return
+            ('Requested num_cpu={}, num_gpu={} and memory={} should be less than or equal to '
+             'largest node availability CPUs={}, GPUs={}, memory={}'). \
+            format(resource.num_cpus, resource.num_gpus, resource.memory,
+                   cls.MAX_CPU_COUNT, cls.MAX_GPU_COUNT, cls.MAX_MEMORY)
 
-        logger.debug('Appending {} to Request Stack'.format(resource))
-        request_semaphore = mp.Semaphore(0)
         with cls.LOCK:
-            cls.REQUESTING_STACK.append((resource, request_semaphore))
+            if len(cls.WAITING_QUEUE) == 0:
+                node = cls.check_availability(resource)
+                if node is not None:
+                    cls._allocate(node, resource)
+                    return
+            logger.debug('Appending {} to the waiting queue'.format(resource))
+            request_semaphore = mp.Semaphore(0)
+            heapq.heappush(cls.WAITING_QUEUE,
+                           (-priority, next(cls._ARRIVAL), resource, request_semaphore))
+            cls._schedule_waiting()
         request_semaphore.acquire()
         return
 
+    @classmethod
+    def _allocate(cls, node, resource):
+        cls.NODE_RESOURCE_MANAGER[node]._request(node, resource)
+        cls._update_index(node)
+
     @classmethod
     def _release(cls, resource):
         logger.debug('\nReleasing resource {}'.format(resource))
-        cls.NODE_RESOURCE_MANAGER[resource.node]._release(resource)
-        cls._evoke_request()
+        with cls.LOCK:
+            node = resource.node
+            cls.NODE_RESOURCE_MANAGER[node]._release(resource)
+            cls._update_index(node)
+            cls._schedule_waiting()
 
     @classmethod
     def _evoke_request(cls):
-        succeed = False
         with cls.LOCK:
-            if len(cls.REQUESTING_STACK) > 0:
-                resource, request_semaphore = cls.REQUESTING_STACK.pop()
-                node = cls.check_availability(resource)
+            cls._schedule_waiting()
+
+    @classmethod
+    def _schedule_waiting(cls):
+        """Place the waiting requests which fit, in queue order, while keeping
+        the reserved nodes for the first requests which do not fit yet. Must be
+        called with the lock held.
+        """
+        reserved = set()
+        blocked = []
+        while len(cls.WAITING_QUEUE) > 0:
+            entry = heapq.heappop(cls.WAITING_QUEUE)
+            resource, request_semaphore = entry[2:]
+            node = cls._INDEX.best_fit(resource.num_cpus, resource.num_gpus,
+                                       cls.NODE_PENALTY, reserved, resource.memory)
+            if node is not None:
+                cls._allocate(node, resource)
+                logger.debug('\nEvoking requesting resource {}'.format(resource))
+                request_semaphore.release()
+                continue
+            blocked.append(entry)
+            if len(blocked) <= cls.MAX_RESERVATIONS:
+                node = cls._reservation_node(resource, reserved)
                 if node is not None:
-                    cls.NODE_RESOURCE_MANAGER[node]._request(node, resource)
-                    logger.debug('\nEvoking requesting resource {}'.format(resource))
-                    request_semaphore.release()
-                    succeed = True
-                else:
-                    cls.REQUESTING_STACK.append((resource, request_semaphore))
-                    return
-        if succeed:
-            cls._evoke_request()
+                    reserved.add(node)
+        for entry in blocked:
+            heapq.heappush(cls.WAITING_QUEUE, entry)
+
+    @classmethod
+    def _reservation_node(cls, resource, exclude):
+        """Node which is the closest to fitting the request
+        """
+        best, best_key = None, None
+        for node in cls._get_possible_nodes(resource):
+            if node in exclude:
+                continue
+            free_cpus, free_gpus, free_memory = cls._INDEX.free(node)
+            key = (max(resource.num_gpus - free_gpus, 0), max(resource.num_cpus - free_cpus, 0),
+                   max(resource.memory - free_memory, 0))
+            if best is None or key < best_key:
+                best, best_key = node, key
+        return best
+
+    @classmethod
+    def set_node_penalty(cls, remote, penalty):
+        """Deprioritize a node: new tasks are placed on the nodes with the
+        lowest penalty first (0 by default).
+        """
+        with cls.LOCK:
+            if penalty > 0:
+                cls.NODE_PENALTY[remote] = penalty
+            else:
+                cls.NODE_PENALTY.pop(remote, None)
+        logger.info('Penalty of {} set to {}'.format(remote, penalty))
 
     @classmethod
     def check_availability(cls, resource):
-        """Unsafe check
+        """Unsafe check, best fitting node with enough free resources
         """
-        candidate_nodes = cls._get_possible_nodes(resource)
-        for node in candidate_nodes:
-            if cls.NODE_RESOURCE_MANAGER[node].check_availability(resource):
-                #logger.debug('\nSuccessfully find node {}'.format(node))
-                return node
-        return None
+        return cls._INDEX.best_fit(resource.num_cpus, resource.num_gpus, cls.NODE_PENALTY,
+                                   memory=resource.memory)
+
+    @classmethod
+    def num_available(cls, resource):
+        """Unsafe count of the tasks requesting resource which could start now
+        """
+        with cls.LOCK:
+            if len(cls.WAITING_QUEUE) > 0:
+                return 0
+            return sum(manager.num_available(resource)
+                       for remote, manager in cls.NODE_RESOURCE_MANAGER.items()
+                       if remote not in cls.DRAINING)
 
     @classmethod
     def check_possible(cls, resource):
         assert isinstance(resource, DistributedResource), \
             'Only support autogluon.resource.DistributedResource'
-        if resource.num_cpus > cls.MAX_CPU_COUNT or resource.num_gpus > cls.MAX_GPU_COUNT:
+        if resource.num_cpus > cls.MAX_CPU_COUNT or resource.num_gpus > cls.MAX_GPU_COUNT \
+                or resource.memory > cls.MAX_MEMORY:
             return False
         return True
 
     @classmethod
-    def remove_remote(cls, remotes):
-        #TODO 
-        """Enables dynamically removing nodes
+    def drain_remote(cls, remotes):
+        """Stop placing tasks on nodes, and remove them once their running tasks
+        released their resources. Returns an event per node, set once it is removed.
+        """
+        remotes = remotes if isinstance(remotes, list) else [remotes]
+        events = []
+        with cls.LOCK:
+            for remote in remotes:
+                if remote not in cls.NODE_RESOURCE_MANAGER:
+                    event = threading.Event()
+                    event.set()
+                    events.append(event)
+                    continue
+                if remote not in cls.DRAINING:
+                    logger.info('Draining {}'.format(remote))
+                    cls.DRAINING[remote] = threading.Event()
+                    cls._INDEX.remove(remote)
+                events.append(cls.DRAINING[remote])
+                if cls.NODE_RESOURCE_MANAGER[remote].is_idle():
+                    cls._remove_drained(remote)
+            cls._refresh_resource()
+            # the reservations of the waiting requests may be on the drained nodes
+            cls._schedule_waiting()
+        return events
+
+    @classmethod
+    def remove_remote(cls, remotes, timeout=None):
+        """Enables dynamically removing nodes: the nodes are drained, and removed
+        once their running tasks are done. Returns False if some of the nodes
+        still run tasks after `timeout` seconds.
+        """
+        removed = True
+        for event in cls.drain_remote(remotes):
+            removed = event.wait(timeout) and removed
+        return removed
+
+    @classmethod
+    def _remove_drained(cls, remote):
+        """Must be called with the lock held
         """
+        del cls.NODE_RESOURCE_MANAGER[remote]
+        cls.NODE_PENALTY.pop(remote, None)
+        cls._INDEX.remove(remote)
         cls._refresh_resource()
-        pass
+        cls.DRAINING.pop(remote).set()
+        logger.info('Removed {}'.format(remote))
 
     @classmethod
     def _get_possible_nodes(cls, resource):
         candidates = []
         for remote, manager in cls.NODE_RESOURCE_MANAGER.items():
-            if manager.check_possible(resource):
+            if remote not in cls.DRAINING and manager.check_possible(resource):
                 candidates.append(remote)
         return candidates
 
@@ -140,32 +352,98 @@ class DistributedResourceManager(object):
         return reprstr
 
 
+def _select_cpus(free_cpus, numa_nodes, num_cpus):
+    """CPUs for a task within the NUMA node which fits it best, or spanning as
+    few NUMA nodes as possible if it does not fit in any
+    """
+    if len(numa_nodes) <= 1:
+        return free_cpus[:num_cpus]
+    free = set(free_cpus)
+    per_node = [[cid for cid in cpus if cid in free] for cpus in numa_nodes]
+    fitting = [cpus for cpus in per_node if len(cpus) >= num_cpus]
+    if len(fitting) > 0:
+        return min(fitting, key=len)[:num_cpus]
+    selected = []
+    for cpus in sorted(per_node, key=len, reverse=True):
+        selected.extend(cpus[:num_cpus - len(selected)])
+        if len(selected) == num_cpus:
+            break
+    return selected
+
+
+def _take_devices(capacity, amount, numa_nodes=()):
+    """Devices for a request of `amount` devices, updating their free capacity.
+    A fractional request shares the device with the least capacity left which
+    fits it, other requests get whole free devices.
+    """
+    if amount <= 0:
+        return []
+    if amount < 1:
+        units = _to_units(amount)
+        fitting = [i for i, free in enumerate(capacity) if free >= units]
+        device = min(fitting, key=lambda i: capacity[i])
+        capacity[device] -= units
+        return [device]
+    free_devices = [i for i, free in enumerate(capacity) if free == DEVICE_UNITS]
+    devices = _select_cpus(free_devices, numa_nodes, int(amount))
+    for i in devices:
+        capacity[i] = 0
+    return devices
+
+
+def _return_devices(capacity, devices, amount):
+    units = _to_units(amount) if amount < 1 else DEVICE_UNITS
+    for i in devices:
+        capacity[i] += units
+
+
+def _num_fitting(capacity, amount):
+    """Number of requests of `amount` (> 0) devices which fit in the free capacity
+    """
+    if amount < 1:
+        units = _to_units(amount)
+        return sum(free // units for free in capacity)
+    return capacity.count(DEVICE_UNITS) // int(amount)
+
+
 class NodeResourceManager(object):
-    """Remote Resource Manager to keep track of the cpu and gpu usage
+    """Remote Resource Manager to keep track of the cpu, gpu and memory usage.
+    The memory capacity is the memory available on the remote when it is added.
+
+    Each CPU and GPU has a capacity of 1, shared by the tasks requesting a
+    fraction of a device (e.g. `num_gpus=0.25`): such a task gets the device
+    with the least capacity left which fits it, so that partially used devices
+    are filled before whole ones are split. Tasks requesting one or more
+    devices get whole devices. The CPUs of a task are taken from a single NUMA
+    node of the remote when possible, unless its resource has no NUMA policy.
     """
     def __init__(self, remote):
         self.LOCK = mp.Lock()
-        self.MAX_CPU_COUNT = get_remote_cpu_count(remote)
-        self.MAX_GPU_COUNT = get_remote_gpu_count(remote)
-        self.CPU_QUEUE = Queue()
-        self.GPU_QUEUE = Queue()
-        for cid in range(self.MAX_CPU_COUNT):
-            self.CPU_QUEUE.put(cid)
-        for gid in range(self.MAX_GPU_COUNT):
-            self.GPU_QUEUE.put(gid)
+        # reported by the readiness probe of the node, if it was probed
+        resources = getattr(remote, 'resources', None) or get_remote_resources(remote)
+        self.MAX_CPU_COUNT = resources['num_cpus']
+        self.MAX_GPU_COUNT = resources['num_gpus']
+        self.MAX_MEMORY = resources['memory']
+        self.FREE_MEMORY = self.MAX_MEMORY
+        self.NUMA_NODES = list(resources['numa_nodes'].values())
+        # free capacity of each device, in 1/DEVICE_UNITS
+        self.CPU_CAPACITY = [DEVICE_UNITS] * self.MAX_CPU_COUNT
+        self.GPU_CAPACITY = [DEVICE_UNITS] * self.MAX_GPU_COUNT
 
     def _request(self, remote, resource):
         """ResourceManager, we recommand using scheduler instead of creating your own
         resource manager.
         """
         assert self.check_possible(resource), \
-            'Requested num_cpu={} and num_gpu={} should be less than or equal to' + \
-            'system availability CPUs={}, GPUs={}'. \
-            format(resource.num_cpus, resource.num_gpus, self.MAX_GPU_COUNT, self.MAX_CPU_COUNT)
+            ('Requested num_cpu={} and num_gpu={} should be less than or equal to '
+             'system availability CPUs={}, GPUs={}'). \
+            format(resource.num_cpus, resource.num_gpus, self.MAX_CPU_COUNT, self.MAX_GPU_COUNT)
 
         with self.LOCK:
-            cpu_ids = [self.CPU_QUEUE.get() for i in range(resource.num_cpus)]
-            gpu_ids = [self.GPU_QUEUE.get() for i in range(resource.num_gpus)]
+            numa_nodes = self.NUMA_NODES if getattr(resource, 'numa', None) else []
+            cpu_ids = _take_devices(self.CPU_CAPACITY, resource.num_cpus, numa_nodes)
+            gpu_ids = _take_devices(self.GPU_CAPACITY, resource.num_gpus)
+            self.FREE_MEMORY -= resource.memory
             resource._ready(remote, cpu_ids, gpu_ids)
             #logger.debug("\nReqeust succeed {}".format(resource))
             return
@@ -174,31 +452,65 @@ class NodeResourceManager(object):
         cpu_ids = resource.cpu_ids
         gpu_ids = resource.gpu_ids
         resource._release()
-        if len(cpu_ids) > 0:
-            for cid in cpu_ids:
-                self.CPU_QUEUE.put(cid)
-        if len(gpu_ids) > 0:
-            for gid in gpu_ids:
-                self.GPU_QUEUE.put(gid)
+        with self.LOCK:
+            _return_devices(self.CPU_CAPACITY, cpu_ids, resource.num_cpus)
+            _return_devices(self.GPU_CAPACITY, gpu_ids, resource.num_gpus)
+            self.FREE_MEMORY += resource.memory
 
     def get_all_resources(self):
         return self.MAX_CPU_COUNT, self.MAX_GPU_COUNT
 
+    def is_idle(self):
+        """Whether no task holds resources of the node
+        """
+        return self.CPU_CAPACITY.count(DEVICE_UNITS) == self.MAX_CPU_COUNT and \
+            self.GPU_CAPACITY.count(DEVICE_UNITS) == self.MAX_GPU_COUNT and \
+            self.FREE_MEMORY == self.MAX_MEMORY
+
+    def get_free_resources(self):
+        """Number of whole free CPUs and GPUs, free memory, and largest free
+        fractions of a CPU and of a GPU
+        """
+        return self.CPU_CAPACITY.count(DEVICE_UNITS), self.GPU_CAPACITY.count(DEVICE_UNITS), \
+            self.FREE_MEMORY, max(self.CPU_CAPACITY, default=0) / DEVICE_UNITS, \
+            max(self.GPU_CAPACITY, default=0) / DEVICE_UNITS
+
     def check_availability(self, resource):
         """Unsafe check
         """
-        if resource.num_cpus > self.CPU_QUEUE.qsize() or resource.num_gpus > self.GPU_QUEUE.qsize():
+        if resource.num_cpus > 0 and _num_fitting(self.CPU_CAPACITY, resource.num_cpus) == 0 or \
+                resource.num_gpus > 0 and _num_fitting(self.GPU_CAPACITY, resource.num_gpus) == 0 or \
+                resource.memory > self.FREE_MEMORY:
             return False
         return True
 
+    def num_available(self, resource):
+        """Unsafe count of the tasks requesting resource which fit in this node
+        """
+        if not self.check_possible(resource):
+            return 0
+        counts = []
+        if resource.num_cpus > 0:
+            counts.append(_num_fitting(self.CPU_CAPACITY, resource.num_cpus))
+        if resource.num_gpus > 0:
+            counts.append(_num_fitting(self.GPU_CAPACITY, resource.num_gpus))
+        if resource.memory > 0:
+            counts.append(self.FREE_MEMORY // resource.memory)
+        return min(counts) if len(counts) > 0 else 0
+
     def check_possible(self, resource):
         assert isinstance(resource, DistributedResource), 'Only support autogluon.resource.Resources'
-        if resource.num_cpus > self.MAX_CPU_COUNT or resource.num_gpus > self.MAX_GPU_COUNT:
+        # a fractional request needs a whole device
+        if math.ceil(resource.num_cpus) > self.MAX_CPU_COUNT or \
+                math.ceil(resource.num_gpus) > self.MAX_GPU_COUNT \
+                or resource.memory > self.MAX_MEMORY:
             return False
         return True
 
     def __repr__(self):
         reprstr = self.__class__.__name__ + '(' + \
             '{} CPUs, '.format(self.MAX_CPU_COUNT) + \
-            '{} GPUs)'.format(self.MAX_GPU_COUNT)
+            '{} GPUs, '.format(self.MAX_GPU_COUNT) + \
+            '{} bytes of memory, '.format(self.MAX_MEMORY) + \
+            '{} NUMA nodes)'.format(len(self.NUMA_NODES))
         return reprstr
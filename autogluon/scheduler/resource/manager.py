@@ -8,27 +8,40 @@ __all__ = ['ResourceManager']
 logger = logging.getLogger(__name__)
 
 class ResourceManager(object):
-    """Resource Manager to keep track of the cpu and gpu usage
+    """Resource Manager to keep track of the cpu and gpu usage. The CPUs and
+    GPUs are discovered on first use.
     """
     LOCK = mp.Lock()
-    CPU_QUEUE = Queue()
-    GPU_QUEUE = Queue()
-    MAX_CPU_COUNT = get_cpu_count()
-    MAX_GPU_COUNT = get_gpu_count()
-    for cid in range(MAX_CPU_COUNT):
-        CPU_QUEUE.put(cid)
-    for gid in range(MAX_GPU_COUNT):
-        GPU_QUEUE.put(gid)
+    CPU_QUEUE = None
+    GPU_QUEUE = None
+    MAX_CPU_COUNT = None
+    MAX_GPU_COUNT = None
+
+    @classmethod
+    def _discover(cls):
+        with cls.LOCK:
+            if cls.CPU_QUEUE is not None:
+                return
+            cls.MAX_CPU_COUNT = get_cpu_count()
+            cls.MAX_GPU_COUNT = get_gpu_count()
+            cpu_queue, gpu_queue = Queue(), Queue()
+            for cid in range(cls.MAX_CPU_COUNT):
+                cpu_queue.put(cid)
+            for gid in range(cls.MAX_GPU_COUNT):
+                gpu_queue.put(gid)
+            cls.GPU_QUEUE = gpu_queue
+            cls.CPU_QUEUE = cpu_queue
 
     @classmethod
     def _request(cls, resource):
         """ResourceManager, we recommand using scheduler instead of creating your own
         resource manager.
         """
+        cls._discover()
         assert cls.check_possible(resource), \
-            'Requested num_cpu={} and num_gpu={} should be less than or equal to' + \
-            'system availability CPUs={}, GPUs={}'. \
-            format(resource.num_cpus, resource.num_gpus, cls.MAX_GPU_COUNT, cls.MAX_CPU_COUNT)
+            ('Requested num_cpu={} and num_gpu={} should be less than or equal to '
+             'system availability CPUs={}, GPUs={}'). \
+            format(resource.num_cpus, resource.num_gpus, cls.MAX_CPU_COUNT, cls.MAX_GPU_COUNT)
 
         with cls.LOCK:
             cpu_ids = [cls.CPU_QUEUE.get() for i in range(resource.num_cpus)]
@@ -39,6 +52,7 @@ class ResourceManager(object):
 
     @classmethod
     def _release(cls, resource):
+        cls._discover()
         cpu_ids = resource.cpu_ids
         gpu_ids = resource.gpu_ids
         resource._release()
@@ -53,18 +67,21 @@ class ResourceManager(object):
     def check_availability(cls, resource):
         """Unsafe check
         """
-        if resource.num_cpus > self.CPU_QUEUE.qsize() or resource.num_gpus > self.GPU_QUEUE.qsize():
+        cls._discover()
+        if resource.num_cpus > cls.CPU_QUEUE.qsize() or resource.num_gpus > cls.GPU_QUEUE.qsize():
             return False
         return True
 
     @classmethod
     def check_possible(cls, resource):
         assert isinstance(resource, Resources), 'Only support autogluon.resource.Resources'
+        cls._discover()
         if resource.num_cpus > cls.MAX_CPU_COUNT or resource.num_gpus > cls.MAX_GPU_COUNT:
             return False
         return True
 
     def __repr__(self):
+        self._discover()
         reprstr = self.__class__.__name__ + '(' + \
             '{} CPUs, '.format(self.MAX_CPU_COUNT) + \
             '{} GPUs)'.format(self.MAX_GPU_COUNT)
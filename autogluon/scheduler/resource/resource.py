@@ -1,9 +1,16 @@
+import os
+import glob
 import logging
+import functools
+from collections import OrderedDict
 from multiprocessing import cpu_count
 
 __all__ = ['Resources', 'DistributedResource',
-           'get_cpu_count', 'get_gpu_count', 
-           'get_remote_cpu_count', 'get_remote_gpu_count']
+           'get_cpu_count', 'get_gpu_count', 'get_memory_size', 'get_numa_nodes',
+           'get_remote_cpu_count', 'get_remote_gpu_count', 'get_remote_memory_size',
+           'get_remote_numa_nodes', 'get_resources', 'get_remote_resources']
+
+NUMA_POLICIES = [None, 'local', 'bind']
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +20,8 @@ class Resources(object):
     Args:
         num_cpus (int): number of cpu cores required for the training task.
         num_gpus (int): number of gpu required for the training task.
+        memory (int): memory (in bytes) required for the training task, 0 if
+            it is not scheduled.
 
     Example:
         >>> def my_task():
@@ -20,9 +29,10 @@ class Resources(object):
         >>> resource = Resources(num_cpus=2, num_gpus=0)
         >>> task = Task(my_task, {}, resource)
     """
-    def __init__(self, num_cpus=1, num_gpus=0):
+    def __init__(self, num_cpus=1, num_gpus=0, memory=0):
         self.num_cpus = num_cpus
         self.num_gpus = num_gpus
+        self.memory = memory
         self.cpu_ids = []
         self.gpu_ids = []
         self.ready = False
@@ -46,6 +56,8 @@ class Resources(object):
             reprstr += ', nGPUs = ' + str(self.num_gpus)
         if len(self.gpu_ids) > 0:
             reprstr += ', GPU_IDs = {' + str(self.gpu_ids) + '}'
+        if self.memory > 0:
+            reprstr += ', Memory = ' + str(self.memory)
         reprstr += ')'
         return reprstr
 
@@ -53,8 +65,16 @@ class DistributedResource(Resources):
     """Resource for AutoGluon Distributed Scheduler :class:`autogluon.distributed.DistributedTaskScheduler`
 
     Args:
-        num_cpus (int): number of cpu cores required for the training task.
-        num_gpus (int): number of gpu required for the training task.
+        num_cpus (int or float): number of cpu cores required for the training
+            task. A fraction below 1 shares a core with other tasks.
+        num_gpus (int or float): number of gpu required for the training task.
+            A fraction below 1 shares a gpu with other tasks.
+        memory (int): memory (in bytes) required for the training task, 0 if
+            it is not scheduled.
+        numa (str or None): NUMA policy of the task. With 'local', the CPUs of the
+            task are allocated within a single NUMA node when possible, and its
+            memory is allocated on that node preferably. 'bind' restricts its
+            memory to that node. None ignores the NUMA topology.
 
     Example:
         >>> def my_task():
@@ -62,8 +82,13 @@ class DistributedResource(Resources):
         >>> resource = DistributedResource(num_cpus=2, num_gpus=1)
         >>> task = Task(my_task, {}, resource)
     """
-    def __init__(self, num_cpus=1, num_gpus=0):
-        super(DistributedResource, self).__init__(num_cpus, num_gpus)
+    def __init__(self, num_cpus=1, num_gpus=0, memory=0, numa='local'):
+        super(DistributedResource, self).__init__(num_cpus, num_gpus, memory)
+        for amount in [num_cpus, num_gpus]:
+            assert amount < 1 or float(amount).is_integer(), \
+                'Fractional resources should be below 1, got {}'.format(amount)
+        assert numa in NUMA_POLICIES, 'numa should be one of {}'.format(NUMA_POLICIES)
+        self.numa = numa
         self.node = None
 
     def _ready(self, remote, cids, gids):
@@ -84,13 +109,69 @@ class DistributedResource(Resources):
             reprstr += ', nGPUs = ' + str(self.num_gpus)
         if len(self.gpu_ids) > 0:
             reprstr += ', GPU_IDs = {' + str(self.gpu_ids) + '}'
+        if self.memory > 0:
+            reprstr += ', Memory = ' + str(self.memory)
         reprstr += ')'
         return reprstr
 
 def get_cpu_count():
     return cpu_count()
 
+def get_system_cpus():
+    """CPUs this process may run on. The logical CPU `i` of the resource
+    managers is the system CPU `get_system_cpus()[i % len(get_system_cpus())]`.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(cpu_count()))
+
+def _parse_cpulist(text):
+    cpus = []
+    for part in text.strip().split(','):
+        if '-' in part:
+            first, last = part.split('-')
+            cpus.extend(range(int(first), int(last) + 1))
+        elif part:
+            cpus.append(int(part))
+    return cpus
+
+def get_numa_nodes():
+    """Logical CPUs of each NUMA node, from /sys/devices/system/node. A single
+    node holding all the CPUs if the topology is unknown.
+    """
+    return OrderedDict((node, list(cpus)) for node, cpus in _discover_numa_nodes().items())
+
+@functools.lru_cache(maxsize=None)
+def _discover_numa_nodes():
+    # the topology is read once per process
+    system_cpus = get_system_cpus()
+    node_of = {}
+    for path in glob.glob('/sys/devices/system/node/node[0-9]*/cpulist'):
+        node = int(os.path.basename(os.path.dirname(path))[len('node'):])
+        try:
+            with open(path) as f:
+                for cpu in _parse_cpulist(f.read()):
+                    node_of[cpu] = node
+        except (OSError, ValueError):
+            continue
+    nodes = OrderedDict()
+    for cid in range(cpu_count()):
+        nodes.setdefault(node_of.get(system_cpus[cid % len(system_cpus)], 0), []).append(cid)
+    return OrderedDict(sorted(nodes.items()))
+
+def get_memory_size():
+    """Memory (in bytes) available to new processes
+    """
+    try:
+        import psutil
+        return psutil.virtual_memory().available
+    except ImportError:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES')
+
+@functools.lru_cache(maxsize=None)
 def get_gpu_count():
+    """Number of GPUs, the driver is only queried on the first call
+    """
     from .nvutil import cudaInit, cudaDeviceGetCount, cudaShutdown
     if not cudaInit(): return 0
     gpu_count = cudaDeviceGetCount()
@@ -104,3 +185,23 @@ def get_remote_cpu_count(node):
 def get_remote_gpu_count(node):
     ret = node.submit(get_gpu_count)
     return ret.result()
+
+def get_remote_memory_size(node):
+    ret = node.submit(get_memory_size)
+    return ret.result()
+
+def get_remote_numa_nodes(node):
+    ret = node.submit(get_numa_nodes)
+    return ret.result()
+
+def get_resources():
+    """CPUs, GPUs, available memory and NUMA nodes of this machine
+    """
+    return {'num_cpus': get_cpu_count(), 'num_gpus': get_gpu_count(),
+            'memory': get_memory_size(), 'numa_nodes': get_numa_nodes()}
+
+def get_remote_resources(node, timeout=None):
+    """Resources of a node in a single round trip, see :func:`get_resources`
+    """
+    ret = node.submit(get_resources, pure=False)
+    return ret.result(timeout=timeout)
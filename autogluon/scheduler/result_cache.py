@@ -0,0 +1,188 @@
+"""On-disk cache of the reports of finished trials, shared across experiments"""
+import os
+import json
+import pickle
+import hashlib
+import inspect
+import logging
+import tempfile
+import threading
+
+import numpy as np
+
+from ..core.space import Space, AutoGluonObject
+
+__all__ = ['TrialResultCache']
+
+logger = logging.getLogger(__name__)
+
+
+def _canonical(obj):
+    """Json fallback for values which are not plain python types
+    """
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=repr)
+    text = repr(obj)
+    if ' at 0x' in text:
+        # default repr, which changes between runs
+        return type(obj).__module__ + '.' + type(obj).__qualname__
+    return text
+
+
+class _Uncacheable(TypeError):
+    """Raised for a fixed argument which cannot be part of a cache key
+    """
+    pass
+
+
+def _key_value(obj):
+    """Json fallback of the cache keys. Searchable objects are given by what
+    they are created from, and values without a stable representation raise
+    :class:`_Uncacheable` rather than being reduced to their type.
+    """
+    if isinstance(obj, AutoGluonObject):
+        return _object_value(obj)
+    if isinstance(obj, Space):
+        # a search space nested in a fixed argument, sampled through the config
+        return repr(obj)
+    if not isinstance(obj, (np.generic, np.ndarray, set, frozenset)) and ' at 0x' in repr(obj):
+        raise _Uncacheable('{} has no stable representation'.format(_canonical(obj)))
+    return _canonical(obj)
+
+
+def _object_value(obj):
+    # created by autogluon.func (self.func) or by autogluon.obj (repr of the class)
+    if hasattr(obj, 'func'):
+        name = '{}.{}'.format(getattr(obj.func, '__module__', ''),
+                              getattr(obj.func, '__qualname__', ''))
+        args, kwargs = obj.args, obj.kwargs
+    else:
+        name = repr(obj)
+        args, kwargs = obj._args, obj._kwargs
+    kwspaces = type(obj).kwspaces or {}
+    # the searchable arguments are part of the config
+    kwargs = {k: v for k, v in kwargs.items() if k not in kwspaces}
+    return [name, list(args), kwargs]
+
+
+def train_fn_fingerprint(train_fn):
+    """Hash of the code of the training function
+    """
+    fn = getattr(train_fn, 'f', train_fn)
+    try:
+        code = inspect.getsource(fn)
+    except (OSError, TypeError):
+        code = repr(getattr(fn, '__code__', fn).co_code) \
+            if hasattr(fn, '__code__') else repr(fn)
+    name = '{}.{}'.format(getattr(fn, '__module__', ''), getattr(fn, '__qualname__', ''))
+    return hashlib.sha1((name + '\n' + code).encode('utf-8')).hexdigest()
+
+
+class TrialResultCache(object):
+    """On-disk cache of the reports of finished trials.
+
+    The reports of a trial are stored under a hash of the code of the training
+    function, its fixed arguments, the config and the budget of the trial (e.g.
+    the `time_attr` and `max_t` of Hyperband), so that a config evaluated by a
+    previous experiment can be replayed to the searcher and the terminator
+    instead of being trained again. Only trials which were not stopped by the
+    scheduler are stored. Searchable objects (e.g. datasets created with
+    :func:`autogluon.obj`) are identified by their class and arguments, and
+    trials with a fixed argument which has no stable representation (e.g. an
+    object with the default repr) are not cached. Since the training function
+    is identified by its source code, changes to the modules it uses are not
+    detected: clear the cache directory after such changes.
+
+    Parameters
+    ----------
+    directory : str
+        Directory of the cache, one file per trial.
+
+    Examples
+    --------
+    >>> scheduler = ag.scheduler.FIFOScheduler(train_fn, num_trials=20,
+    ...                                        result_cache='~/.autogluon/trials')
+    """
+    def __init__(self, directory):
+        self.directory = os.path.expanduser(directory)
+        self._lock = threading.Lock()
+        self._fingerprints = {}
+        # fixed arguments which were reported as uncacheable
+        self._uncacheable = set()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, train_fn, args, config, budget=None):
+        """Hash identifying a trial, None if it cannot be cached
+        """
+        fingerprint = self._fingerprints.get(id(train_fn))
+        if fingerprint is None:
+            fingerprint = self._fingerprints[id(train_fn)] = train_fn_fingerprint(train_fn)
+        args_dict = args if isinstance(args, dict) else vars(args)
+        config_keys = set(k.split('.')[0] for k in config.keys())
+        # searchable objects are kept, their searchable arguments are left out
+        fixed_args = {k: v for k, v in args_dict.items()
+                      if isinstance(v, AutoGluonObject) or
+                      (k not in config_keys and k != 'task_id' and not isinstance(v, Space))}
+        try:
+            data = json.dumps([fingerprint, fixed_args, config, budget],
+                              sort_keys=True, default=_key_value)
+        except _Uncacheable as e:
+            with self._lock:
+                warn = e.args[0] not in self._uncacheable
+                self._uncacheable.add(e.args[0])
+            if warn:
+                logger.warning('Not caching the trials, {}'.format(e))
+            return None
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.pkl')
+
+    def get(self, key):
+        """List of the reported results of the trial, or None if it is not cached
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                results = pickle.load(f)
+        except FileNotFoundError:
+            results = None
+        except (pickle.UnpicklingError, EOFError, ValueError, AttributeError) as e:
+            logger.warning('Ignoring the corrupted trial cache entry {}: {}'.format(path, e))
+            results = None
+        with self._lock:
+            if results is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return results
+
+    def put(self, key, results):
+        """Store the reported results of a finished trial
+        """
+        path = self._path(key)
+        dirname = os.path.dirname(path)
+        os.makedirs(dirname, exist_ok=True)
+        # write to a temporary file first, so that readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=dirname, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(list(results), f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def __contains__(self, key):
+        return os.path.isfile(self._path(key))
+
+    def __repr__(self):
+        reprstr = self.__class__.__name__ + '(directory: {}, hits: {}, misses: {})'.format(
+            self.directory, self.hits, self.misses)
+        return reprstr
@@ -46,7 +46,8 @@ class RLScheduler(FIFOScheduler):
     controller_resource : int
         Batch size for training controllers.
     dist_ip_addrs : list of str
-        IP addresses of remote machines.
+        IP addresses of remote machines, or :class:`SimulatedNode` simulating
+        nodes on this machine.
 
     Examples
     --------
@@ -319,7 +320,7 @@ class RLScheduler(FIFOScheduler):
         destination['baseline'] = pickle.dumps(self.baseline)
         destination['TASK_ID'] = Task.TASK_ID.value
         destination['searcher'] = self.searcher.state_dict()
-        destination['training_history'] = json.dumps(self.training_history)
+        destination['training_history'] = self.training_history.state_dict()
         if self.visualizer == 'mxboard' or self.visualizer == 'tensorboard':
             destination['visualizer'] = json.dumps(self.mxboard._scalar_dict)
         return destination
@@ -335,7 +336,7 @@ class RLScheduler(FIFOScheduler):
         #self.baseline = pickle.loads(state_dict['baseline'])
         Task.set_id(state_dict['TASK_ID'])
         self.searcher.load_state_dict(state_dict['searcher'])
-        self.training_history = json.loads(state_dict['training_history'])
+        self.training_history.load_state_dict(state_dict['training_history'])
         if self.visualizer == 'mxboard' or self.visualizer == 'tensorboard':
             self.mxboard._scalar_dict = json.loads(state_dict['visualizer'])
         logger.debug('Loading Searcher State {}'.format(self.searcher))
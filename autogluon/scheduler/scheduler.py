@@ -1,56 +1,212 @@
 """Distributed Task Scheduler"""
-import os
+import time
 import pickle
+import weakref
+import functools
 import logging
-import subprocess
 from warnings import warn
 from threading import Thread
 import multiprocessing as mp
 from collections import OrderedDict
+from concurrent.futures import Future, InvalidStateError
 
 from .remote import RemoteManager
-from .resource import DistributedResourceManager
+from .resource import DistributedResource, DistributedResourceManager
 from ..core import Task
-from .reporter import StatusReporter, Communicator, DistSemaphore
+from .reporter import Communicator, DistSemaphore
+from .worker_pool import TrialWorkerPool
+from .tracer import make_span
 from ..utils import DeprecationHelper, AutoGluonWarning
 
 logger = logging.getLogger(__name__)
 
 __all__ = ['TaskScheduler', 'DistributedTaskScheduler']
 
+def _start_worker_pool():
+    TrialWorkerPool.get_pool()
+
+
+def _finish_job(job, result=None, exception=None):
+    # the job of a lost node may be finished before its Dask future
+    try:
+        if exception is not None:
+            job.set_exception(exception)
+        else:
+            job.set_result(result)
+    except InvalidStateError:
+        pass
+
+
+def _finish_remote_job(job, remote_future):
+    try:
+        _finish_job(job, remote_future.result())
+    except BaseException as e:
+        # cancelled when the node is shut down
+        _finish_job(job, exception=e)
+
+
+def _unallocated_copy(resources):
+    # the resources of a task which runs again, placed anew
+    return DistributedResource(resources.num_cpus, resources.num_gpus,
+                               resources.memory, resources.numa)
+
+
 class TaskScheduler(object):
     """Base Distributed Task Scheduler
     """
     LOCK = mp.Lock()
     RESOURCE_MANAGER = DistributedResourceManager()
     REMOTE_MANAGER = None
+    # running jobs of each node, and the schedulers, to handle lost nodes
+    NODE_JOBS = {}
+    SCHEDULERS = weakref.WeakSet()
     def __init__(self, dist_ip_addrs=None):
         if dist_ip_addrs is None:
             dist_ip_addrs=[]
         cls = TaskScheduler
+        cls.SCHEDULERS.add(self)
         if cls.REMOTE_MANAGER is None:
             cls.REMOTE_MANAGER = RemoteManager()
+            cls.REMOTE_MANAGER.add_lost_callback(cls._node_lost)
             cls.RESOURCE_MANAGER.add_remote(
                 cls.REMOTE_MANAGER.get_remotes())
-        remotes = cls.REMOTE_MANAGER.add_remote_nodes(dist_ip_addrs)
-        cls.RESOURCE_MANAGER.add_remote(remotes)
+        cls.REMOTE_MANAGER.add_remote_nodes(dist_ip_addrs, on_ready=self._node_ready)
+        self._start_worker_pools(cls.REMOTE_MANAGER.get_remotes())
         self.scheduled_tasks = []
         self.finished_tasks = []
         self.env_sem = DistSemaphore(1)
+        # threads adding the tasks which run again, see _resubmit_task
+        self._resubmissions = []
+
+    @staticmethod
+    def _start_worker_pools(remotes):
+        """Start the trial worker pools of the nodes, which import the modules
+        preloaded by the workers (mxnet), before the time budget starts
+        """
+        futures = [remote.submit(_start_worker_pool, pure=False) for remote in remotes]
+        for future in futures:
+            future.result()
+
+    @staticmethod
+    def _node_ready(remote):
+        TaskScheduler._start_worker_pools([remote])
+        TaskScheduler.RESOURCE_MANAGER.add_remote([remote])
+
+    def add_remote(self, ip_addrs, timeout=None, wait=True):
+        """Add remote nodes to the scheduler computation resource. The nodes are
+        started concurrently, and the tasks waiting for resources start on each
+        node as soon as it is ready. Nodes which fail to start within `timeout`
+        seconds are skipped.
 
-    def add_remote(self, ip_addrs):
-        """Add remote nodes to the scheduler computation resource.
+        Args:
+            ip_addrs (str or list): IP addresses of the nodes (or :class:`SimulatedNode`).
+            timeout (float): seconds for a node to start, `RemoteManager.NODE_TIMEOUT` by default.
+            wait (bool): wait for the nodes to be started, otherwise they are started in the background.
+
+        Returns:
+            The nodes which are ready, if `wait`.
         """
         ip_addrs = [ip_addrs] if isinstance(ip_addrs, str) else ip_addrs
+        def _add():
+            return TaskScheduler.REMOTE_MANAGER.add_remote_nodes(
+                ip_addrs, timeout=timeout, on_ready=self._node_ready)
+        if not wait:
+            Thread(target=_add, daemon=True).start()
+            return
+        return _add()
+
+    def remove_remote(self, ip_addrs, migrate=False, timeout=None):
+        """Remove remote nodes from the scheduler computation resource, e.g. spot
+        instances about to be reclaimed. No new task is placed on the nodes,
+        and they are shut down once their running tasks are done.
+
+        Args:
+            ip_addrs (str or list): IP addresses (or :class:`Remote` nodes, or
+                :class:`SimulatedNode`) of the nodes.
+            migrate (bool): stop the running tasks of the nodes and resume them on
+                other nodes, instead of waiting for them to finish. Not all the
+                schedulers support it.
+            timeout (float): seconds to wait for the running tasks. The nodes are
+                removed later if they are still busy.
+
+        Returns:
+            bool: whether the nodes were removed within `timeout`.
+        """
+        remotes = TaskScheduler.REMOTE_MANAGER.get_remote_nodes(ip_addrs)
+        master = TaskScheduler.REMOTE_MANAGER.get_master_node()
+        if any(remote is master for remote in remotes):
+            logger.warning('The master node cannot be removed')
+            remotes = [remote for remote in remotes if remote is not master]
+        drained = TaskScheduler.RESOURCE_MANAGER.drain_remote(remotes)
+        if migrate:
+            self._migrate_tasks_on(remotes)
+        def _shutdown(remote, event):
+            event.wait()
+            TaskScheduler.REMOTE_MANAGER.remove_remote_nodes([remote])
+        removed = True
+        for remote, event in zip(remotes, drained):
+            if event.wait(timeout):
+                TaskScheduler.REMOTE_MANAGER.remove_remote_nodes([remote])
+            else:
+                removed = False
+                Thread(target=_shutdown, args=(remote, event), daemon=True).start()
+        return removed
+
+    def _migrate_tasks_on(self, remotes):
+        """Move the running tasks of nodes being removed to other nodes
+        """
+        logger.warning('{} does not migrate the tasks of the removed nodes'.format(
+            self.__class__.__name__))
+
+    def _requeue_lost_tasks(self, remotes, jobs):
+        """Run the tasks of the `jobs` of lost nodes again on the other nodes,
+        called before the jobs are finished without result
+        """
         with self.LOCK:
-            remotes = TaskScheduler.REMOTE_MANAGER.add_remote_nodes(ip_addrs)
-            TaskScheduler.RESOURCE_MANAGER.add_remote(remotes)
+            lost = [t for t in self.scheduled_tasks if t['Job'] in jobs]
+            self.scheduled_tasks = [t for t in self.scheduled_tasks if t['Job'] not in jobs]
+        for task_dict in lost:
+            task = task_dict['Task']
+            new_task = Task(task.fn, task.args, _unallocated_copy(task.resources))
+            logger.warning('Task {} of a lost node runs again as task {}'.format(
+                task.task_id, new_task.task_id))
+            self._resubmit_task(new_task, **task_dict['Kwargs'])
+
+    def _resubmit_task(self, task, **kwargs):
+        """Add a task from a thread, e.g. from the report dispatcher or a lost
+        node callback which must not wait for resources. `join_jobs` waits
+        for it.
+        """
+        thread = Thread(target=self.add_job, args=(task,), kwargs=kwargs, daemon=True)
+        with self.LOCK:
+            self._resubmissions.append(thread)
+        thread.start()
+
+    @staticmethod
+    def _node_lost(remote):
+        """Release the resources of a lost node and finish its jobs, once each
+        scheduler requeued the tasks of the jobs
+        """
+        cls = TaskScheduler
+        cls.RESOURCE_MANAGER.drain_remote([remote])
+        with cls.LOCK:
+            jobs = cls.NODE_JOBS.pop(remote, set())
+        for scheduler in list(cls.SCHEDULERS):
+            scheduler._requeue_lost_tasks([remote], jobs)
+        logger.warning('Finishing the {} jobs of the lost {}'.format(len(jobs), remote))
+        for job in list(jobs):
+            _finish_job(job, None)
 
     @classmethod
-    def upload_files(cls, files, **kwargs):
-        """Upload files to remote machines, so that they are accessible by import or load. 
+    def upload_files(cls, files, load=True):
+        """Upload files to remote machines, so that they are accessible by import or load.
+        Only the files a machine does not have yet are sent.
+
+        Args:
+            files (str or list): paths of the files.
+            load (bool): import the `.py`, `.egg` and `.zip` files on the machines.
         """
-        cls.REMOTE_MANAGER.upload_files(files, **kwargs)
+        cls.REMOTE_MANAGER.upload_files(files, load)
 
     def _dict_from_task(self, task):
         if isinstance(task, Task):
@@ -87,7 +243,7 @@ class TaskScheduler(object):
         job = cls._start_distributed_job(task, cls.RESOURCE_MANAGER, self.env_sem)
         with self.LOCK:
             new_dict = self._dict_from_task(task)
-            new_dict['Job'] = job
+            new_dict.update({'Job': job, 'Task': task, 'Kwargs': kwargs})
             self.scheduled_tasks.append(new_dict)
 
     def run_job(self, task):
@@ -100,68 +256,95 @@ class TaskScheduler(object):
 
     @staticmethod
     def _start_distributed_job(task, resource_manager, env_sem):
+        """Submit the task to its node. The job finishes with the Dask future,
+        or when the node is lost.
+        """
         logger.debug('\nScheduling {}'.format(task))
-        job = task.resources.node.submit(TaskScheduler._run_dist_job,
-                                         task.fn, task.args, task.resources.gpu_ids,
-                                         env_sem)
+        cls = TaskScheduler
+        node = task.resources.node
+        job = Future()
+        with cls.LOCK:
+            cls.NODE_JOBS.setdefault(node, set()).add(job)
         def _release_resource_callback(fut):
+            with cls.LOCK:
+                cls.NODE_JOBS.get(node, set()).discard(job)
             resource_manager._release(task.resources)
         job.add_done_callback(_release_resource_callback)
+        # the Dask future is kept, its task is cancelled once it is released
+        job.remote_future = node.submit(TaskScheduler._run_dist_job,
+                                        task.fn, task.args, task.resources.gpu_ids,
+                                        env_sem, task.resources.cpu_ids,
+                                        getattr(task.resources, 'numa', None))
+        job.remote_future.add_done_callback(functools.partial(_finish_remote_job, job))
         return job
 
     @staticmethod
-    def _run_dist_job(fn, args, gpu_ids, env_semaphore):
-        """Executing the task
+    def _run_dist_job(fn, args, gpu_ids, env_semaphore, cpu_ids=None, numa=None):
+        """Executing the task on a warm worker of the node-local pool, pinned to
+        the CPUs allocated to the task, and to their NUMA node with a `numa` policy
         """
+        args = dict(args)
         # create local communicator
-        if 'reporter' in args:
-            local_reporter = StatusReporter()
-            dist_reporter = args['reporter']
-            args['reporter'] = local_reporter
+        dist_reporter = args.pop('reporter') if 'reporter' in args else None
         # handle terminator
         terminator_semaphore = None
         if 'terminator_semaphore' in args:
             terminator_semaphore = args.pop('terminator_semaphore')
 
-        manager = mp.Manager()
-        return_list = manager.list()
-        def _worker(return_list, **kwargs):
-            ret = fn(**kwargs)
-            return_list.append(ret)
-
+        pool = TrialWorkerPool.get_pool()
+        worker, ret, reusable = None, None, False
+        cp, spans, end_time = None, [], None
         try:
+            start_time = time.time()
             env_semaphore.acquire()
-            if len(gpu_ids) > 0:
-                # handle GPU devices
-                os.environ['CUDA_VISIBLE_DEVICES'] = ",".join(map(str, gpu_ids))
-                os.environ['MXNET_CUDNN_AUTOTUNE_DEFAULT'] = "0"
+            try:
+                acquire_time = time.time()
+                spans.append(make_span('env_wait', start_time, acquire_time))
+                worker = pool.acquire(gpu_ids, cpu_ids, numa)
+                spans.append(make_span('worker_start', acquire_time, time.time(),
+                                       reused=worker.num_trials > 0))
+            finally:
+                env_semaphore.release()
             # start local progress
-            p = mp.Process(target=_worker, args=(return_list,), kwargs=args)
-            p.start()
-            env_semaphore.release()
-            if 'reporter' in args:
-                cp = Communicator.Create(p, local_reporter, dist_reporter)
+            worker.reset_peak_rss()
+            trial_time = time.time()
+            p = worker.run(fn, args, dist_reporter is not None,
+                           getattr(dist_reporter, 'asynchronous', False),
+                           getattr(dist_reporter, 'checkpoint', None))
+            if dist_reporter is not None:
+                cp = Communicator.Create(p, worker.reporter, dist_reporter)
             if terminator_semaphore is not None:
                 terminator_semaphore.acquire()
-                if p.is_alive():
-                    if 'kill' in dir(p):
+                if cp is not None and not cp.done_seen and p.is_alive():
+                    # stop the trial at its current report, keeping the worker
+                    worker.reporter.stop()
+                    dist_reporter.move_on()
+                    worker.reporter.move_on()
+                    p.join(pool.stop_timeout)
+                    if p.is_alive():
                         p.kill()
-                        p.join()
-                    else:
-                        try:
-                            subprocess.run(['kill', '-9', str(p.pid)])
-                            subprocess.run(['kill', '-9', str(p.pid)])
-                        except Exception:
-                            pass
-                        p.join()
-            else:
-                p.join()
+            p.join()
+            end_time = time.time()
+            spans.append(make_span('trial', trial_time, end_time, pid=p.pid,
+                                   peak_rss=worker.peak_rss()))
+            reusable = True
+            if cp is not None:
+                cp.join(pool.stop_timeout)
+                reusable = not cp.is_alive()
+            ret = p.result
         except Exception as e:
             logger.error('Exception in worker process: {}'.format(e))
-        ret = return_list[0] if len(return_list) > 0 else None
+        finally:
+            if worker is not None:
+                pool.release(worker, discard=not reusable)
+                if end_time is not None:
+                    spans.append(make_span('teardown', end_time, time.time()))
+        if hasattr(dist_reporter, 'trace'):
+            if cp is not None:
+                spans.extend(cp.spans)
+            dist_reporter.trace(spans)
         return ret
 
-
     def _clean_task_internal(self, task_dict):
         pass
 
@@ -183,13 +366,20 @@ class TaskScheduler(object):
         self.join_jobs()
 
     def join_jobs(self):
-        """Wait all scheduled jobs to finish
+        """Wait all scheduled jobs to finish, including resubmitted tasks
         """
-        self._cleaning_tasks()
-        for task_dict in self.scheduled_tasks:
-            task_dict['Job'].result()
-            self._clean_task_internal(task_dict)
-        self._cleaning_tasks()
+        while True:
+            self._cleaning_tasks()
+            for task_dict in self.scheduled_tasks:
+                task_dict['Job'].result()
+                self._clean_task_internal(task_dict)
+            self._cleaning_tasks()
+            with self.LOCK:
+                resubmissions, self._resubmissions = self._resubmissions, []
+            if len(resubmissions) == 0:
+                break
+            for thread in resubmissions:
+                thread.join()
 
     def shutdown(self):
         """shutdown() is now deprecated in favor of :func:`autogluon.done`.
@@ -0,0 +1,127 @@
+"""Detection of trials running much slower than the others"""
+import logging
+import threading
+from collections import deque
+
+import numpy as np
+
+__all__ = ['StragglerDetector']
+
+logger = logging.getLogger(__name__)
+
+
+class StragglerDetector(object):
+    """Tracks the time between the reports (`time_this_iter`) of the trials and
+    of the nodes they run on, and flags the trials which are much slower than
+    the cohort of all the trials of the scheduler.
+
+    The pace of a trial is the median of the time between its last `window`
+    reports, ignoring its first report (which includes loading the data). A
+    trial is a straggler once its pace exceeds `threshold` times the median
+    pace of the other trials, and at least `min_cohort` other trials have
+    reported `min_reports` times. Each trial is flagged at most once. Finished
+    trials are still part of the cohort, but no longer count for their node.
+
+    Parameters
+    ----------
+    threshold : float
+        Slowdown compared to the cohort median above which a trial is a straggler.
+    window : int
+        Number of recent reports used for the pace of a trial.
+    min_reports : int
+        Number of reports (besides the first one) before the pace of a trial is known.
+    min_cohort : int
+        Number of other trials with a known pace needed for a comparison.
+
+    Examples
+    --------
+    >>> detector = StragglerDetector(threshold=3)
+    >>> if detector.add_report(task_id, node, reported_result['time_this_iter']):
+    ...     print('task {} is a straggler, node slowdown {}'.format(
+    ...         task_id, detector.node_slowdown(node)))
+    """
+    def __init__(self, threshold=3.0, window=5, min_reports=2, min_cohort=3):
+        self.threshold = threshold
+        self.window = window
+        self.min_reports = min_reports
+        self.min_cohort = min_cohort
+        self._lock = threading.Lock()
+        self._times = {}
+        self._nodes = {}
+        self._paces = {}
+        self._flagged = set()
+        self._finished = set()
+
+    def add_report(self, task_id, node, time_this_iter):
+        """Record the time since the previous report of a task. Returns True if
+        the task just became a straggler.
+        """
+        with self._lock:
+            if task_id not in self._times:
+                # the first report includes the start-up of the trial
+                self._times[task_id] = deque(maxlen=self.window)
+                self._nodes[task_id] = node
+                return False
+            times = self._times[task_id]
+            times.append(time_this_iter)
+            if len(times) < self.min_reports:
+                return False
+            self._paces[task_id] = float(np.median(times))
+            if task_id in self._flagged:
+                return False
+            cohort = self._cohort_pace(exclude=task_id)
+            if cohort is None or self._paces[task_id] <= self.threshold * cohort:
+                return False
+            self._flagged.add(task_id)
+        logger.info('Task {} on {} is a straggler: {:.3g}s between reports, cohort median {:.3g}s'.format(
+            task_id, node, self._paces[task_id], cohort))
+        return True
+
+    def finish(self, task_id):
+        """Record that a task finished, its node is no longer slowed down by it
+        """
+        with self._lock:
+            if task_id in self._times:
+                self._finished.add(task_id)
+
+    def _cohort_pace(self, exclude=None):
+        paces = [v for k, v in self._paces.items() if k != exclude]
+        if len(paces) < self.min_cohort:
+            return None
+        return float(np.median(paces))
+
+    def cohort_pace(self):
+        """Median time between reports over all the trials, None if unknown
+        """
+        with self._lock:
+            return self._cohort_pace()
+
+    def _running_on(self, node, task_ids):
+        return [k for k in task_ids if self._nodes[k] == node and k not in self._finished]
+
+    def node_slowdown(self, node):
+        """Median slowdown of the running trials of a node compared to the
+        cohort, 1.0 if unknown
+        """
+        with self._lock:
+            cohort = self._cohort_pace()
+            paces = [self._paces[k] for k in self._running_on(node, self._paces)]
+        if cohort is None or cohort <= 0 or len(paces) == 0:
+            return 1.0
+        return float(np.median(paces)) / cohort
+
+    def node_stragglers(self, node):
+        """Number of stragglers still running on a node
+        """
+        with self._lock:
+            return len(self._running_on(node, self._flagged))
+
+    @property
+    def stragglers(self):
+        with self._lock:
+            return sorted(self._flagged)
+
+    def __repr__(self):
+        reprstr = self.__class__.__name__ + '(threshold: {}, trials: {}, stragglers: {})'.format(
+            self.threshold, len(self._times), len(self._flagged))
+        return reprstr
@@ -0,0 +1,128 @@
+"""Timeline of the phases of the training trials"""
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from collections import OrderedDict
+
+__all__ = ['TrialTracer']
+
+logger = logging.getLogger(__name__)
+
+# phases which are not spent training
+OVERHEAD_PHASES = ['suggest', 'queue', 'env_wait', 'worker_start', 'report_wait',
+                   'handle_report', 'teardown']
+
+
+class TraceSpans(list):
+    """Spans recorded on a node, sent to the scheduler along the reports of a trial
+    """
+    pass
+
+
+def make_span(name, start, end, task_id=None, **args):
+    return {'name': name, 'start': start, 'end': end, 'task_id': task_id, 'args': args}
+
+
+class TrialTracer(object):
+    """Records timestamped spans of the phases of every trial.
+
+    The phases are 'suggest' (searcher), 'queue' (waiting for resources),
+    'env_wait' and 'worker_start' (getting a worker process on the node),
+    'trial' (running the training function), 'first_report' (from the start
+    of the trial to its first report, e.g. data loading), 'report_wait'
+    (reporter round trips), 'handle_report' (scheduler handling a report) and
+    'teardown'. Spans of a node use its own clock.
+
+    Examples
+    --------
+    >>> scheduler.run()
+    >>> scheduler.join_jobs()
+    >>> scheduler.tracer.save_chrome_trace('trace.json')
+    >>> scheduler.tracer.summary()
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans = []
+        self._lanes = {}
+
+    def add_span(self, name, start, end, task_id=None, **args):
+        with self._lock:
+            self._spans.append(make_span(name, start, end, task_id, **args))
+
+    def add_spans(self, spans):
+        with self._lock:
+            self._spans.extend(spans)
+
+    @contextmanager
+    def trace(self, name, task_id=None, **args):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add_span(name, start, time.time(), task_id, **args)
+
+    def set_lane(self, task_id, node, slot):
+        """Show the spans of a task in the lane of the resources it runs on
+        """
+        with self._lock:
+            self._lanes[task_id] = (str(node), slot)
+
+    def to_chrome_trace(self):
+        """Trace events (Chrome trace-event format), one process per node and
+        one thread per slot (first CPU of the task).
+        """
+        with self._lock:
+            spans = list(self._spans)
+            lanes = dict(self._lanes)
+        if len(spans) == 0:
+            return {'traceEvents': []}
+        t0 = min(s['start'] for s in spans)
+        pids, events = OrderedDict(), []
+        for span in spans:
+            node, slot = lanes.get(span['task_id'], ('scheduler', 0))
+            pid = pids.setdefault(node, len(pids))
+            args = dict(span['args'])
+            if span['task_id'] is not None:
+                args['task_id'] = span['task_id']
+            events.append({'name': span['name'], 'ph': 'X', 'pid': pid, 'tid': slot,
+                           'ts': (span['start'] - t0) * 1e6,
+                           'dur': max(span['end'] - span['start'], 0) * 1e6,
+                           'args': args})
+        for node, pid in pids.items():
+            events.append({'name': 'process_name', 'ph': 'M', 'pid': pid,
+                           'args': {'name': node}})
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save_chrome_trace(self, filename):
+        """Save the spans as a Chrome trace (chrome://tracing or Perfetto)
+        """
+        with open(filename, 'w') as f:
+            json.dump(self.to_chrome_trace(), f)
+        logger.info('Saved trial timeline to {}'.format(filename))
+
+    def summary(self):
+        """Total time (in seconds) spent in each phase, and the scheduler overhead
+        compared to the useful training time.
+        """
+        with self._lock:
+            spans = list(self._spans)
+        phases = OrderedDict()
+        for span in spans:
+            phase = phases.setdefault(span['name'], {'count': 0, 'total': 0.0})
+            phase['count'] += 1
+            phase['total'] += span['end'] - span['start']
+        for phase in phases.values():
+            phase['mean'] = phase['total'] / phase['count']
+        report_wait = phases.get('report_wait', {}).get('total', 0.0)
+        training = max(phases.get('trial', {}).get('total', 0.0) - report_wait, 0.0)
+        overhead = sum(phases[p]['total'] for p in OVERHEAD_PHASES if p in phases)
+        return {'phases': phases,
+                'training': training,
+                'overhead': overhead,
+                'overhead_ratio': overhead / (overhead + training) if overhead + training > 0 else 0.0}
+
+    def __repr__(self):
+        reprstr = self.__class__.__name__ + '(spans: {})'.format(len(self._spans))
+        return reprstr
@@ -0,0 +1,455 @@
+"""Warm worker processes for running training trials on a node"""
+import os
+import atexit
+import ctypes
+import logging
+import platform
+import importlib
+import threading
+import traceback
+import multiprocessing as mp
+from multiprocessing.connection import wait
+
+import cloudpickle
+
+from .reporter import StatusReporter, TrialStopped
+from .resource.resource import get_system_cpus, get_numa_nodes
+
+__all__ = ['TrialWorkerPool']
+
+logger = logging.getLogger(__name__)
+
+
+def _get_process_rss(pid):
+    """Resident set size of a process in bytes, None if unknown
+    """
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except Exception:
+        return None
+
+
+def set_process_affinity(pid, cpu_ids):
+    """Pin all the threads of a process to the given logical CPUs of the node.
+    Threads started later inherit the affinity of the thread creating them.
+    Returns the system CPUs used, None if pinning is not supported.
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        return None
+    system_cpus = get_system_cpus()
+    cpus = sorted(set(system_cpus[cid % len(system_cpus)] for cid in cpu_ids))
+    try:
+        tids = [int(tid) for tid in os.listdir('/proc/{}/task'.format(pid))]
+    except OSError:
+        tids = [pid]
+    for tid in tids:
+        try:
+            os.sched_setaffinity(tid, cpus)
+        except OSError:
+            # thread exited in the meantime
+            pass
+    return cpus
+
+
+def _reset_peak_rss(pid):
+    """Reset the peak resident set size of a process (Linux 4.0+)
+    """
+    try:
+        with open('/proc/{}/clear_refs'.format(pid), 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _get_peak_rss(pid):
+    """Peak resident set size of a process in bytes, since its last reset.
+    The current RSS if the peak is unknown.
+    """
+    try:
+        with open('/proc/{}/status'.format(pid)) as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return _get_process_rss(pid)
+
+
+# syscall numbers of set_mempolicy
+_SYS_SET_MEMPOLICY = {'x86_64': 238, 'aarch64': 237, 'ppc64le': 261}
+_MPOL_PREFERRED, _MPOL_BIND = 1, 2
+
+
+def bind_memory(numa_node, strict=False):
+    """Allocate the memory of the calling thread, and of the threads it starts
+    afterwards, on a NUMA node (only on that node if `strict`). Returns whether
+    the memory policy was set.
+    """
+    number = _SYS_SET_MEMPOLICY.get(platform.machine())
+    if number is None:
+        return False
+    num_words = numa_node // 64 + 1
+    mask = (ctypes.c_ulong * num_words)()
+    mask[numa_node // 64] = 1 << (numa_node % 64)
+    libc = ctypes.CDLL(None, use_errno=True)
+    mode = _MPOL_BIND if strict else _MPOL_PREFERRED
+    if libc.syscall(number, mode, mask, ctypes.c_ulong(num_words * 64 + 1)) != 0:
+        logger.debug('set_mempolicy failed: {}'.format(os.strerror(ctypes.get_errno())))
+        return False
+    return True
+
+
+def _preload_modules(modules):
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            logger.debug('Worker failed to preload {}'.format(module))
+
+
+def _worker_loop(conn, reporter, env, preload, membind=None):
+    """Main loop of a warm worker: receive trials one at a time and run them.
+    """
+    os.environ.update(env)
+    if membind is not None:
+        # before importing the modules, so that their threads inherit the policy
+        bind_memory(*membind)
+    _preload_modules(preload)
+    while True:
+        try:
+            msg = conn.recv_bytes()
+        except (EOFError, OSError):
+            break
+        fn, args, with_reporter, asynchronous, checkpoint = cloudpickle.loads(msg)
+        if fn is None:
+            break
+        if with_reporter:
+            reporter._reset(asynchronous, checkpoint)
+            reporter._start()
+            args['reporter'] = reporter
+        try:
+            ret = fn(**args)
+        except TrialStopped:
+            ret = None
+        except Exception:
+            traceback.print_exc()
+            ret = None
+        if with_reporter:
+            reporter._end()
+        try:
+            conn.send_bytes(cloudpickle.dumps(ret))
+        except Exception:
+            traceback.print_exc()
+            conn.send_bytes(cloudpickle.dumps(None))
+
+
+class _TrialWorker(object):
+    """A long-lived process which runs trials sequentially.
+
+    The :class:`StatusReporter` of the worker is created before the process
+    starts, so that its queue and semaphore are shared by inheritance and can
+    be reused by every trial running on this worker. Each trial ends with a
+    marker in the reporter queue, after all of its reports.
+    """
+    def __init__(self, ctx, env_key, env, preload, membind=None):
+        self.env_key = env_key
+        self.num_trials = 0
+        self.cpus = None
+        self.reporter = StatusReporter()
+        self._conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_loop,
+                                   args=(child_conn, self.reporter, env, preload, membind))
+        self.process.start()
+        child_conn.close()
+
+    def run(self, fn, args, with_reporter, asynchronous=False, checkpoint=None):
+        self.num_trials += 1
+        if with_reporter:
+            self.reporter._clear_stop()
+        self._conn.send_bytes(cloudpickle.dumps(
+            (fn, args, with_reporter, asynchronous, checkpoint)))
+        return _TrialHandle(self)
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def rss(self):
+        return _get_process_rss(self.process.pid)
+
+    def reset_peak_rss(self):
+        return _reset_peak_rss(self.process.pid)
+
+    def peak_rss(self):
+        """Peak RSS of the worker process since the start of its current trial
+        """
+        if not self.is_alive():
+            return None
+        return _get_peak_rss(self.process.pid)
+
+    def close(self, timeout=5):
+        if self.process.is_alive():
+            try:
+                self._conn.send_bytes(cloudpickle.dumps((None, None, False, False, None)))
+            except (BrokenPipeError, OSError):
+                pass
+            self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self._conn.close()
+
+    def __repr__(self):
+        reprstr = self.__class__.__name__ + '(pid: {}, trials: {}, cpus: {})'.format(
+            self.process.pid, self.num_trials, self.cpus)
+        return reprstr
+
+
+class _TrialHandle(object):
+    """Process-like view of a single trial running on a warm worker.
+
+    :meth:`is_alive` and :meth:`join` refer to the trial, not to the worker
+    process, which keeps running after the trial is done.
+    """
+    def __init__(self, worker):
+        self.worker = worker
+        self.result = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def pid(self):
+        return self.worker.process.pid
+
+    def is_alive(self):
+        return not self._done.is_set() and self.worker.is_alive()
+
+    def join(self, timeout=None):
+        with self._lock:
+            if self._done.is_set():
+                return
+            conn = self.worker._conn
+            ready = wait([conn, self.worker.process.sentinel], timeout)
+            if not ready:
+                return
+            if conn in ready:
+                try:
+                    self.result = cloudpickle.loads(conn.recv_bytes())
+                except (EOFError, OSError):
+                    self.result = None
+            self._done.set()
+
+    def kill(self):
+        if self.worker.is_alive():
+            self.worker.process.kill()
+            self.worker.process.join()
+
+
+class TrialWorkerPool(object):
+    """Node-local pool of warm worker processes for training trials.
+
+    Starting a fresh process for every trial re-imports the heavy modules
+    (mxnet, gluoncv, ...) and pays the process start-up cost each time. Instead,
+    the pool keeps long-lived workers around and dispatches trials to idle
+    workers. A worker is recycled after `max_trials_per_worker` trials, or once
+    its resident memory exceeds `max_worker_rss` bytes. Workers which were
+    killed, or did not stop in time when asked to, are discarded.
+
+    Workers are keyed by the visible GPU devices, since a process cannot switch
+    devices once CUDA has been initialized. Idle workers holding a GPU which is
+    needed by a new worker are retired first, to release their CUDA context.
+
+    Workers are also keyed by the number of CPUs of the trial: the thread pools
+    of OpenMP, MKL and the MXNet engine (`OMP_NUM_THREADS`, `MKL_NUM_THREADS`,
+    `MXNET_CPU_WORKER_NTHREADS`) are sized to it when the worker starts, and all
+    the threads of the worker are pinned to the CPUs allocated to each trial,
+    so that concurrent trials do not oversubscribe the node.
+
+    With a NUMA policy ('local' or 'bind', see
+    :class:`autogluon.scheduler.resource.DistributedResource`), the workers of
+    trials whose CPUs are within a single NUMA node are keyed by that node as
+    well, and allocate their memory on it.
+
+    Use :meth:`configure` to change the settings of the pool on the current
+    node, e.g. with :meth:`autogluon.scheduler.remote.RemoteManager.launch_each`
+    for all nodes.
+
+    Parameters
+    ----------
+    max_trials_per_worker : int
+        Number of trials after which a worker is recycled.
+    max_worker_rss : int or None
+        Resident memory (in bytes) after which a worker is recycled.
+    max_idle_workers : int
+        Number of idle workers kept alive.
+    stop_timeout : float
+        Seconds a stopped trial is given to exit before its worker is killed.
+    preload : list of str
+        Modules imported by each worker when it starts. This only matters for
+        'forkserver' and 'spawn', where the preload modules are imported once in
+        the fork server; forked workers inherit the modules of the parent.
+    start_method : str or None
+        Multiprocessing start method ('fork', 'forkserver' or 'spawn').
+    pin_cpus : bool
+        Whether to pin the workers to the CPUs allocated to their trial and
+        cap their thread pools accordingly.
+    """
+    LOCK = threading.Lock()
+    OPTIONS = {}
+    __instance = None
+
+    def __init__(self, max_trials_per_worker=50, max_worker_rss=None,
+                 max_idle_workers=2, stop_timeout=10, preload=('mxnet',),
+                 start_method=None, pin_cpus=True):
+        self.max_trials_per_worker = max_trials_per_worker
+        self.max_worker_rss = max_worker_rss
+        self.max_idle_workers = max_idle_workers
+        self.stop_timeout = stop_timeout
+        self.preload = list(preload)
+        self.pin_cpus = pin_cpus
+        self._ctx = mp.get_context(start_method)
+        if start_method == 'forkserver':
+            self._ctx.set_forkserver_preload(self.preload)
+        elif self._ctx.get_start_method() == 'fork':
+            # `import autogluon` does not import mxnet: the node imports the
+            # preload modules once, and the forked workers inherit them
+            _preload_modules(self.preload)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._busy = set()
+
+    @classmethod
+    def get_pool(cls):
+        """The pool of the current process, created on first use.
+        """
+        with cls.LOCK:
+            if cls.__instance is None:
+                cls.__instance = cls(**cls.OPTIONS)
+                atexit.register(cls.__instance.shutdown)
+            return cls.__instance
+
+    @classmethod
+    def configure(cls, **kwargs):
+        """Set the options of the pool in the current process. Existing
+        workers are shut down and replaced lazily.
+        """
+        with cls.LOCK:
+            cls.OPTIONS = kwargs
+            pool, cls.__instance = cls.__instance, None
+        if pool is not None:
+            pool.shutdown()
+
+    def acquire(self, gpu_ids, cpu_ids=None, numa=None):
+        """Get an idle worker for the given GPU devices and CPUs, or start a new one.
+        """
+        num_threads = len(cpu_ids) if self.pin_cpus and cpu_ids else None
+        membind = None
+        if num_threads is not None and numa is not None:
+            numa_node = self._get_numa_node(cpu_ids)
+            if numa_node is not None:
+                membind = (numa_node, numa == 'bind')
+        env_key = (tuple(gpu_ids), num_threads, membind)
+        retired = []
+        worker = None
+        with self._lock:
+            alive = []
+            for w in self._idle:
+                if w.is_alive():
+                    alive.append(w)
+                else:
+                    retired.append(w)
+            self._idle = alive
+            for i, w in enumerate(self._idle):
+                if w.env_key == env_key:
+                    worker = self._idle.pop(i)
+                    self._busy.add(worker)
+                    break
+            if worker is None and len(gpu_ids) > 0:
+                # release the CUDA context held by idle workers on the same devices
+                keep = []
+                for w in self._idle:
+                    if set(w.env_key[0]) & set(gpu_ids):
+                        retired.append(w)
+                    else:
+                        keep.append(w)
+                self._idle = keep
+        for w in retired:
+            w.close()
+        if worker is None:
+            worker = _TrialWorker(self._ctx, env_key, self._get_env(gpu_ids, num_threads),
+                                  self.preload, membind)
+            logger.debug('Started {}'.format(worker))
+            with self._lock:
+                self._busy.add(worker)
+        if num_threads is not None:
+            worker.cpus = set_process_affinity(worker.process.pid, cpu_ids)
+        return worker
+
+    @staticmethod
+    def _get_numa_node(cpu_ids):
+        """NUMA node holding all the given CPUs, None if they span several
+        nodes or the node has a single NUMA node
+        """
+        numa_nodes = get_numa_nodes()
+        if len(numa_nodes) <= 1:
+            return None
+        for node, cpus in numa_nodes.items():
+            if set(cpu_ids) <= set(cpus):
+                return node
+        return None
+
+    @staticmethod
+    def _get_env(gpu_ids, num_threads=None):
+        """Environment of a worker using the given GPU devices and number of CPUs
+        """
+        if len(gpu_ids) > 0:
+            env = {'CUDA_VISIBLE_DEVICES': ",".join(map(str, gpu_ids)),
+                   'MXNET_CUDNN_AUTOTUNE_DEFAULT': "0"}
+        else:
+            env = {'CUDA_VISIBLE_DEVICES': ""}
+        if num_threads is not None:
+            for name in ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'MXNET_CPU_WORKER_NTHREADS']:
+                env[name] = str(num_threads)
+        return env
+
+    def release(self, worker, discard=False):
+        """Return a worker after its trial is done, recycling it if needed.
+        """
+        with self._lock:
+            self._busy.discard(worker)
+        if discard or self._should_recycle(worker):
+            logger.debug('Recycling {}'.format(worker))
+            worker.close()
+            return
+        retired = None
+        with self._lock:
+            self._idle.append(worker)
+            if len(self._idle) > self.max_idle_workers:
+                retired = self._idle.pop(0)
+        if retired is not None:
+            retired.close()
+
+    def _should_recycle(self, worker):
+        if not worker.is_alive():
+            return True
+        if worker.num_trials >= self.max_trials_per_worker:
+            return True
+        if self.max_worker_rss is not None:
+            rss = worker.rss()
+            if rss is not None and rss > self.max_worker_rss:
+                return True
+        return False
+
+    def shutdown(self):
+        with self._lock:
+            workers = self._idle + list(self._busy)
+            self._idle = []
+            self._busy = set()
+        for worker in workers:
+            worker.close()
+
+    def __repr__(self):
+        reprstr = self.__class__.__name__ + '(' + \
+            'idle workers: {}, busy workers: {})'.format(len(self._idle), len(self._busy))
+        return reprstr
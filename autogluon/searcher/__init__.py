@@ -1,4 +1,10 @@
+from ..utils.lazy_import import lazy_package
 from .searcher import *
-from .skopt_searcher import *
-from .rl_controller import *
 from .grid_searcher import *
+from .prefetch_searcher import *
+
+# scikit-optimize and mxnet are imported on first use of their searchers
+__getattr__, __dir__ = lazy_package(__name__, exports={
+    '.skopt_searcher': ['SKoptSearcher'],
+    '.rl_controller': ['RLSearcher', 'LSTMController'],
+})
@@ -0,0 +1,191 @@
+import pickle
+import logging
+import threading
+from collections import deque
+from multiprocessing.pool import ThreadPool
+
+from .searcher import BaseSearcher
+
+__all__ = ['PrefetchSearcher']
+
+logger = logging.getLogger(__name__)
+
+
+class PrefetchSearcher(BaseSearcher):
+    """Searcher wrapper which computes the next suggestions ahead of time.
+
+    A background worker keeps up to `prefetch` suggestions of the wrapped
+    searcher ready, so that :meth:`get_config` returns as soon as a slot frees
+    up, while a slow model-based searcher computes the following ones. Pending
+    suggestions are discarded whenever :meth:`update` brings new information,
+    unless `invalidate_on_update` is False (e.g. for random or grid search).
+
+    Suggestions are computed without the keyword arguments of :meth:`get_config`.
+    The background worker is stopped by :meth:`close`, when the searcher is
+    garbage collected or at the end of a `with` block. Schedulers create one
+    for the searchers named with a 'prefetch_' prefix, e.g. 'prefetch_skopt'.
+
+    Parameters
+    ----------
+    searcher : BaseSearcher
+        The searcher computing the suggestions.
+    prefetch : int
+        Number of suggestions kept ready.
+    invalidate_on_update : bool
+        Whether to discard pending suggestions after each update.
+    timeout : float or None
+        Seconds to wait for a suggestion.
+
+    Examples
+    --------
+    >>> searcher = PrefetchSearcher(SKoptSearcher(train_fn.cs), prefetch=2)
+    >>> scheduler = ag.scheduler.FIFOScheduler(train_fn, searcher=searcher,
+    ...                                        num_trials=20)
+    >>> scheduler = ag.scheduler.FIFOScheduler(train_fn, searcher='prefetch_skopt',
+    ...                                        search_options={'prefetch': 2},
+    ...                                        num_trials=20)
+    """
+    def __init__(self, searcher, prefetch=2, invalidate_on_update=True, timeout=None):
+        assert isinstance(searcher, BaseSearcher)
+        self.searcher = searcher
+        self.configspace = searcher.configspace
+        self._nprefetch = prefetch
+        self._invalidate_on_update = invalidate_on_update
+        self._timeout = timeout
+        self._init_prefetch()
+
+    def _init_prefetch(self):
+        # serializes the calls to the wrapped searcher
+        self._lock = threading.Lock()
+        self._buffer_lock = threading.Lock()
+        self._buffer = deque()
+        # computed suggestions which were not handed out yet
+        self._reserved = set()
+        self._generation = 0
+        self._worker_pool = ThreadPool(1)
+
+    @property
+    def _results(self):
+        return self.searcher._results
+
+    def _sample(self, generation):
+        if generation is not None and generation != self._generation:
+            # invalidated before it was computed
+            return None
+        with self._lock:
+            config = self.searcher.get_config()
+            self._reserved.add(pickle.dumps(config))
+            return config
+
+    def _prefetch(self):
+        async_ret = self._worker_pool.apply_async(self._sample, (self._generation,))
+        self._buffer.append(async_ret)
+
+    def _discard(self, async_ret):
+        """Release the reservation of a suggestion which was never handed out
+        """
+        config = async_ret.get()
+        if config is None:
+            return
+        k = pickle.dumps(config)
+        with self._lock:
+            if k in self._reserved:
+                self._reserved.remove(k)
+                self._results.pop(k, None)
+
+    def get_config(self, **kwargs):
+        """Hand out the next prefetched suggestion
+        """
+        with self._buffer_lock:
+            if self._worker_pool is None:
+                raise RuntimeError('{} is closed'.format(self.__class__.__name__))
+            if len(self._buffer) == 0:
+                self._prefetch()
+            async_ret = self._buffer.popleft()
+            while len(self._buffer) < self._nprefetch:
+                self._prefetch()
+        config = async_ret.get(timeout=self._timeout)
+        with self._lock:
+            if config is None:
+                # invalidated after it was handed out
+                config = self.searcher.get_config(**kwargs)
+            self._reserved.discard(pickle.dumps(config))
+        return config
+
+    def update(self, config, reward, **kwargs):
+        with self._lock:
+            self.searcher.update(config, reward, **kwargs)
+        if self._invalidate_on_update:
+            with self._buffer_lock:
+                if self._worker_pool is None:
+                    return
+                self._generation += 1
+                stale = list(self._buffer)
+                self._buffer.clear()
+                for async_ret in stale:
+                    self._worker_pool.apply_async(self._discard, (async_ret,))
+                while len(self._buffer) < self._nprefetch:
+                    self._prefetch()
+
+    def close(self):
+        """Stop the background worker, pending suggestions are dropped
+        """
+        pool = getattr(self, '_worker_pool', None)
+        if pool is None:
+            return
+        with self._buffer_lock:
+            self._worker_pool = None
+            self._buffer.clear()
+        pool.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def register_pending(self, config, milestone=None):
+        with self._lock:
+            self.searcher.register_pending(config, milestone)
+
+    def evaluation_failed(self, config, **kwargs):
+        with self._lock:
+            self.searcher.evaluation_failed(config, **kwargs)
+
+    def get_best_state_path(self):
+        return self.searcher.get_best_state_path()
+
+    def get_best_state(self):
+        return self.searcher.get_best_state()
+
+    def update_best_state(self, filepath):
+        self.searcher.update_best_state(filepath)
+
+    def __getstate__(self):
+        # pending suggestions are not saved, their reservations are released on load
+        with self._lock:
+            pending = list(self._reserved)
+            searcher = pickle.dumps(self.searcher)
+        return {'searcher': searcher,
+                'pending': pending,
+                '_nprefetch': self._nprefetch,
+                '_invalidate_on_update': self._invalidate_on_update,
+                '_timeout': self._timeout}
+
+    def __setstate__(self, state):
+        state = dict(state)
+        pending = state.pop('pending')
+        state['searcher'] = pickle.loads(state['searcher'])
+        self.__dict__.update(state)
+        self.configspace = self.searcher.configspace
+        self._init_prefetch()
+        for k in pending:
+            self._results.pop(k, None)
+
+    def __repr__(self):
+        reprstr = self.__class__.__name__ + '(prefetch: {}, searcher: {})'.format(
+            self._nprefetch, self.searcher)
+        return reprstr
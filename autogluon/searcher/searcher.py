@@ -38,6 +38,25 @@ class BaseSearcher(object):
         """
         raise NotImplementedError('This function needs to be overwritten in %s.'%(self.__class__.__name__))
 
+    def get_configs(self, n, pending=None, **kwargs):
+        """Function to sample a batch of new configurations
+
+        This function is called inside TaskScheduler when several resources
+        are available at once. Searchers may override it to return diverse
+        configurations, also taking into account the pending evaluations.
+
+        Args:
+        n: int
+            Number of configurations
+        pending: list of dict
+            Configurations being evaluated, defaults to the ones registered
+            by register_pending (if the searcher keeps track of them)
+        kwargs:
+            Extra information may be passed from scheduler to searcher
+        returns: list of configs
+        """
+        return [self.get_config(**kwargs) for _ in range(n)]
+
     def update(self, config, reward, **kwargs):
         """Update the searcher with the newest metric report
 
@@ -75,6 +94,14 @@ class BaseSearcher(object):
         """
         pass
 
+    def evaluation_failed(self, config, **kwargs):
+        """
+        Signals to searcher that the evaluation of config ended without a
+        final update, e.g. the training function raised an error, so that
+        model-based searchers no longer consider it pending.
+        """
+        pass
+
     def get_best_reward(self):
         with self.LOCK:
             if len(self._results) > 0:
@@ -15,6 +15,17 @@ from .searcher import BaseSearcher
 __all__ = ['SKoptSearcher']
 logger = logging.getLogger(__name__)
 
+def _constant_lie(yi, strategy):
+    """Objective value assigned to pending points by the constant liar strategy
+    """
+    if len(yi) == 0:
+        return 0.0
+    if strategy == 'cl_max':
+        return max(yi)
+    if strategy == 'cl_mean':
+        return sum(yi) / len(yi)
+    return min(yi)
+
 class SKoptSearcher(BaseSearcher):
     """SKopt Searcher for ConfigSpace. Requires that 'scikit-optimize' package is installed.
     
@@ -65,10 +76,16 @@ class SKoptSearcher(BaseSearcher):
         max_tries number of configs to try out.
         If all of these have configs have already been scheduled to try (might happen in asynchronous setting), 
         then get_config simply reverts to random search via random_config().
+
+        - get_configs(n) asks skopt for a batch of n configs with the constant liar strategy
+        (`batch_strategy`, 'cl_min' by default), where the pending evaluations are also
+        assigned the lie, so that the batch does not duplicate running configs.
     """
     
-    def __init__(self, configspace, **kwargs):
+    def __init__(self, configspace, batch_strategy='cl_min', **kwargs):
         BaseSearcher.__init__(self, configspace)
+        self.batch_strategy = batch_strategy
+        self._pending = OrderedDict()
         self.hp_ordering = configspace.get_hyperparameter_names() # fix order of hyperparams in configspace.
         skopt_hpspace = []
         for hp in self.hp_ordering:
@@ -137,6 +154,66 @@ class SKoptSearcher(BaseSearcher):
         logger.info("used random search instead of skopt to produce new hyperparameter configuration in this trial")
         return self.random_config()
     
+    def get_configs(self, n, pending=None, **kwargs):
+        """Function to sample a batch of n new configurations, using the constant liar
+        strategy of skopt. Configs which are pending evaluation are told to the
+        surrogate model with the lie as their reward.
+
+        Parameters
+        ----------
+        n: int
+            number of configurations
+        pending: list of dict
+            configurations being evaluated, defaults to the registered pending ones.
+        returns: list of configs
+        """
+        configs = []
+        if len(self._results) == 0:
+            configs.append(self.default_config())
+        n_points = n - len(configs)
+        if n_points <= 0:
+            return configs
+        if pending is None:
+            with self.LOCK:
+                pending = list(self._pending.values())
+        optimizer = self.bayes_optimizer
+        try:
+            if len(pending) > 0:
+                optimizer = optimizer.copy(random_state=optimizer.rng)
+                lie = _constant_lie(optimizer.yi, self.batch_strategy)
+                optimizer.tell([self.config2skopt(c) for c in pending], [lie] * len(pending))
+            new_points = optimizer.ask(n_points=n_points, strategy=self.batch_strategy)
+        except ValueError:
+            new_points = []
+        for point in new_points:
+            new_config = None
+            try:
+                new_config_cs = self.skopt2config(point)
+                new_config_cs.is_valid_configuration()
+                new_config = new_config_cs.get_dictionary()
+            except ValueError:
+                pass
+            if new_config is None or pickle.dumps(new_config) in self._results.keys():
+                new_config = self.random_config()
+            else:
+                self._results[pickle.dumps(new_config)] = 0
+            configs.append(new_config)
+        while len(configs) < n:
+            configs.append(self.random_config())
+        return configs
+
+    def register_pending(self, config, milestone=None):
+        """Pending configs are assigned the constant lie in get_configs()
+        """
+        with self.LOCK:
+            self._pending[pickle.dumps(config)] = config
+
+    def evaluation_failed(self, config, **kwargs):
+        """Failed configs are no longer assigned the constant lie
+        """
+        with self.LOCK:
+            self._pending.pop(pickle.dumps(config), None)
+
     def default_config(self):
         """ Function to return the default configuration that should be tried first.
         
@@ -167,6 +244,9 @@ class SKoptSearcher(BaseSearcher):
         """Update the searcher with the newest metric report
         """
         super(SKoptSearcher, self).update(config, reward, **kwargs)
+        if kwargs.get('done', False) or kwargs.get('terminated', False):
+            with self.LOCK:
+                self._pending.pop(pickle.dumps(config), None)
         try:
             self.bayes_optimizer.tell(self.config2skopt(config),
                                       -reward)  # provide negative reward since skopt performs minimization
@@ -176,6 +256,12 @@ class SKoptSearcher(BaseSearcher):
             'Finished Task with config: {} and reward: {}'.format(pickle.dumps(config), reward))
         logger.info('Finished Task with config: {} and reward: {}'.format(pickle.dumps(config), reward))
 
+    def __setstate__(self, state):
+        # searchers saved before batch suggestions were supported
+        state.setdefault('batch_strategy', 'cl_min')
+        state.setdefault('_pending', OrderedDict())
+        self.__dict__.update(state)
+
     def config2skopt(self, config):
         """ Converts autogluon config (dict object) to skopt format (list object).
 
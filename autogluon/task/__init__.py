@@ -1,2 +1,5 @@
+from ..utils import try_import_mxnet
+try_import_mxnet()
+
 from .base import BaseTask
-from .image_classification import ImageClassification 
+from .image_classification import ImageClassification
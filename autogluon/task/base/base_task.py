@@ -3,6 +3,7 @@ import collections
 import mxnet as mx
 from abc import abstractmethod
 from ...scheduler import *
+from ...scheduler import RLScheduler
 from .base_predictor import *
 
 __all__ = ['BaseDataset', 'BaseTask']
@@ -26,8 +27,17 @@ class BaseTask(object):
     """
     Dataset = BaseDataset
     @classmethod
-    def run_fit(cls, train_fn, search_strategy, scheduler_options):
+    def run_fit(cls, train_fn, search_strategy, scheduler_options,
+                final_fit_reserve=0.0):
+        """Search the hyperparameters, then train with the best config.
+        With a time budget (`time_out` of the scheduler), a fraction
+        `final_fit_reserve` of it is kept for the final fit.
+        """
         start_time = time.time()
+        time_out = scheduler_options.get('time_out')
+        if time_out and final_fit_reserve > 0:
+            scheduler_options = dict(scheduler_options,
+                                     time_out=time_out * (1 - final_fit_reserve))
         # create scheduler and schedule tasks
         if isinstance(search_strategy, str):
             scheduler = schedulers[search_strategy.lower()]
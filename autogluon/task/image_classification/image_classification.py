@@ -42,6 +42,7 @@ class ImageClassification(BaseTask):
             search_strategy='random',
             search_options={},
             time_limits=None,
+            final_fit_reserve=0.0,
             resume=False,
             checkpoint='checkpoint/exp1.ag',
             visualizer='none',
@@ -68,7 +69,10 @@ class ImageClassification(BaseTask):
         num_trials : (int)
             number of trials in the experiment.
         time_limits : (int)
-            training time limits in seconds.
+            training time limits in seconds. Trials still running at the
+            deadline are stopped.
+        final_fit_reserve : (float)
+            fraction of `time_limits` kept for training the best config at the end.
         resources_per_trial : (dict)
             Machine resources to allocate per trial.
         savedir : (str)
@@ -131,7 +135,7 @@ class ImageClassification(BaseTask):
                 'grace_period': grace_period if grace_period else epochs//4})
 
         results = BaseTask.run_fit(train_image_classification, search_strategy,
-                                   scheduler_options)
+                                   scheduler_options, final_fit_reserve)
         args = sample_config(train_image_classification.args, results['best_config'])
 
         model = get_network(args.net, results['num_classes'], mx.cpu(0))
@@ -1,3 +1,5 @@
+import math
+import os
 import warnings
 import logging
 
@@ -28,15 +30,17 @@ lr_schedulers = {
 @args()
 def train_image_classification(args, reporter):
     batch_size = args.batch_size * max(args.num_gpus, 1)
-    ctx = [mx.gpu(i) for i in range(args.num_gpus)] if args.num_gpus > 0 else [mx.cpu()]
+    ctx = [mx.gpu(i) for i in range(int(math.ceil(args.num_gpus)))] if args.num_gpus > 0 else [mx.cpu()]
 
     net = get_network(args.net, args.dataset.num_classes, ctx)
     if args.hybridize:
         net.hybridize(static_alloc=True, static_shape=True)
 
     input_size = net.input_size if hasattr(net, 'input_size') else args.input_size
+    # no more data loading workers than the CPUs the trial is pinned to
+    num_workers = min(args.num_workers, int(os.environ.get('OMP_NUM_THREADS', args.num_workers)))
     train_data, val_data, batch_fn, num_batches = get_data_loader(
-            args.dataset, input_size, batch_size, args.num_workers, args.final_fit)
+            args.dataset, input_size, batch_size, num_workers, args.final_fit)
     
     if isinstance(args.lr_scheduler, str):
         lr_scheduler = lr_schedulers[args.lr_scheduler](num_batches * args.epochs,
@@ -48,6 +52,17 @@ def train_image_classification(args, reporter):
 
     metric = get_metric_instance(args.metric)
 
+    def save_checkpoint(prefix):
+        net.save_parameters(prefix + '.params')
+        trainer.save_states(prefix + '.states')
+
+    def load_checkpoint(prefix):
+        net.load_parameters(prefix + '.params', ctx=ctx)
+        trainer.load_states(prefix + '.states')
+
+    # paused trials resume from their last milestone
+    start_epoch = reporter.register_checkpoint(save_checkpoint, load_checkpoint)
+
     def train(epoch):
         for i, batch in enumerate(train_data):
             default_train_fn(net, batch, batch_size, args.loss, trainer, batch_fn, ctx)
@@ -60,7 +75,7 @@ def train_image_classification(args, reporter):
         _, reward = metric.get()
         reporter(epoch=epoch, classification_reward=reward)
 
-    for epoch in range(1, args.epochs + 1):
+    for epoch in range(start_epoch + 1, args.epochs + 1):
         train(epoch)
         if not args.final_fit:
             test(epoch)
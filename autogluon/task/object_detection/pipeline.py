@@ -1,3 +1,4 @@
+import math
 import warnings
 import logging
 
@@ -27,7 +28,7 @@ def train_object_detection(args, reporter):
     # Set Hyper-params
     def _init_hparams():
         ctx = [mx.gpu(i)
-               for i in range(args.num_gpus)] if args.num_gpus > 0 else [mx.cpu()]
+               for i in range(int(math.ceil(args.num_gpus)))] if args.num_gpus > 0 else [mx.cpu()]
         return ctx
     ctx = _init_hparams()
 
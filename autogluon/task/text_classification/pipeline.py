@@ -1,3 +1,4 @@
+import math
 import mxnet as mx
 import psutil
 from mxnet.gluon import nn
@@ -59,7 +60,7 @@ def train_text_classification(args: dict, reporter: StatusReporter, task_id: int
     def _init_hparams():
         batch_size = args.data.batch_size * max(args.num_gpus, 1)
         ctx = [mx.gpu(i)
-               for i in range(args.num_gpus)] if args.num_gpus > 0 else [mx.cpu()]
+               for i in range(int(math.ceil(args.num_gpus)))] if args.num_gpus > 0 else [mx.cpu()]
         return batch_size, ctx
 
     batch_size, ctx = _init_hparams()
@@ -1,16 +1,21 @@
-from .files import *
+from .lazy_import import lazy_package
 from .miscs import *
-from .mxutils import *
 from .deprecate import *
-from .visualizer import *
 from .try_import import *
 from .file_helper import *
 from .edict import EasyDict
 from .serialization import *
-from .data_analyzer import *
-from .dataloader import DataLoader
-from .plots import *
 from .tqdm import tqdm
 from .custom_queue import Queue
 from .defaultdict import keydefaultdict
 from .util_decorator import classproperty
+
+# modules importing mxnet, matplotlib, pandas or requests are loaded on first use
+__getattr__, __dir__ = lazy_package(__name__, exports={
+    '.files': ['unzip', 'download', 'mkdir', 'check_sha1', 'raise_num_file'],
+    '.mxutils': ['update_params', 'collect_params', 'get_data_rec', 'read_remote_ips'],
+    '.visualizer': ['plot_network'],
+    '.data_analyzer': ['Visualizer', 'DataAnalyzer'],
+    '.dataloader': ['DataLoader'],
+    '.plots': ['plot_performance_vs_trials', 'plot_summary_of_models', 'mousover_plot'],
+})
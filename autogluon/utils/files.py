@@ -144,5 +144,3 @@ def raise_num_file(nofile_atleast=4096):
                soft,hard = res.getrlimit(res.RLIMIT_NOFILE)
 
     return soft,hard
-
-raise_num_file()
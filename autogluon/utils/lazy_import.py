@@ -0,0 +1,46 @@
+"""Lazy loading of the submodules of a package and of the names they export"""
+import sys
+import importlib
+
+__all__ = ['lazy_package']
+
+
+def lazy_package(package, submodules=(), exports=None):
+    """Module `__getattr__` and `__dir__` (PEP 562) of a package whose heavy
+    submodules (mxnet, dask, gluoncv, ...) are only imported when one of their
+    names is first used.
+
+    Parameters
+    ----------
+    package : str
+        `__name__` of the package.
+    submodules : list of str
+        Submodules available as attributes of the package, e.g. `ag.scheduler`.
+    exports : dict
+        Modules (relative to the package) mapped to the names the package
+        exports from them, like a `from .module import *` of their `__all__`.
+
+    Examples
+    --------
+    >>> __getattr__, __dir__ = lazy_package(
+    ...     __name__, submodules=['plots'], exports={'.visualizer': ['plot_network']})
+    """
+    submodules = set(submodules)
+    attributes = {name: module for module, names in (exports or {}).items() for name in names}
+
+    def __getattr__(name):
+        if name in attributes:
+            value = getattr(importlib.import_module(attributes[name], package), name)
+        elif name in submodules:
+            value = importlib.import_module('.' + name, package)
+        else:
+            raise AttributeError('module {!r} has no attribute {!r}'.format(package, name))
+        # later accesses do not go through __getattr__
+        setattr(sys.modules[package], name, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[package])) | submodules | set(attributes))
+
+    return __getattr__, __dir__
+
@@ -6,8 +6,9 @@ from tqdm import tqdm as base
 __all__ = ['tqdm']
 
 
-if True:  # pragma: no cover
-    # import IPython/Jupyter base widget and display utilities
+if in_ipynb():  # pragma: no cover
+    # import IPython/Jupyter base widget and display utilities, only used in
+    # notebooks (importing IPython takes a while)
     IPY = 0
     IPYW = 0
     try:  # IPython 4.x
@@ -0,0 +1,308 @@
+"""Benchmark of the overhead of the schedulers, with synthetic training functions.
+
+Runs each scheduler on a grid of concurrency, number of trials and reports per
+trial, with a training function which only sleeps (or does nothing) between
+reports, and writes the measurements to a json file.
+
+Examples
+--------
+python benchmark/scheduler_overhead.py --schedulers fifo hyperband_stopping \
+    --num-trials 20 --concurrency 1 2 --reports-per-trial 1 10 \
+    --output overhead.json
+python benchmark/scheduler_overhead.py --baseline overhead_old.json --output overhead_new.json
+python benchmark/scheduler_overhead.py --schedulers fifo --simulated-nodes 8 \
+    --simulated-cpus 4 --concurrency 8 32 --output overhead_8_nodes.json
+"""
+import os
+import sys
+import json
+import time
+import pickle
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import itertools
+import subprocess
+import resource as _resource
+
+import numpy as np
+
+import autogluon as ag
+from autogluon.scheduler.reporter import ReportDispatcher
+from autogluon.scheduler.resource import get_cpu_count
+from autogluon.scheduler.remote import SimulatedNode
+
+SCHEDULERS = ['fifo', 'hyperband_stopping', 'hyperband_promotion', 'rl']
+
+logger = logging.getLogger(__name__)
+
+
+# CLI
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the scheduling overhead.')
+    parser.add_argument('--schedulers', type=str, nargs='+', default=SCHEDULERS,
+                        choices=SCHEDULERS, help='schedulers to benchmark')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4],
+                        help='numbers of trials running at the same time '
+                             '(values above the number of CPUs are skipped)')
+    parser.add_argument('--num-trials', type=int, nargs='+', default=[10, 50],
+                        help='numbers of trials')
+    parser.add_argument('--reports-per-trial', type=int, nargs='+', default=[1, 10, 100],
+                        help='numbers of reports of each trial')
+    parser.add_argument('--report-interval', type=float, default=0.0,
+                        help='seconds slept between two reports (0: no-op training)')
+    parser.add_argument('--async-reports', action='store_true', default=False,
+                        help='use asynchronous reports (fifo and hyperband)')
+    parser.add_argument('--simulated-nodes', type=int, default=0,
+                        help='number of nodes simulated on this machine, added to the local node')
+    parser.add_argument('--simulated-cpus', type=int, default=4,
+                        help='number of CPUs advertised by each simulated node')
+    parser.add_argument('--simulated-processes', action='store_true', default=False,
+                        help='run each simulated node in its own process')
+    parser.add_argument('--channel-reports', type=int, default=1000,
+                        help='number of reports sent through the report channel alone '
+                             'to measure its round trip (0: skip)')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='number of runs of each case')
+    parser.add_argument('--output', type=str, default='scheduler_overhead.json',
+                        help='json file of the results')
+    parser.add_argument('--baseline', type=str, default=None,
+                        help='json file of previous results to compare with')
+    parser.add_argument('--debug', action='store_true', default=False,
+                        help='debug if needed')
+    return parser.parse_args()
+
+
+# categorical spaces, which are supported by the RL controller as well
+@ag.args(
+    lr=ag.space.Categorical(1e-3, 3e-3, 1e-2, 3e-2, 1e-1),
+    wd=ag.space.Categorical(1e-5, 1e-4, 1e-3),
+    epochs=10,
+    interval=0.0,
+)
+def train_fn(args, reporter):
+    for e in range(args.epochs):
+        if args.interval > 0:
+            time.sleep(args.interval)
+        reporter(epoch=e + 1, accuracy=1.0 - np.exp(-args.lr * (e + 1)) - args.wd)
+
+
+def _current_rss():
+    """Resident memory of this process in bytes, None if unknown
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return None
+
+
+def _peak_rss():
+    # ru_maxrss is in kilobytes on Linux
+    return _resource.getrusage(_resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _percentiles(values):
+    if len(values) == 0:
+        return None
+    p50, p90, p99 = np.percentile(values, [50, 90, 99]).tolist()
+    return {'count': len(values), 'mean': float(np.mean(values)),
+            'p50': p50, 'p90': p90, 'p99': p99, 'max': float(np.max(values))}
+
+
+def _span_durations(scheduler, name):
+    durations = []
+    for event in scheduler.tracer.to_chrome_trace()['traceEvents']:
+        if event['ph'] == 'X' and event['name'] == name:
+            durations.append(event['dur'] / 1e6)
+    return durations
+
+
+def create_scheduler(name, num_trials, num_cpus, reports, args, checkpoint):
+    train_fn.update(epochs=reports, interval=args.report_interval)
+    resource = {'num_cpus': num_cpus, 'num_gpus': 0}
+    # the nodes are started with the first scheduler, and kept for the next ones
+    dist_ip_addrs, args.nodes = args.nodes, []
+    if name == 'fifo':
+        return ag.scheduler.FIFOScheduler(
+            train_fn, resource=resource, num_trials=num_trials, checkpoint=checkpoint,
+            reward_attr='accuracy', time_attr='epoch', async_reports=args.async_reports,
+            dist_ip_addrs=dist_ip_addrs)
+    if name.startswith('hyperband'):
+        return ag.scheduler.HyperbandScheduler(
+            train_fn, resource=resource, num_trials=num_trials, checkpoint=checkpoint,
+            reward_attr='accuracy', time_attr='epoch', max_t=reports,
+            grace_period=1, reduction_factor=3, type=name.split('_')[1],
+            async_reports=args.async_reports, dist_ip_addrs=dist_ip_addrs)
+    if name == 'rl':
+        # the controller does not hold CPUs, so that it does not change the concurrency
+        return ag.scheduler.RLScheduler(
+            train_fn, resource=resource, num_trials=num_trials, checkpoint=checkpoint,
+            reward_attr='accuracy', time_attr='epoch',
+            controller_resource={'num_cpus': 0, 'num_gpus': 0}, dist_ip_addrs=dist_ip_addrs)
+    raise ValueError('unknown scheduler {}'.format(name))
+
+
+def measure_report_channel(num_reports):
+    """Round trip of a synchronous report through the report channel, from a
+    reporter connected like the one of a remote trial, without any scheduler
+    """
+    def handler(reporter, reported_result):
+        if reported_result is not None:
+            reporter.move_on()
+        return reported_result is None
+    dispatcher = ReportDispatcher()
+    dispatcher.start()
+    reporter = dispatcher.add_stream(handler)
+    remote_reporter = pickle.loads(pickle.dumps(reporter))
+    latencies = []
+    for i in range(num_reports):
+        start = time.time()
+        remote_reporter(epoch=i)
+        latencies.append(time.time() - start)
+    dispatcher.end_stream(reporter)
+    dispatcher.wait_stream(reporter, timeout=10)
+    dispatcher.stop()
+    return _percentiles(latencies)
+
+
+def total_cpu_count(args):
+    """CPUs of the local node and of the simulated nodes
+    """
+    return get_cpu_count() + args.simulated_nodes * args.simulated_cpus
+
+
+def run_case(name, concurrency, num_trials, reports, args):
+    """Run one scheduler to completion and measure its overhead
+    """
+    total_cpus = total_cpu_count(args)
+    num_cpus = total_cpus // concurrency
+    tmpdir = tempfile.mkdtemp(prefix='ag_overhead_')
+    try:
+        scheduler = create_scheduler(name, num_trials, num_cpus, reports, args,
+                                     os.path.join(tmpdir, 'checkpoint.ag'))
+        rss_before = _current_rss()
+        cpu_start, wall_start = time.process_time(), time.time()
+        scheduler.run()
+        scheduler.join_jobs()
+        wall = time.time() - wall_start
+        cpu = time.process_time() - cpu_start
+        rss_after = _current_rss()
+        summary = scheduler.tracer.summary()
+        num_reports = scheduler.training_history.num_reports
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return {
+        'scheduler': name,
+        'simulated_nodes': args.simulated_nodes,
+        'simulated_cpus': args.simulated_cpus if args.simulated_nodes > 0 else None,
+        'concurrency': concurrency,
+        'num_cpus_per_trial': num_cpus,
+        'num_trials': num_trials,
+        'reports_per_trial': reports,
+        'report_interval': args.report_interval,
+        'async_reports': args.async_reports,
+        'wall_time': wall,
+        'trials_per_sec': num_trials / wall if wall > 0 else None,
+        'num_reports': num_reports,
+        'reports_per_sec': num_reports / wall if wall > 0 else None,
+        # round trip of a report, seen from the trial
+        'report_latency': _percentiles(_span_durations(scheduler, 'report_wait')),
+        # handling of a report by the scheduler
+        'handle_report': _percentiles(_span_durations(scheduler, 'handle_report')),
+        'master_cpu_time': cpu,
+        'master_cpu_util': cpu / wall if wall > 0 else None,
+        'master_rss': rss_after,
+        'master_rss_growth': rss_after - rss_before if rss_before is not None else None,
+        'master_peak_rss': _peak_rss(),
+        'overhead_ratio': summary['overhead_ratio'],
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        'autogluon': ag.__version__,
+        'git_revision': _git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'argv': sys.argv[1:],
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def _case_key(result):
+    return (result['scheduler'], result.get('simulated_nodes', 0), result['concurrency'],
+            result['num_trials'],
+            result['reports_per_trial'], result['report_interval'], result['async_reports'])
+
+
+def compare(results, baseline_file):
+    """Print the change of throughput and report latency compared to a previous run
+    """
+    with open(baseline_file) as f:
+        baseline = {_case_key(r): r for r in json.load(f)['results']}
+    print('{:<22}{:>6}{:>8}{:>9}{:>16}{:>16}'.format(
+        'scheduler', 'conc', 'trials', 'reports', 'trials/sec', 'p50 latency'))
+    for result in results:
+        old = baseline.get(_case_key(result))
+        if old is None:
+            continue
+        def change(new_value, old_value):
+            if not new_value or not old_value:
+                return 'n/a'
+            return '{:+.1f}%'.format(100.0 * (new_value - old_value) / old_value)
+        new_p50 = (result['report_latency'] or {}).get('p50')
+        old_p50 = (old['report_latency'] or {}).get('p50')
+        print('{:<22}{:>6}{:>8}{:>9}{:>16}{:>16}'.format(
+            result['scheduler'], result['concurrency'], result['num_trials'],
+            result['reports_per_trial'],
+            change(result['trials_per_sec'], old['trials_per_sec']),
+            change(new_p50, old_p50)))
+
+
+def main():
+    args = parse_args()
+    logging.basicConfig(level=logging.DEBUG if args.debug else logging.WARNING)
+    args.nodes = [SimulatedNode(num_cpus=args.simulated_cpus,
+                                processes=args.simulated_processes)
+                  for _ in range(args.simulated_nodes)]
+    total_cpus = total_cpu_count(args)
+    results = []
+    for name, concurrency, num_trials, reports in itertools.product(
+            args.schedulers, args.concurrency, args.num_trials, args.reports_per_trial):
+        if concurrency > total_cpus:
+            logger.warning('Skipping concurrency {} with {} CPUs'.format(concurrency, total_cpus))
+            continue
+        for _ in range(args.repeat):
+            result = run_case(name, concurrency, num_trials, reports, args)
+            results.append(result)
+            print('{scheduler} concurrency={concurrency} trials={num_trials} '
+                  'reports={reports_per_trial}: {trials_per_sec:.2f} trials/sec, '
+                  'master cpu {master_cpu_util:.0%}'.format(**result))
+    output = {'environment': environment(), 'results': results}
+    if args.channel_reports > 0:
+        output['report_channel'] = measure_report_channel(args.channel_reports)
+        print('report channel: {:.3f} ms per report (p50)'.format(
+            output['report_channel']['p50'] * 1e3))
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print('Saved results to {}'.format(args.output))
+    if args.baseline is not None:
+        compare(results, args.baseline)
+    ag.done()
+
+
+if __name__ == '__main__':
+    main()
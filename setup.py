@@ -93,6 +93,7 @@ requirements = [
     'gluonnlp',
     'graphviz',
     'scikit-optimize',
+    'cloudpickle',
 ]
 
 setup(
@@ -0,0 +1,177 @@
+import time
+import threading
+import multiprocessing as mp
+
+from autogluon.scheduler.resource import DistributedResource
+from autogluon.scheduler.resource.resource import _parse_cpulist
+from autogluon.scheduler.resource.dist_manager import DistributedResourceManager, _CapacityIndex, \
+    _select_cpus, _take_devices, _return_devices, _num_fitting, DEVICE_UNITS
+
+class _FakeNodeManager(object):
+    MAX_MEMORY = 0
+
+    def __init__(self, num_cpus, num_gpus=0):
+        self.max_cpus, self.max_gpus = num_cpus, num_gpus
+        self.cpus, self.gpus = list(range(num_cpus)), list(range(num_gpus))
+
+    def _request(self, remote, resource):
+        cpu_ids = [self.cpus.pop() for _ in range(resource.num_cpus)]
+        gpu_ids = [self.gpus.pop() for _ in range(resource.num_gpus)]
+        resource._ready(remote, cpu_ids, gpu_ids)
+
+    def _release(self, resource):
+        self.cpus.extend(resource.cpu_ids)
+        self.gpus.extend(resource.gpu_ids)
+        resource._release()
+
+    def get_free_resources(self):
+        return len(self.cpus), len(self.gpus)
+
+    def check_possible(self, resource):
+        return resource.num_cpus <= self.max_cpus and resource.num_gpus <= self.max_gpus
+
+    def get_all_resources(self):
+        return self.max_cpus, self.max_gpus
+
+    def is_idle(self):
+        return len(self.cpus) == self.max_cpus and len(self.gpus) == self.max_gpus
+
+def _make_manager():
+    class _Manager(DistributedResourceManager):
+        LOCK = mp.Lock()
+        WAITING_QUEUE = []
+        NODE_RESOURCE_MANAGER = {}
+        NODE_PENALTY = {}
+        DRAINING = {}
+        _INDEX = _CapacityIndex()
+    return _Manager
+
+def _add_node(manager, name, num_cpus):
+    manager.NODE_RESOURCE_MANAGER[name] = _FakeNodeManager(num_cpus)
+    with manager.LOCK:
+        manager._update_index(name)
+        manager._refresh_resource()
+
+def test_capacity_index_best_fit():
+    index = _CapacityIndex()
+    index.update('a', 8, 0)
+    index.update('b', 2, 0)
+    index.update('c', 4, 1)
+    assert index.best_fit(2, 0) == 'b'
+    assert index.best_fit(3, 0) == 'a'
+    assert index.best_fit(1, 1) == 'c'
+    assert index.best_fit(16, 0) is None
+    assert index.best_fit(2, 0, exclude={'b'}) == 'a'
+    # nodes with a penalty are used last
+    assert index.best_fit(2, 0, penalty={'b': 1}) == 'a'
+    index.update('a', 1, 0)
+    assert index.best_fit(3, 0) == 'c'
+    assert index.free('a') == (1, 0, 0)
+    # nodes without enough free memory are skipped
+    index.update('d', 2, 0, 100)
+    index.update('b', 2, 0, 10)
+    assert index.best_fit(2, 0, memory=50) == 'd'
+    assert index.best_fit(2, 0, memory=500) is None
+
+def test_numa_cpu_selection():
+    assert _parse_cpulist('0-3,8-9,12\n') == [0, 1, 2, 3, 8, 9, 12]
+    numa_nodes = [[0, 1, 2, 3], [4, 5, 6, 7]]
+    # within the node which fits best
+    assert _select_cpus([0, 1, 2, 3, 5, 6], numa_nodes, 2) == [5, 6]
+    assert _select_cpus([0, 1, 2, 3, 5, 6], numa_nodes, 3) == [0, 1, 2]
+    # spanning as few nodes as possible
+    assert sorted(_select_cpus([0, 1, 5, 6, 7], numa_nodes, 4)) == [0, 5, 6, 7]
+    assert _select_cpus([3, 1, 6], [], 2) == [3, 1]
+
+def test_fractional_devices():
+    capacity = [DEVICE_UNITS] * 2
+    assert _num_fitting(capacity, 0.25) == 8
+    # fractional requests fill a partially used device first
+    assert [_take_devices(capacity, 0.25) for _ in range(3)] == [[0], [0], [0]]
+    assert _take_devices(capacity, 0.5) == [1]
+    assert _take_devices(capacity, 0.25) == [0]
+    assert _num_fitting(capacity, 1) == 0 and _num_fitting(capacity, 0.5) == 1
+    _return_devices(capacity, [1], 0.5)
+    assert _take_devices(capacity, 1) == [1]
+    _return_devices(capacity, [1], 1)
+    assert capacity == [0, DEVICE_UNITS]
+    index = _CapacityIndex()
+    index.update('a', 0, 0, 0, 0.5, 0.0)
+    index.update('b', 1, 0, 0, 1.0, 0.0)
+    assert index.best_fit(0.5, 0) == 'a'
+    assert index.best_fit(0.75, 0) == 'b'
+    assert index.best_fit(1, 0) == 'b'
+    assert index.best_fit(0.5, 0.5) is None
+
+def test_impossible_request_message():
+    _Manager = _make_manager()
+    _add_node(_Manager, 'n0', 4)
+    try:
+        _Manager._request(DistributedResource(num_cpus=8, num_gpus=0))
+    except AssertionError as e:
+        message = str(e)
+    else:
+        assert False, 'the request cannot be served'
+    assert 'num_cpu=8, num_gpu=0 and memory=0' in message
+    assert 'to largest node availability CPUs=4, GPUs=0, memory=0' in message
+
+def test_waiting_queue_no_starvation():
+    _Manager = _make_manager()
+    _add_node(_Manager, 'n0', 4)
+    _add_node(_Manager, 'n1', 2)
+    small = DistributedResource(num_cpus=2, num_gpus=0)
+    _Manager._request(small)
+    # best fit: the small request fills the small node
+    assert small.node == 'n1'
+    running = [DistributedResource(num_cpus=2, num_gpus=0)]
+    _Manager._request(running[0])
+    assert running[0].node == 'n0'
+
+    served = []
+    def request(resource, priority=0):
+        _Manager._request(resource, priority)
+        served.append(resource)
+    big = DistributedResource(num_cpus=4, num_gpus=0)
+    waiting = [DistributedResource(num_cpus=2, num_gpus=0) for _ in range(2)]
+    threads = []
+    for resource in [big] + waiting:
+        threads.append(threading.Thread(target=request, args=(resource,)))
+        threads[-1].start()
+        while len(_Manager.WAITING_QUEUE) < len(threads):
+            time.sleep(0.01)
+    assert _Manager.num_available(small) == 0
+    # the small node is free again: one small request is backfilled there, but
+    # not on the node reserved for the big request
+    _Manager._release(small)
+    threads[1].join(5)
+    assert served == [waiting[0]] and waiting[0].node == 'n1'
+    _Manager._release(running[0])
+    threads[0].join(5)
+    assert served == [waiting[0], big] and big.node == 'n0'
+    _Manager._release(waiting[0])
+    threads[2].join(5)
+    assert served[-1] is waiting[1]
+    for resource in [big, waiting[1]]:
+        _Manager._release(resource)
+    assert len(_Manager.WAITING_QUEUE) == 0
+
+def test_drain_remote():
+    _Manager = _make_manager()
+    _add_node(_Manager, 'd0', 2)
+    _add_node(_Manager, 'd1', 2)
+    resource = DistributedResource(num_cpus=2, num_gpus=0)
+    _Manager._request(resource)
+    node = resource.node
+    other = 'd1' if node == 'd0' else 'd0'
+    removed, = _Manager.drain_remote(node)
+    assert not removed.is_set()
+    # no new task on a draining node
+    assert _Manager.check_availability(resource) == other
+    _Manager._release(resource)
+    assert removed.is_set() and node not in _Manager.NODE_RESOURCE_MANAGER
+    assert _Manager.remove_remote(other, timeout=1)
+    assert _Manager.MAX_CPU_COUNT == 0 and len(_Manager.DRAINING) == 0
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -0,0 +1,46 @@
+import os
+import stat
+import tempfile
+
+from autogluon.scheduler.remote.file_sync import FileSync
+
+
+class _Worker(object):
+    def __init__(self, local_directory):
+        self.local_directory = local_directory
+
+
+class _LocalNode(object):
+    """Runs the functions in this process, like `Client.run` on one worker"""
+    def __init__(self, local_directory):
+        self.worker = _Worker(local_directory)
+
+    def run(self, function, *args):
+        if function.__name__ == '_materialize':
+            return {'local': function(*args, dask_worker=self.worker)}
+        return {'local': function(*args)}
+
+
+def test_file_sync():
+    root = tempfile.mkdtemp()
+    source = os.path.join(root, 'train_helper.py')
+    with open(source, 'w') as f:
+        f.write('VALUE = 42\n' * 1000)
+    worker_dir = os.path.join(root, 'worker')
+    os.makedirs(worker_dir)
+    node = _LocalNode(worker_dir)
+    sync = FileSync(store_dir=os.path.join(root, 'store'), chunk_size=1024)
+
+    sent = sync.sync([node], [source], load=False)
+    assert 0 < sent[node] < os.path.getsize(source)
+    dest = os.path.join(worker_dir, 'train_helper.py')
+    with open(dest) as f:
+        assert f.read() == 'VALUE = 42\n' * 1000
+    assert not os.stat(dest).st_mode & stat.S_IWUSR
+
+    # the node already has the content, nothing is sent again
+    assert sync.sync([node], [source], load=False)[node] == 0
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
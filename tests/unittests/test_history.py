@@ -0,0 +1,27 @@
+import numpy as np
+from autogluon.scheduler.history import TrainingHistory
+
+def test_training_history():
+    history = TrainingHistory(capacity=2)
+    for e in range(1, 4):
+        for task_id in range(3):
+            history.append(task_id, {'epoch': e, 'accuracy': task_id + e / 10.0})
+    history.append(0, {'epoch': 4, 'accuracy': 1, 'terminated': True})
+    assert len(history) == 3 and history.num_reports == 10
+    assert [r['epoch'] for r in history[0]] == [1, 2, 3, 4]
+    assert history[0][-1] == {'epoch': 4, 'accuracy': 1.0, 'terminated': True}
+    assert [len(v) for _, v in history.items()] == [4, 3, 3]
+    task_ids, values = history.last_values('accuracy')
+    np.testing.assert_allclose(values, [1.0, 1.3, 2.3])
+    task_ids, values = history.values_at('accuracy', 'epoch', 2)
+    assert task_ids.tolist() == [0, 1, 2]
+    assert history.best_so_far('accuracy')[-1] == 2.3
+    restored = TrainingHistory()
+    restored.load_state_dict(history.state_dict())
+    assert restored.to_dict() == history.to_dict()
+    restored.load_state_dict('{"0": [{"epoch": 1, "accuracy": 0.5}]}')
+    assert restored[0] == [{'epoch': 1, 'accuracy': 0.5}]
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
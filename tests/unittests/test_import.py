@@ -0,0 +1,43 @@
+import sys
+import json
+import subprocess
+from unittest import SkipTest
+
+from autogluon.utils.try_import import try_import_mxnet, try_import_dask
+
+HEAVY_MODULES = ['mxnet', 'distributed', 'gluoncv', 'gluonnlp', 'skopt',
+                 'matplotlib', 'pandas', 'IPython']
+
+_SCRIPT = """
+import sys, json
+import autogluon as ag
+print(json.dumps(sorted(sys.modules)))
+"""
+
+def _modules_after_import():
+    # a fresh interpreter, the modules of this one are already loaded
+    output = subprocess.check_output([sys.executable, '-c', _SCRIPT])
+    return set(json.loads(output.decode().strip().splitlines()[-1]))
+
+def test_import_is_lazy():
+    modules = _modules_after_import()
+    for name in HEAVY_MODULES:
+        assert name not in modules, '{} imported by `import autogluon`'.format(name)
+
+def test_lazy_attributes():
+    try:
+        try_import_mxnet()
+        try_import_dask()
+    except ImportError as e:
+        raise SkipTest(str(e))
+    import autogluon as ag
+    assert ag.scheduler.FIFOScheduler.__name__ == 'FIFOScheduler'
+    assert ag.searcher.SKoptSearcher.__name__ == 'SKoptSearcher'
+    assert 'RLScheduler' in dir(ag.scheduler)
+    assert ag.task.__name__ == 'autogluon.task'
+    from autogluon.utils import mkdir
+    assert callable(mkdir)
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+from autogluon.scheduler.journal import CheckpointJournal
+
+def test_journal_replay():
+    path = os.path.join(tempfile.mkdtemp(), 'checkpoint.ag.journal')
+    journal = CheckpointJournal(path)
+    for i in range(5):
+        journal.append('result', i, {'accuracy': i / 10})
+    journal.close()
+    records = list(CheckpointJournal(path).replay(after=2))
+    assert [seq for seq, _, _ in records] == [3, 4, 5]
+    assert records[0][1:] == ('result', (2, {'accuracy': 0.2}))
+    # a truncated tail is ignored
+    with open(path, 'ab') as f:
+        f.write(b'\x80\x04\x95')
+    assert len(list(CheckpointJournal(path).replay())) == 5
+    # sequence numbers continue after compaction
+    journal = CheckpointJournal(path)
+    list(journal.replay(after=5))
+    journal.reset()
+    journal.append('update', {'lr': 0.1}, 0.5, {})
+    assert [seq for seq, _, _ in journal.replay(after=5)] == [6]
+
+def test_journal_resume():
+    path = os.path.join(tempfile.mkdtemp(), 'checkpoint.ag.journal')
+    journal = CheckpointJournal(path)
+    for i in range(3):
+        journal.append('result', i, {'accuracy': i / 10})
+    # snapshot, then compaction
+    snapshot_seq = journal.seq
+    journal.reset()
+    journal.close()
+    # resume from the snapshot, append, crash
+    journal = CheckpointJournal(path)
+    assert list(journal.replay(after=snapshot_seq)) == []
+    journal.append('result', 3, {'accuracy': 0.3})
+    journal.close()
+    # resume again: the record appended after the first resume is replayed
+    records = list(CheckpointJournal(path).replay(after=snapshot_seq))
+    assert [seq for seq, _, _ in records] == [snapshot_seq + 1]
+    assert records[0][1:] == ('result', (3, {'accuracy': 0.3}))
+    assert CheckpointJournal(path, seq=7).seq == 7
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
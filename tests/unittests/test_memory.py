@@ -0,0 +1,16 @@
+from autogluon.scheduler.memory import PeakMemoryEstimator
+
+def test_peak_memory_estimator():
+    estimator = PeakMemoryEstimator(margin=1.5)
+    assert estimator.estimate({'net': 'resnet18', 'lr': 0.1}) is None
+    estimator.add({'net': 'resnet18', 'lr': 0.1, 'batch_size': 32}, 100)
+    estimator.add({'net': 'resnet18', 'lr': 0.01, 'batch_size': 32}, 200)
+    estimator.add({'net': 'resnet50', 'lr': 0.01, 'batch_size': 32}, 1000)
+    # the learning rate does not change the family
+    assert estimator.estimate({'net': 'resnet18', 'lr': 0.5, 'batch_size': 32}) == 300
+    assert estimator.estimate({'net': 'resnet18', 'lr': 0.5, 'batch_size': 64}) is None
+    assert estimator.estimate({'net': 'resnet50', 'lr': 0.5, 'batch_size': 32}) == 1500
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
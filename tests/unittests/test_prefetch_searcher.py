@@ -0,0 +1,43 @@
+import pickle
+import ConfigSpace as CS
+import ConfigSpace.hyperparameters as CSH
+from autogluon.searcher import RandomSearcher, PrefetchSearcher
+from autogluon.scheduler.fifo import _create_searcher
+
+def _configspace():
+    cs = CS.ConfigurationSpace()
+    cs.add_hyperparameter(CSH.UniformFloatHyperparameter('lr', lower=1e-4, upper=1e-1, log=True))
+    return cs
+
+def test_prefetch_searcher():
+    with PrefetchSearcher(RandomSearcher(_configspace()), prefetch=2) as searcher:
+        configs = [searcher.get_config() for _ in range(3)]
+        assert len(set(c['lr'] for c in configs)) == 3
+        searcher.update(configs[0], reward=0.5, done=True)
+        # suggestions computed before the update are not handed out twice
+        configs.append(searcher.get_config())
+        assert len(set(c['lr'] for c in configs)) == 4
+        assert searcher.get_best_config() == configs[0]
+        assert searcher.get_best_reward() == 0.5
+        restored = pickle.loads(pickle.dumps(searcher))
+    # the worker is stopped at the end of the block
+    try:
+        searcher.get_config()
+    except RuntimeError:
+        pass
+    else:
+        assert False, 'the searcher is closed'
+    assert restored.get_best_reward() == 0.5
+    assert restored.get_config()['lr'] not in [c['lr'] for c in configs]
+    restored.close()
+
+def test_prefetch_searcher_by_name():
+    searcher = _create_searcher('prefetch_random', _configspace(), {'prefetch': 3})
+    assert isinstance(searcher, PrefetchSearcher)
+    assert isinstance(searcher.searcher, RandomSearcher)
+    assert 'lr' in searcher.get_config()
+    searcher.close()
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
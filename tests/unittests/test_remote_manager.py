@@ -0,0 +1,97 @@
+import threading
+import multiprocessing as mp
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from autogluon.scheduler.remote import RemoteManager, HeartbeatMonitor
+
+class _FakeRemote(object):
+    """Node answering its probe once all the nodes waiting on `barrier` are
+    probed, or never"""
+    def __init__(self, barrier):
+        self.barrier = barrier
+        self.resources = None
+        self.closed = False
+
+    def submit(self, function, *args, **kwargs):
+        if self.barrier is None:
+            return Future()
+        def _run():
+            self.barrier.wait(timeout=10)
+            return function(*args)
+        return ThreadPoolExecutor(1).submit(_run)
+
+    def shutdown(self):
+        self.closed = True
+
+class _Manager(RemoteManager):
+    NODES = {}
+    UPLOADED_FILES = []
+    STARTING = set()
+    LOCK = mp.Lock()
+    CREATED = {}
+    # the probes of the 8 nodes only return once they all started
+    BARRIER = threading.Barrier(8)
+
+    @classmethod
+    def _create_remote(cls, node_ip, timeout):
+        if node_ip == 'unreachable':
+            raise IOError('connection refused')
+        remote = _FakeRemote(None if node_ip == 'stuck' else cls.BARRIER)
+        cls.CREATED[node_ip] = remote
+        return remote
+
+def test_parallel_bring_up():
+    ready = []
+    ips = ['node{}'.format(i) for i in range(8)] + ['unreachable', 'stuck']
+    remotes = _Manager.add_remote_nodes(ips, timeout=2, on_ready=ready.append)
+    # the nodes are started concurrently, otherwise the first probe times out
+    # waiting for the others, and the stuck one is given up after the timeout
+    assert len(remotes) == 8 and sorted(map(id, ready)) == sorted(map(id, remotes))
+    assert all(remote.resources['num_cpus'] > 0 for remote in remotes)
+    assert sorted(_Manager.NODES) == sorted(ips[:8])
+    assert _Manager.CREATED['stuck'].closed
+    assert len(_Manager.STARTING) == 0
+    # added nodes are not started twice
+    assert _Manager.add_remote_nodes(['node0']) == []
+
+class _BeatingRemote(object):
+    def run(self, function, *args):
+        return {'local': function(*args)}
+
+def test_heartbeat_monitor():
+    lost = []
+    event = threading.Event()
+    def on_lost(remote):
+        lost.append(remote)
+        event.set()
+    # heartbeats are sent after 60s, the nodes miss their deadline
+    monitor = HeartbeatMonitor(on_lost, interval=60, timeout=0.5)
+    watched, unwatched = _BeatingRemote(), _BeatingRemote()
+    monitor.watch(unwatched)
+    monitor.unwatch(unwatched)
+    monitor.watch(watched)
+    assert event.wait(30)
+    monitor.close()
+    # only the watched node is lost
+    assert lost == [watched]
+
+class _LosingManager(_Manager):
+    NODES = {}
+    LOST_CALLBACKS = []
+
+def test_node_lost():
+    lost = []
+    _LosingManager.add_lost_callback(lost.append)
+    remote, other = _FakeRemote(None), _FakeRemote(None)
+    _LosingManager.NODES.update({'lost': remote, 'other': other})
+    _LosingManager._node_lost(remote)
+    # the node is removed before the callbacks, which release its jobs
+    assert lost == [remote]
+    assert _LosingManager.NODES == {'other': other}
+    # a node lost twice is only handled once
+    _LosingManager._node_lost(remote)
+    assert lost == [remote]
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -0,0 +1,47 @@
+import pickle
+import threading
+
+from autogluon.scheduler.reporter import ReportDispatcher
+from autogluon.scheduler.tracer import make_span
+
+def test_report_channel():
+    reports, spans = [], []
+    def handler(reporter, reported_result):
+        reports.append(reported_result)
+        if reported_result is not None:
+            reporter.move_on()
+        return reported_result is None or reported_result.get('done', False)
+    dispatcher = ReportDispatcher(on_spans=lambda task_id, s: spans.extend(s))
+    dispatcher.start()
+    reporter = dispatcher.add_stream(handler, task_id=0)
+    # the trials get a copy of the reporter, which connects to the channel
+    remote_reporter = pickle.loads(pickle.dumps(reporter))
+
+    num_reports = 200
+    for i in range(num_reports):
+        remote_reporter(epoch=i)
+        # each report waits for the scheduler to move on
+        assert reports[-1]['epoch'] == i
+    remote_reporter(epoch=num_reports, done=True)
+    remote_reporter.trace([make_span('trial', 0, 1)])
+    # the spans are received before the job is done
+    dispatcher.end_stream(reporter)
+    dispatcher.wait_stream(reporter, timeout=10)
+    assert [r['epoch'] for r in reports] == list(range(num_reports + 1))
+    assert [s['name'] for s in spans] == ['trial']
+
+    # asynchronous reports are sent in batches, without waiting
+    batches = []
+    reporter = dispatcher.add_stream(lambda r, result: batches.append(result) or result is None,
+                                     asynchronous=True)
+    remote_reporter = pickle.loads(pickle.dumps(reporter))
+    remote_reporter.report_batch([{'epoch': 1}, {'epoch': 2}])
+    remote_reporter.trace([])
+    dispatcher.end_stream(reporter)
+    dispatcher.wait_stream(reporter, timeout=10)
+    assert batches == [{'epoch': 1}, {'epoch': 2}, None]
+    dispatcher.stop()
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
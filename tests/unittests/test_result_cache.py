@@ -0,0 +1,49 @@
+import os
+import tempfile
+import autogluon as ag
+from autogluon.scheduler.result_cache import TrialResultCache
+
+@ag.args(lr=ag.space.Real(1e-3, 1e-1, log=True), epochs=4)
+def train_fn(args, reporter):
+    for e in range(args.epochs):
+        reporter(epoch=e + 1, accuracy=args.lr)
+
+def test_result_cache():
+    cache = TrialResultCache(tempfile.mkdtemp())
+    key = cache.key(train_fn, train_fn.args, {'lr': 0.01})
+    # the task id and the config values in args are not part of the key
+    args = dict(train_fn.args, task_id=3, lr=0.05)
+    assert cache.key(train_fn, args, {'lr': 0.01}) == key
+    assert cache.key(train_fn, train_fn.args, {'lr': 0.02}) != key
+    assert cache.key(train_fn, train_fn.args, {'lr': 0.01}, {'max_t': 4}) != key
+    assert cache.key(train_fn, dict(train_fn.args, epochs=5), {'lr': 0.01}) != key
+    assert cache.get(key) is None and key not in cache
+    results = [{'epoch': 1, 'accuracy': 0.1}, {'epoch': 2, 'accuracy': 0.2}]
+    cache.put(key, results)
+    assert TrialResultCache(cache.directory).get(key) == results
+    assert (cache.hits, cache.misses) == (0, 1)
+    # corrupted entries are ignored
+    with open(cache._path(key), 'wb') as f:
+        f.write(b'\x80\x04\x95')
+    assert cache.get(key) is None
+
+@ag.obj(batch_size=ag.space.Int(8, 32))
+class Dataset(object):
+    def __init__(self, path, batch_size=8):
+        self.path = path
+        self.batch_size = batch_size
+
+def test_result_cache_objects():
+    cache = TrialResultCache(tempfile.mkdtemp())
+    config = {'lr': 0.01, 'dataset.batch_size': 16}
+    key = cache.key(train_fn, dict(train_fn.args, dataset=Dataset('train.rec')), config)
+    assert key is not None
+    assert cache.key(train_fn, dict(train_fn.args, dataset=Dataset('train.rec')), config) == key
+    # different datasets do not share cache entries
+    assert cache.key(train_fn, dict(train_fn.args, dataset=Dataset('val.rec')), config) != key
+    # values without a stable representation bypass the cache
+    assert cache.key(train_fn, dict(train_fn.args, dataset=object()), config) is None
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
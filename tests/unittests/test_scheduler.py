@@ -1,6 +1,13 @@
+import os
+import time
+import signal
+import tempfile
+import threading
 from unittest import TestCase
 import numpy as np
 import autogluon as ag
+from autogluon.scheduler import TaskScheduler
+from autogluon.scheduler.worker_pool import TrialWorkerPool
 from nose.plugins.attrib import attr
 
 @ag.args(
@@ -19,6 +26,145 @@ def rl_train_fn(args, reporter):
         dummy_accuracy = 1 - np.power(1.8, -np.random.uniform(e, 2*e))
         reporter(epoch=e, accuracy=dummy_accuracy, lr=args.lr, wd=args.wd)
 
+@ag.args(lr=ag.space.Real(1e-3, 1e-2))
+def slow_train_fn(args, reporter):
+    for e in range(1, 101):
+        time.sleep(0.1)
+        reporter(epoch=e, accuracy=args.lr * e)
+
+def pid_fn(reporter):
+    reporter(epoch=1)
+    reporter(epoch=2, done=True)
+    return os.getpid()
+
+def no_done_fn(reporter):
+    reporter(epoch=1)
+    return os.getpid()
+
+def raise_fn(reporter):
+    reporter(epoch=1)
+    raise ValueError('failing trial')
+
+def killed_fn(reporter):
+    os.kill(os.getpid(), signal.SIGKILL)
+
+def affinity_fn(reporter):
+    reporter(epoch=1, done=True)
+    return sorted(os.sched_getaffinity(0)), os.environ.get('OMP_NUM_THREADS')
+
+def resumable_fn(reporter):
+    state = {'trained': []}
+    def save_fn(prefix):
+        with open(prefix + '.txt', 'w') as f:
+            f.write(','.join(map(str, state['trained'])))
+    def load_fn(prefix):
+        with open(prefix + '.txt') as f:
+            state['trained'] = [int(e) for e in f.read().split(',')]
+    start = reporter.register_checkpoint(save_fn, load_fn)
+    for e in range(start + 1, 5):
+        state['trained'].append(e)
+        reporter(epoch=e)
+    return state['trained']
+
+class _FakeDistReporter(object):
+    """Records the reports, and asks to stop the trial at `stop_at`."""
+    def __init__(self, terminator=None, stop_at=None, asynchronous=False):
+        self.results = []
+        self.batches = 0
+        self.asynchronous = asynchronous
+        self.checkpoint = None
+        self.terminator = terminator
+        self.stop_at = stop_at
+        self._continue = threading.Semaphore(0)
+
+    def __call__(self, **kwargs):
+        self.results.append(kwargs)
+        if self.stop_at is not None and kwargs.get('epoch') == self.stop_at:
+            self.terminator.release()
+            self._continue.acquire()
+
+    def report_batch(self, results):
+        self.batches += 1
+        for result in results:
+            self(**result)
+
+    def move_on(self):
+        self._continue.release()
+
+def _run_trial(fn, reporter=None, terminator=None, cpu_ids=None):
+    args = {'reporter': reporter or _FakeDistReporter()}
+    if terminator is not None:
+        args['terminator_semaphore'] = terminator
+    return TaskScheduler._run_dist_job(fn, args, [], threading.Semaphore(1), cpu_ids)
+
+
+class WorkerPoolTestCase(TestCase):
+    def tearDown(self):
+        TrialWorkerPool.configure()
+
+    def test_worker_reuse(self):
+        TrialWorkerPool.configure(preload=[])
+        pid = _run_trial(pid_fn)
+        assert pid is not None and pid != os.getpid()
+        assert _run_trial(pid_fn) == pid
+
+    def test_worker_recycle(self):
+        TrialWorkerPool.configure(max_trials_per_worker=2, preload=[])
+        pids = [_run_trial(pid_fn) for _ in range(3)]
+        assert pids[0] == pids[1] != pids[2]
+        TrialWorkerPool.configure(max_worker_rss=1, preload=[])
+        assert _run_trial(pid_fn) != _run_trial(pid_fn)
+
+    def test_failed_trials(self):
+        TrialWorkerPool.configure(preload=[])
+        pid = _run_trial(no_done_fn)
+        assert _run_trial(raise_fn) is None
+        assert _run_trial(pid_fn) == pid
+        assert _run_trial(killed_fn) is None
+        assert _run_trial(pid_fn) != pid
+
+    def test_stop_trial(self):
+        TrialWorkerPool.configure(preload=[])
+        terminator = threading.Semaphore(0)
+        reporter = _FakeDistReporter(terminator, stop_at=1)
+        pid = _run_trial(pid_fn)
+        assert _run_trial(pid_fn, reporter, terminator) is None
+        assert [r['epoch'] for r in reporter.results] == [1]
+        assert _run_trial(pid_fn) == pid
+
+    def test_async_reports(self):
+        TrialWorkerPool.configure(preload=[])
+        reporter = _FakeDistReporter(asynchronous=True)
+        assert _run_trial(pid_fn, reporter) is not None
+        assert [r['epoch'] for r in reporter.results] == [1, 2]
+        assert 1 <= reporter.batches <= 2
+
+
+    def test_resume_from_checkpoint(self):
+        TrialWorkerPool.configure(preload=[])
+        checkpoint = {'dir': os.path.join(tempfile.mkdtemp(), 'trial'), 'time_attr': 'epoch',
+                      'milestones': [1, 2], 'resume_from': None}
+        reporter = _FakeDistReporter()
+        reporter.checkpoint = checkpoint
+        assert _run_trial(resumable_fn, reporter) == [1, 2, 3, 4]
+        assert sorted(os.listdir(checkpoint['dir'])) == [
+            'milestone_1.ag', 'milestone_1.txt', 'milestone_2.ag', 'milestone_2.txt']
+        reporter = _FakeDistReporter()
+        reporter.checkpoint = dict(checkpoint, resume_from=2)
+        assert _run_trial(resumable_fn, reporter) == [1, 2, 3, 4]
+        assert [r['epoch'] for r in reporter.results if 'epoch' in r] == [3, 4]
+        # a missing checkpoint trains from scratch
+        assert _run_trial(resumable_fn, reporter) == [1, 2, 3, 4]
+
+    def test_cpu_affinity(self):
+        if not hasattr(os, 'sched_setaffinity'):
+            return
+        TrialWorkerPool.configure(preload=[])
+        cpus = sorted(os.sched_getaffinity(0))
+        assert _run_trial(affinity_fn, cpu_ids=[0]) == ([cpus[0]], '1')
+        assert _run_trial(affinity_fn)[1] is None
+        TrialWorkerPool.configure(preload=[], pin_cpus=False)
+        assert _run_trial(affinity_fn, cpu_ids=[0]) == (cpus, None)
 
 @attr('sequential')
 class SequentialTestCase(TestCase):
@@ -41,6 +187,20 @@ class SequentialTestCase(TestCase):
         scheduler.run()
         scheduler.join_jobs()
 
+    def test_time_out(self):
+        scheduler = ag.scheduler.FIFOScheduler(slow_train_fn,
+                                               resource={'num_cpus': 1, 'num_gpus': 0},
+                                               num_trials=3,
+                                               time_out=1,
+                                               reward_attr='accuracy',
+                                               time_attr='epoch')
+        start_time = time.time()
+        scheduler.run()
+        scheduler.join_jobs()
+        # running trials are stopped at the deadline
+        assert time.time() - start_time < 5
+        assert 0 < scheduler.training_history.num_reports < 100
+
     def test_rl_scheduler(self):
         scheduler = ag.scheduler.RLScheduler(rl_train_fn,
                                              resource={'num_cpus': 2, 'num_gpus': 0},
@@ -0,0 +1,33 @@
+import time
+import autogluon as ag
+from autogluon.scheduler.remote import SimulatedNode
+
+@ag.args(lr=ag.space.Real(1e-3, 1e-2))
+def train_fn(args, reporter):
+    for e in range(1, 6):
+        time.sleep(0.05)
+        reporter(epoch=e, accuracy=args.lr * e)
+
+def test_simulated_nodes():
+    nodes = [SimulatedNode(num_cpus=2, num_gpus=1) for _ in range(3)]
+    # the trials only fit on the simulated nodes
+    scheduler = ag.scheduler.FIFOScheduler(
+        train_fn, resource={'num_cpus': 2, 'num_gpus': 1}, num_trials=6,
+        reward_attr='accuracy', time_attr='epoch', checkpoint=None, dist_ip_addrs=nodes)
+    managers = [m for m in scheduler.RESOURCE_MANAGER.NODE_RESOURCE_MANAGER.values()
+                if m.get_all_resources() == (2, 1)]
+    assert len(managers) == 3
+    scheduler.run()
+    scheduler.join_jobs()
+    assert sorted(len(reports) for reports in scheduler.training_history.values()) == [5] * 6
+    used_nodes = set(node for node, _ in scheduler.tracer._lanes.values())
+    assert len(used_nodes) > 1
+    # the nodes of the finished tasks are forgotten
+    assert len(scheduler._task_nodes) == 0
+    assert scheduler.remove_remote(nodes, timeout=30)
+    assert all(m.get_all_resources() != (2, 1)
+               for m in scheduler.RESOURCE_MANAGER.NODE_RESOURCE_MANAGER.values())
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
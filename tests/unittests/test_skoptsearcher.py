@@ -69,6 +69,18 @@ def test_skoptsearcher():
     assert (max(skopt_reward_list) >= 0.6),"SKopt performed poorly"
     logger.debug('Test Finished.')
 
+def test_skoptsearcher_pending():
+    cs = CS.ConfigurationSpace()
+    cs.add_hyperparameter(CSH.UniformFloatHyperparameter('a', lower=0, upper=1))
+    searcher = SKoptSearcher(cs)
+    configs = searcher.get_configs(2)
+    for config in configs:
+        searcher.register_pending(config)
+    searcher.update(configs[0], 0.5, done=True)
+    # failed evaluations are no longer assigned the constant lie
+    searcher.evaluation_failed(configs[1])
+    assert len(searcher._pending) == 0
+
 def toy_reward(config):
     """ The reward function to maximize (ie. returns performance from a fake training trial).
     
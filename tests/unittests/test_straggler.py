@@ -0,0 +1,27 @@
+from autogluon.scheduler.straggler import StragglerDetector
+
+def test_straggler_detector():
+    detector = StragglerDetector(threshold=3, window=3, min_reports=2, min_cohort=2)
+    for task_id, node in [(0, 'a'), (1, 'a'), (2, 'b')]:
+        # the first report includes the start-up time
+        assert not detector.add_report(task_id, node, 100.0)
+        for _ in range(3):
+            assert not detector.add_report(task_id, node, 1.0)
+    assert detector.cohort_pace() == 1.0
+    flagged = [detector.add_report(3, 'b', t) for t in [1.0, 5.0, 5.0, 5.0, 5.0]]
+    # flagged once, when the median of the recent reports is slow
+    assert flagged == [False, False, True, False, False]
+    assert detector.stragglers == [3]
+    assert detector.node_slowdown('b') == 3.0
+    assert detector.node_slowdown('a') == 1.0
+    assert detector.node_slowdown('c') == 1.0
+    assert detector.node_stragglers('b') == 1
+    # once finished, the straggler no longer slows its node down
+    detector.finish(3)
+    assert detector.node_stragglers('b') == 0
+    assert detector.node_slowdown('b') == 1.0
+    assert detector.cohort_pace() == 1.0
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -0,0 +1,22 @@
+from autogluon.scheduler.tracer import TrialTracer, make_span
+
+def test_trial_tracer():
+    tracer = TrialTracer()
+    tracer.add_span('queue', 0.0, 1.0, task_id=0)
+    tracer.add_spans([make_span('trial', 1.0, 5.0, task_id=0),
+                      make_span('report_wait', 2.0, 3.0, task_id=0)])
+    with tracer.trace('suggest'):
+        pass
+    tracer.set_lane(0, 'node 0', 2)
+    summary = tracer.summary()
+    assert summary['phases']['trial']['count'] == 1
+    assert summary['training'] == 3.0
+    assert 2.0 <= summary['overhead'] < 2.1
+    events = tracer.to_chrome_trace()['traceEvents']
+    trial = [e for e in events if e['name'] == 'trial'][0]
+    assert trial['tid'] == 2 and trial['dur'] == 4e6 and trial['args']['task_id'] == 0
+    assert set(e['args']['name'] for e in events if e['ph'] == 'M') == {'node 0', 'scheduler'}
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()